@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.backends import CachedModelBackend, get_user_cache_key
+
+API_TOKEN_SALT = 'api.authentication'
+API_TOKEN_KEYWORD = 'Bearer'
+
+
+def get_api_token(user):
+    """
+    Return a new API token for a user. The token is the user's ID and token version, timestamped and signed with the
+    SECRET_KEY, so checking it needs no lookup. Changing the SECRET_KEY revokes every token.
+
+    :param user: The user to create the token for
+    :rtype: str
+    """
+    return signing.TimestampSigner(salt=API_TOKEN_SALT).sign('{0}:{1}'.format(user.pk, user.api_token_version))
+
+
+def revoke_api_tokens(user):
+    """
+    Revoke all of a user's API tokens by incrementing their token version.
+
+    The User is removed from the default cache. If that cache is per process (LocMemCache, the default), this only
+    clears this process's copy: other workers go on accepting the tokens until their cached User expires, up to
+    USER_CACHE_TIMEOUT seconds later. Use a shared cache (CACHE_BACKEND) for revocation to apply to every worker at once.
+
+    :param user: The user whose tokens to revoke
+    """
+    get_user_model().objects.filter(pk=user.pk).update(api_token_version=F('api_token_version') + 1)
+    # update() doesn't send post_save, so remove the cached User here
+    cache.delete(get_user_cache_key(user.pk))
+    user.refresh_from_db(fields=['api_token_version'])
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates non-browser clients with an "Authorization: Bearer <token>" header holding a token from
+    get_api_token(). Unlike SessionAuthentication there is no session to look up and no CSRF token to send.
+
+    The signature and age of the token are checked without any I/O, and the User comes from the same cache as
+    CachedModelBackend, so a warm request doesn't query the database at all. A token is rejected once it is older than
+    API_TOKEN_MAX_AGE seconds, if the user is made inactive, or after revoke_api_tokens() (once the cached User has
+    expired, if the cache isn't shared by the workers).
+
+    Only used when API_TOKEN_AUTHENTICATION is enabled.
+    """
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not settings.API_TOKEN_AUTHENTICATION or not auth or auth[0].lower() != API_TOKEN_KEYWORD.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header')
+
+        try:
+            value = signing.TimestampSigner(salt=API_TOKEN_SALT).unsign(auth[1].decode(),
+                                                                          max_age=settings.API_TOKEN_MAX_AGE)
+            user_id, version = (int(part) for part in value.split(':'))
+        except (signing.BadSignature, UnicodeError, ValueError):
+            raise AuthenticationFailed('Invalid or expired token')
+
+        # None if the user no longer exists or is inactive
+        user = CachedModelBackend().get_user(user_id)
+        if user is None or user.api_token_version != version:
+            raise AuthenticationFailed('Invalid or expired token')
+        return user, None
+
+    def authenticate_header(self, request):
+        return API_TOKEN_KEYWORD
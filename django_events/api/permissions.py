@@ -11,5 +11,6 @@ class IsEventOrganiser(BasePermission):
         if request.method in SAFE_METHODS:
             return True
 
-        # Write permissions are only allowed to the organiser of the event.
-        return obj.organiser == request.user
+        # Write permissions are only allowed to the organiser of the event. The IDs are compared so that the organiser
+        # isn't loaded from the database.
+        return obj.organiser_id == request.user.pk
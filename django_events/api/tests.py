@@ -1,11 +1,25 @@
+import time
 from datetime import datetime, timedelta
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.core.management import call_command, CommandError
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.shortcuts import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
-from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN, HTTP_202_ACCEPTED
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN, HTTP_202_ACCEPTED, \
+    HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_429_TOO_MANY_REQUESTS
 
 from events.models import Event
+from events.archive import archive_events
+from jobs.models import Job
+from api.throttling import TokenBucketThrottle
+from api.authentication import get_api_token, revoke_api_tokens
+from api.views import EventViewSet
 
 
 class TestApi(TestCase):
@@ -57,6 +71,13 @@ class TestApi(TestCase):
                          'title': 'Organised Event 1',
                          'description': 'Event Desc. 1',
                          'date_time': self.organised_event_dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                         'recurrence': '',
+                         'recurrence_interval': 1,
+                         'recurrence_until': None,
+                         'occurrence': None,
+                         'capacity': None,
+                         'latitude': None,
+                         'longitude': None,
                          'attendees_count': 1,
                          'organiser_friendly_name': 'user1',
                          'organiser': 'user1@events.com',
@@ -69,6 +90,13 @@ class TestApi(TestCase):
                          'title': 'Attending Event 1',
                          'description': 'Event Desc. 1',
                          'date_time': self.attending_event_dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                         'recurrence': '',
+                         'recurrence_interval': 1,
+                         'recurrence_until': None,
+                         'occurrence': None,
+                         'capacity': None,
+                         'latitude': None,
+                         'longitude': None,
                          'attendees_count': 1,
                          'organiser_friendly_name': 'user2',
                          'organiser': 'user2@events.com',
@@ -92,12 +120,21 @@ class TestApi(TestCase):
                     'title': 'Organised Event 1',
                     'description': 'Event Desc. 1',
                     'date_time': self.organised_event_dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                    'recurrence': '',
+                    'recurrence_interval': 1,
+                    'recurrence_until': None,
+                    'occurrence': None,
+                    'capacity': None,
+                    'latitude': None,
+                    'longitude': None,
                     'organiser_friendly_name': 'user1',
                     'organiser': 'user1@events.com',
                     'attendees': [{'email': 'user2@events.com', 'friendly_name': 'user2'}],
+                    'tags': [],
                     'is_organiser': True,
                     'is_in_past': False,
-                    'is_attending': False}
+                    'is_attending': False,
+                    'is_waitlisted': False}
         self.assertDictEqual(actual, expected)
 
     def test_attend_invalid_event(self):
@@ -130,6 +167,19 @@ class TestApi(TestCase):
                                           format='json', secure=True)
         self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
 
+    def test_unattend_event_queues_notification(self):
+        Job.objects.all().delete()
+        self.user1_client.post(reverse('event-unattend', args=(self.attending_event.id,)), {}, format='json',
+                               secure=True)
+        self.assertEqual(Job.objects.filter(name='events.notify_organiser').count(), 1)
+
+    def test_unattend_event_not_attending(self):
+        Job.objects.all().delete()
+        response = self.user1_client.post(reverse('event-unattend', args=(self.not_attending_event.id,)), {},
+                                          format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertFalse(Job.objects.exists())
+
     def test_update_not_organiser(self):
         response = self.user1_client.put(reverse('event-detail', args=(self.attending_event.id,)),
                                          {'date_time': '2020-07-08T00:41:51.746287',
@@ -137,3 +187,457 @@ class TestApi(TestCase):
                                           'description': 'description'},
                                          format='json', secure=True)
         self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+
+
+class TestApiOrganiserQueries(TestCase):
+    """
+    The organiser permission check compares IDs, so the update/destroy endpoints fetch the event once and never load
+    the organiser just to authorise the request
+    """
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.event = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(days=1),
+                                          organiser=self.user1)
+        self.event.attendees.add(self.user2)
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+        self.user2_client = APIClient()
+        self.user2_client.force_authenticate(user=self.user2)
+        self.url = reverse('event-detail', args=(self.event.id,))
+        self.data = {'title': 'New Title', 'description': 'Event Desc. 1',
+                     'date_time': (datetime.now() + timedelta(days=2)).isoformat()}
+
+    def test_put_queries(self):
+        # Fetch the event with its organiser (for the response), update it and queue the attendee notification
+        with self.assertNumQueries(3):
+            response = self.user1_client.put(self.url, self.data, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_patch_queries(self):
+        with self.assertNumQueries(3):
+            response = self.user1_client.patch(self.url, {'title': 'New Title'}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_delete_queries(self):
+        # Fetch the event, then delete its attendees, tags, occurrence attendees, waitlist and the event itself
+        with self.assertNumQueries(6):
+            response = self.user1_client.delete(self.url, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_204_NO_CONTENT)
+
+    def test_put_not_organiser_queries(self):
+        with self.assertNumQueries(1):
+            response = self.user2_client.put(self.url, self.data, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+
+    def test_delete_not_organiser_queries(self):
+        with self.assertNumQueries(1):
+            response = self.user2_client.delete(self.url, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+        self.assertTrue(Event.objects.filter(pk=self.event.pk).exists())
+
+
+class TestApiActionQuerysets(TestCase):
+    """
+    The write actions look the event up with a minimal query, while the list keeps its annotations
+    """
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.event = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(days=1),
+                                          organiser=self.user1)
+        self.event.attendees.add(self.user2)
+        self.past_event = Event.objects.create(title='Past Event 1',
+                                               description='Past Event Desc. 1',
+                                               date_time=datetime.now() - timedelta(days=1),
+                                               organiser=self.user1)
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+    def capture(self, method, url, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.user1_client, method)(url, *args, format='json', secure=True, **kwargs)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def assertMinimalLookup(self, sql, event):
+        self.assertTrue(sql.startswith('SELECT'))
+        self.assertIn('WHERE "events_event"."id" = {0}'.format(event.pk), sql)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('GROUP BY', sql)
+        self.assertNotIn('ORDER BY', sql)
+        self.assertNotIn('events_event_attendees', sql)
+
+    def test_list_sql(self):
+        response, queries = self.capture('get', '/api/event/')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(any('COUNT("events_event_attendees"."user_id")' in sql and 'GROUP BY' in sql and
+                            'ORDER BY "events_event"."date_time"' in sql for sql in queries))
+
+    def test_partial_update_sql(self):
+        response, queries = self.capture('patch', reverse('event-detail', args=(self.event.pk,)), {'title': 'New'})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertMinimalLookup(queries[0], self.event)
+        # The organiser is joined for the response rather than fetched separately
+        self.assertIn('INNER JOIN "users_user"', queries[0])
+        self.assertTrue(queries[1].startswith('UPDATE "events_event"'))
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(response.data['organiser'], 'user1@events.com')
+
+    def test_update_sql(self):
+        response, queries = self.capture('put', reverse('event-detail', args=(self.event.pk,)),
+                                         {'title': 'New', 'description': 'Event Desc. 1',
+                                          'date_time': self.event.date_time.isoformat()})
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertMinimalLookup(queries[0], self.event)
+        self.assertTrue(queries[1].startswith('UPDATE "events_event"'))
+
+    def test_destroy_sql(self):
+        response, queries = self.capture('delete', reverse('event-detail', args=(self.event.pk,)))
+        self.assertEqual(response.status_code, HTTP_204_NO_CONTENT)
+        self.assertMinimalLookup(queries[0], self.event)
+        self.assertNotIn('users_user', queries[0])
+        self.assertTrue(all(sql.startswith('DELETE') for sql in queries[1:]))
+
+    def test_update_ignores_list_filter(self):
+        # The past events filter is a UNION, which can't be filtered by get_object()
+        response = self.user1_client.patch(reverse('event-detail', args=(self.past_event.pk,)) + '?filter=p',
+                                           {'title': 'New'}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(Event.objects.get(pk=self.past_event.pk).title, 'New')
+
+    def test_update_invalid_event(self):
+        response = self.user1_client.patch(reverse('event-detail', args=(99999,)), {'title': 'New'}, format='json',
+                                           secure=True)
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+
+class TestApiAuthenticationQueries(TestCase):
+    """
+    Check the number of queries issued by /api/event/ for a session authenticated user. The events list itself costs
+    2 queries (count + page) plus 1 per organiser, so 5 for the 3 events below.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        for i in range(3):
+            Event.objects.create(title='Event {0}'.format(i),
+                                 description='Event Desc.',
+                                 date_time=datetime.now() + timedelta(hours=2),
+                                 organiser=self.user1)
+        self.client = APIClient()
+
+    def _get_event_list(self):
+        # The first request after login populates the User cache
+        self.client.login(email='user1@events.com', password='password')
+        self.client.get('/api/event/', {}, format='json', secure=True)
+        return self.client.get('/api/event/', {}, format='json', secure=True)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db',
+                       AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'])
+    def test_event_list_queries_db_session_uncached_user(self):
+        self.client.login(email='user1@events.com', password='password')
+        with self.assertNumQueries(8):
+            response = self.client.get('/api/event/', {}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_event_list_queries_db_session(self):
+        self._get_event_list()
+        with self.assertNumQueries(7):
+            self.client.get('/api/event/', {}, format='json', secure=True)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_event_list_queries_cached_db_session(self):
+        self._get_event_list()
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/event/', {}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_event_list_queries_signed_cookie_session(self):
+        self._get_event_list()
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/event/', {}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_event_list_password_change_logs_out(self):
+        self._get_event_list()
+        self.user1.set_password('new password')
+        self.user1.save()
+        response = self.client.get('/api/event/', {}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+
+
+class FakeClock(object):
+    """
+    Replaces time.time() in the throttles, so that the tests control how much time has passed
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+THROTTLE_RATES = {
+    'user': '5/min',
+    'event_list': '3/min',
+    'event_rsvp': '2/min',
+}
+
+
+@override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=THROTTLE_RATES))
+class TestApiThrottling(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.event = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(days=1),
+                                          organiser=self.user2)
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+        self.user2_client = APIClient()
+        self.user2_client.force_authenticate(user=self.user2)
+
+        self.clock = FakeClock()
+        patcher = mock.patch.object(TokenBucketThrottle, 'timer', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def list_events(self, client=None):
+        return (client or self.user1_client).get('/api/event/', {}, format='json', secure=True)
+
+    def attend(self):
+        return self.user1_client.post(reverse('event-attend', args=(self.event.id,)), {}, format='json', secure=True)
+
+    def unattend(self):
+        return self.user1_client.post(reverse('event-unattend', args=(self.event.id,)), {}, format='json',
+                                      secure=True)
+
+    def test_list_burst_then_throttled(self):
+        for _ in range(3):
+            self.assertEqual(self.list_events().status_code, HTTP_200_OK)
+        response = self.list_events()
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        # One token is refilled every 20 seconds
+        self.assertEqual(response['Retry-After'], '20')
+
+    def test_retry_after_counts_partial_refill(self):
+        for _ in range(3):
+            self.list_events()
+        self.clock.advance(15)
+        response = self.list_events()
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_tokens_refill(self):
+        for _ in range(3):
+            self.list_events()
+        self.clock.advance(20)
+        self.assertEqual(self.list_events().status_code, HTTP_200_OK)
+        self.assertEqual(self.list_events().status_code, HTTP_429_TOO_MANY_REQUESTS)
+        # The bucket never holds more than 3 tokens, however long it has been idle
+        self.clock.advance(3600)
+        for _ in range(3):
+            self.assertEqual(self.list_events().status_code, HTTP_200_OK)
+        self.assertEqual(self.list_events().status_code, HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_throttled_request_runs_no_queries(self):
+        for _ in range(3):
+            self.list_events()
+        with self.assertNumQueries(0):
+            response = self.list_events()
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_per_user(self):
+        for _ in range(3):
+            self.list_events()
+        self.assertEqual(self.list_events().status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.list_events(self.user2_client).status_code, HTTP_200_OK)
+
+    def test_attend_and_unattend_share_bucket(self):
+        self.assertEqual(self.attend().status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(self.unattend().status_code, HTTP_202_ACCEPTED)
+        response = self.attend()
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        # Other endpoints have their own bucket
+        self.assertEqual(self.list_events().status_code, HTTP_200_OK)
+
+    def test_user_rate_applies_to_all_endpoints(self):
+        detail = reverse('event-detail', args=(self.event.id,))
+        for _ in range(5):
+            self.assertEqual(self.user1_client.get(detail, format='json', secure=True).status_code, HTTP_200_OK)
+        response = self.user1_client.get(detail, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '12')
+
+    def test_rate_none_disables_throttle(self):
+        rates = dict(THROTTLE_RATES, event_list=None, user=None)
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            for _ in range(10):
+                self.assertEqual(self.list_events().status_code, HTTP_200_OK)
+
+
+@override_settings(API_TOKEN_AUTHENTICATION=True)
+class TestApiTokenAuthentication(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        for i in range(3):
+            Event.objects.create(title='Event {0}'.format(i),
+                                 description='Event Desc.',
+                                 date_time=datetime.now() + timedelta(hours=2),
+                                 organiser=self.user1)
+        self.client = APIClient(enforce_csrf_checks=True)
+
+    def list_events(self, token=None):
+        token = token or get_api_token(self.user1)
+        return self.client.get('/api/event/', {}, format='json', secure=True, HTTP_AUTHORIZATION='Bearer ' + token)
+
+    def test_event_list(self):
+        response = self.list_events()
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+
+    def test_event_list_queries(self):
+        # The first request populates the User cache, after which only the events are queried. A database session
+        # costs one more query (see TestApiAuthenticationQueries).
+        token = get_api_token(self.user1)
+        self.list_events(token)
+        with self.assertNumQueries(6):
+            response = self.list_events(token)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_no_csrf_token_needed(self):
+        event = Event.objects.create(title='Event', description='Event Desc.',
+                                     date_time=datetime.now() + timedelta(hours=2), organiser=self.user1)
+        response = self.client.post(reverse('event-attend', args=(event.id,)), {}, format='json', secure=True,
+                                    HTTP_AUTHORIZATION='Bearer ' + get_api_token(self.user1))
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+
+    def test_invalid_token(self):
+        token = get_api_token(self.user1)
+        self.assertEqual(self.list_events(token[:-1]).status_code, HTTP_403_FORBIDDEN)
+        self.assertEqual(self.list_events('2' + token[1:]).status_code, HTTP_403_FORBIDDEN)
+        self.assertEqual(self.list_events('{0} extra'.format(token)).status_code, HTTP_403_FORBIDDEN)
+
+    def test_expired_token(self):
+        with mock.patch('time.time', return_value=time.time() - 11):
+            token = get_api_token(self.user1)
+        with self.settings(API_TOKEN_MAX_AGE=10):
+            self.assertEqual(self.list_events(token).status_code, HTTP_403_FORBIDDEN)
+        self.assertEqual(self.list_events(token).status_code, HTTP_200_OK)
+
+    def test_revoked_token(self):
+        token = get_api_token(self.user1)
+        self.assertEqual(self.list_events(token).status_code, HTTP_200_OK)
+        revoke_api_tokens(self.user1)
+        self.assertEqual(self.list_events(token).status_code, HTTP_403_FORBIDDEN)
+        self.assertEqual(self.list_events(get_api_token(self.user1)).status_code, HTTP_200_OK)
+
+    def test_inactive_user(self):
+        token = get_api_token(self.user1)
+        self.list_events(token)
+        self.user1.is_active = False
+        self.user1.save()
+        self.assertEqual(self.list_events(token).status_code, HTTP_403_FORBIDDEN)
+
+    @override_settings(API_TOKEN_AUTHENTICATION=False)
+    def test_disabled(self):
+        self.assertEqual(self.list_events().status_code, HTTP_403_FORBIDDEN)
+
+    def test_api_token_command(self):
+        out = StringIO()
+        call_command('api_token', 'user1@events.com', stdout=out)
+        token = out.getvalue().strip()
+        self.assertEqual(self.list_events(token).status_code, HTTP_200_OK)
+        err = StringIO()
+        call_command('api_token', 'user1@events.com', revoke=True, stdout=StringIO(), stderr=err)
+        self.assertEqual(self.list_events(token).status_code, HTTP_403_FORBIDDEN)
+        # The tests use the per-process LocMemCache
+        self.assertIn('per process', err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('api_token', 'nobody@events.com', stdout=StringIO())
+
+
+class TestApiBatch(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.events = []
+        for i in range(5):
+            event = Event.objects.create(title='Event {0}'.format(i),
+                                         description='Event Desc.',
+                                         date_time=datetime.now() + timedelta(hours=2),
+                                         organiser=self.user1 if i % 2 else self.user2)
+            event.attendees.add(self.user2)
+            self.events.append(event)
+        self.events[0].attendees.add(self.user1)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user1)
+
+    def batch(self, ids):
+        return self.client.get(reverse('event-batch'), {'ids': ','.join(str(pk) for pk in ids)}, format='json',
+                               secure=True)
+
+    def test_batch_matches_retrieve(self):
+        ids = [self.events[3].pk, self.events[0].pk]
+        response = self.batch(ids)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['not_found'], [])
+        expected = [self.client.get(reverse('event-detail', args=(pk,)), format='json', secure=True).data
+                    for pk in ids]
+        self.assertEqual(response.data['results'], expected)
+        self.assertTrue(response.data['results'][0]['is_organiser'])
+        self.assertFalse(response.data['results'][0]['is_attending'])
+        self.assertFalse(response.data['results'][1]['is_organiser'])
+        self.assertTrue(response.data['results'][1]['is_attending'])
+
+    def test_batch_constant_queries(self):
+        with CaptureQueriesContext(connection) as one:
+            self.batch([self.events[0].pk])
+        with CaptureQueriesContext(connection) as five:
+            self.batch([event.pk for event in self.events])
+        self.assertEqual(len(one), len(five))
+
+    def test_batch_archived_and_not_found(self):
+        Event.objects.filter(pk=self.events[1].pk).update(date_time=datetime.now() - timedelta(days=100))
+        archive_events(days=99)
+        response = self.batch([self.events[1].pk, 8458546, self.events[2].pk, self.events[2].pk])
+        self.assertEqual([event['id'] for event in response.data['results']], [self.events[1].pk, self.events[2].pk])
+        self.assertTrue(response.data['results'][0]['is_in_past'])
+        self.assertEqual(response.data['results'][0]['attendees'], [{'email': 'user2@events.com',
+                                                                     'friendly_name': 'user2'}])
+        self.assertEqual(response.data['not_found'], [8458546])
+
+    def test_batch_invalid_ids(self):
+        for ids in ('', '1,a', '1,,2'):
+            response = self.client.get(reverse('event-batch'), {'ids': ids}, format='json', secure=True)
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+            self.assertIn('ids', response.data)
+
+    def test_batch_too_many_ids(self):
+        response = self.batch(range(1, EventViewSet.max_batch_ids + 2))
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch(range(1, EventViewSet.max_batch_ids + 1)).status_code, HTTP_200_OK)
@@ -0,0 +1,93 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle. Each user has a bucket per scope that holds up to N tokens (for a rate of 'N/period'), which
+    refills continuously at N tokens per period. A request takes a token, and is throttled if the bucket is empty. This
+    allows short bursts of up to N requests while limiting the sustained rate, and unlike DRF's sliding window only
+    stores two numbers per bucket in the cache (rather than a timestamp per request).
+
+    The buckets are stored in the default cache, which must be shared between the workers (e.g. memcached or Redis)
+    for the limits to apply across them. As with DRF's throttles the read and write aren't atomic, so concurrent
+    requests may occasionally be let through when the bucket is almost empty.
+    """
+    scope = None
+
+    def get_rate(self):
+        """
+        Return the rate for the scope. This is read from the settings on each request, rather than when the module is
+        imported, so that it can be overridden in tests.
+        """
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured("No default throttle rate set for '{0}' scope".format(self.scope))
+
+    def get_cache_key(self, request, view):
+        """
+        Return the key of the bucket for the current user (or the client IP address if the user isn't logged in)
+        """
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        """
+        Take a token from the user's bucket, returning False if it is empty
+        """
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill_rate = self.num_requests / self.duration
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - updated) * refill_rate)
+        if tokens < 1:
+            # Time until a whole token is available
+            self.wait_time = (1 - tokens) / refill_rate
+            return False
+
+        # An untouched bucket is full after one period, at which point it doesn't need to be stored
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        """
+        Return the number of seconds until the next request would be allowed, used for the Retry-After header
+        """
+        return self.wait_time
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits the overall rate of API requests per user (the 'user' rate)
+    """
+    scope = 'user'
+
+
+class ActionTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits the rate of requests per user to individual endpoints of a viewset. The viewset maps actions to scopes with
+    a throttle_scopes dictionary (e.g. {'attend': 'event_rsvp'}), and actions without a scope are not throttled by it.
+    Actions that share a scope share a bucket.
+    """
+
+    def __init__(self):
+        # The rate depends on the action, so it can't be determined until the view calls allow_request()
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scopes', {}).get(getattr(view, 'action', None))
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super(ActionTokenBucketThrottle, self).allow_request(request, view)
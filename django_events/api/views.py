@@ -1,13 +1,20 @@
+from django.utils.text import slugify
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.status import HTTP_202_ACCEPTED, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
+from rest_framework.exceptions import ValidationError
+from rest_framework.status import HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
 
 from events.models import Event, EventQuerySet
+from events.geo import parse_near
+from events.tags import get_tag_counts
+from events.recurrence import parse_occurrence, get_occurrence_detail, attend_occurrence, unattend_occurrence
+from events.waitlist import attend_event, unattend_event, WAITLISTED
 from events.serializers import EventListSerializer, EventDetailSerializer
 from .permissions import IsEventOrganiser
+from .throttling import UserTokenBucketThrottle, ActionTokenBucketThrottle
 
 
 @api_view(['GET'])
@@ -23,40 +30,135 @@ def api_root(request, format=None):
 class EventViewSet(ModelViewSet):
     serializer_class = EventListSerializer
     permission_classes = [IsAuthenticated, IsEventOrganiser]
+    throttle_classes = [UserTokenBucketThrottle, ActionTokenBucketThrottle]
+    # Rates for these scopes are set in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']. Throttling happens before the
+    # queryset is evaluated, so a throttled request costs a cache lookup rather than the annotated queries.
+    throttle_scopes = {
+        'list': 'event_list',
+        'batch': 'event_list',
+        'tags': 'event_list',
+        'attend': 'event_rsvp',
+        'unattend': 'event_rsvp',
+    }
 
     """
-    Lookup dictionary for string-based filter
+    Lookup dictionary for string-based filter, of the names of the EventQuerySet methods
     """
     filter_func_lookup = {
-        'o': Event.objects.get_events_organised_by_user,
-        'a': Event.objects.get_events_attended_by_user,
-        'p': Event.objects.get_events_in_past
+        'o': 'get_events_organised_by_user',
+        'a': 'get_events_attended_by_user',
+        'p': 'get_past_occurrences'
+    }
+
+    """
+    Querysets for the actions that write to a single event. They only need to find the row (and the organiser for the
+    response), so they skip the attendee count, the GROUP BY and the ordering of the list querysets. They aren't
+    restricted by the list filter either, the same as the HTML edit view.
+    """
+    write_querysets = {
+        'update': lambda: Event.objects.select_related('organiser'),
+        'partial_update': lambda: Event.objects.select_related('organiser'),
+        'destroy': lambda: Event.objects.all(),
     }
 
+    # Most events that can be requested at once from the batch action
+    max_batch_ids = 100
+
     def get_queryset(self):
         """
-        Return the queryset, calling a specific function depending of the filter the user has provided
+        Return the queryset, calling a specific function depending of the filter the user has provided. If 'near' is
+        given (as latitude,longitude) then only the events within 'radius' km of it are included, and if 'tag' is given
+        only the events with that tag. The write actions use a minimal queryset instead.
         """
+        get_write_queryset = self.write_querysets.get(self.action)
+        if get_write_queryset:
+            return get_write_queryset()
+
+        query_set = Event.objects.all()
+        near = self.request.query_params.get('near')
+        if near:
+            try:
+                query_set = query_set.near(*parse_near(near, self.request.query_params.get('radius')))
+            except ValueError as e:
+                raise ValidationError({'near': [str(e)]})
+        # Slugified like the tags are when they are saved, so that "Live Music" finds live-music
+        tag = slugify(self.request.query_params.get('tag', ''))
+        if tag:
+            query_set = query_set.tagged(tag)
         # Check if a filter has been specified
         query_filter = self.request.query_params.get('filter', '')
         # Get the function we need to call
-        filter_func = self.filter_func_lookup.get(query_filter, Event.objects.get_current_events)
+        filter_func = getattr(query_set, self.filter_func_lookup.get(query_filter, 'get_current_occurrences'))
         # Obtain the query set
         query_set = filter_func(self.request.user)
         return query_set
 
+    def get_event_detail(self, pk):
+        """
+        Return the event from EventQuerySet.get_event(), or if the 'occurrence' query parameter is given, that
+        occurrence of the (recurring) event with its own attendees
+
+        :param pk: ID of the event
+        :return: The Event or Occurrence, or None if it doesn't exist
+        """
+        event = Event.objects.get_event(pk=pk, user=self.request.user)
+        occurrence = self.request.query_params.get('occurrence')
+        if not event or occurrence is None:
+            return event
+        date_time = parse_occurrence(occurrence)
+        if date_time is None or not event.recurrence:
+            return None
+        return get_occurrence_detail(event, date_time, self.request.user)
+
     def retrieve(self, request, *args, **kwargs):
         """
         Override the retrieve() so that the EventQuerySet.get_event() is used as this adds annotations that we return
         in the response. We also return EventDetailSerializer which provides more information (namely the names/emails
         of the attendees)
         """
-        event = Event.objects.get_event(user=self.request.user, **self.kwargs)
+        event = self.get_event_detail(self.kwargs['pk'])
         if not event:
             return Response(status=HTTP_404_NOT_FOUND)
         serializer = EventDetailSerializer(event)
         return Response(serializer.data)
 
+    def get_batch_ids(self):
+        """
+        Parse the 'ids' query parameter of the batch action
+
+        :return: The IDs, without duplicates and in the order given
+        :rtype: list
+        :raises ValidationError: if the IDs are missing, invalid or there are too many of them
+        """
+        try:
+            ids = [int(value) for value in self.request.query_params.get('ids', '').split(',')]
+        except ValueError:
+            raise ValidationError({'ids': ['ids must be a comma separated list of event IDs']})
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.max_batch_ids:
+            raise ValidationError({'ids': ['At most {0} events can be requested at once'.format(self.max_batch_ids)]})
+        return ids
+
+    @action(detail=False, methods=['GET'])
+    def batch(self, request, *args, **kwargs):
+        """
+        API endpoint to retrieve several events by ID (?ids=1,2,3) in one request, with the same details as retrieve().
+        The events are loaded with EventQuerySet.get_events(), so the number of queries doesn't depend on the number of
+        events. IDs that don't exist are returned in 'not_found'.
+        """
+        ids = self.get_batch_ids()
+        events = Event.objects.get_events(ids, request.user)
+        serializer = EventDetailSerializer([events[pk] for pk in ids if pk in events], many=True)
+        return Response({'results': serializer.data, 'not_found': [pk for pk in ids if pk not in events]})
+
+    @action(detail=False, methods=['GET'])
+    def tags(self, request, *args, **kwargs):
+        """
+        API endpoint to list the tags of the current events, with the number of events with each tag. The counts are
+        made with a single grouped query, and cached (see events.tags.get_tag_counts()).
+        """
+        return Response({'results': [{'name': name, 'events_count': count} for name, count in get_tag_counts()]})
+
     def perform_create(self, serializer):
         """
         Custom override to patch in the organiser as the current user
@@ -66,27 +168,40 @@ class EventViewSet(ModelViewSet):
     @action(detail=True, methods=['POST'])
     def attend(self, request, pk, *args, **kwargs):
         """
-        API endpoint to mark the current user as attending a given event
+        API endpoint to mark the current user as attending a given event, or an occurrence of a recurring event. If the
+        event is full then the user is added to its waitlist instead.
         """
-        event = Event.objects.get_event(pk=pk, user=self.request.user)
+        event = self.get_event_detail(pk)
         if not event:
             return Response(status=HTTP_404_NOT_FOUND)
+        if event.recurrence and not event.occurrence:
+            return Response(status=HTTP_400_BAD_REQUEST, data={'detail': 'An occurrence is required'})
         if event.is_in_past:
             return Response(status=HTTP_403_FORBIDDEN, data={'detail': 'Cannot attend an event in the past'})
 
-        event.attendees.add(request.user)
+        if event.occurrence:
+            attend_occurrence(event.event, event.occurrence, request.user)
+        elif attend_event(event, request.user) == WAITLISTED:
+            return Response(status=HTTP_202_ACCEPTED,
+                            data={'detail': 'The event is full, added to the waitlist', 'waitlisted': True})
         return Response(status=HTTP_202_ACCEPTED, data={'detail': 'Successfully attended'})
 
     @action(detail=True, methods=['POST'])
     def unattend(self, request, *args, **kwargs):
         """
-        API endpoint to remove the current user as an attendee of a given event
+        API endpoint to remove the current user as an attendee of a given event (or from its waitlist), or an occurrence
+        of a recurring event
         """
-        event = Event.objects.get_event(user=self.request.user, **self.kwargs)
+        event = self.get_event_detail(self.kwargs['pk'])
         if not event:
             return Response(status=HTTP_404_NOT_FOUND)
+        if event.recurrence and not event.occurrence:
+            return Response(status=HTTP_400_BAD_REQUEST, data={'detail': 'An occurrence is required'})
         if event.is_in_past:
             return Response(status=HTTP_403_FORBIDDEN, data={'detail': 'Cannot unattend an event in the past'})
 
-        event.attendees.remove(request.user)
+        if event.occurrence:
+            unattend_occurrence(event.event, event.occurrence, request.user)
+        elif event.is_attending or event.is_waitlisted:
+            unattend_event(event, request.user)
         return Response(status=HTTP_202_ACCEPTED, data={'detail': 'Successfully unattended'})
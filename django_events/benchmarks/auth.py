@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.shortcuts import reverse
+from django.db import transaction
+from django.test import Client, override_settings
+
+from api.authentication import get_api_token
+from users.hashers import get_policy_hashers
+from .seeding import PERF_EMAIL_DOMAIN, PERF_USER_PASSWORD
+
+SIGNUP_EMAIL = 'signup@{0}'.format(PERF_EMAIL_DOMAIN)
+# Must pass the AUTH_PASSWORD_VALIDATORS
+SIGNUP_PASSWORD = 'Benchmark-Signup-2468'
+LOGIN_EMAIL = 'login@{0}'.format(PERF_EMAIL_DOMAIN)
+API_EMAIL = 'api@{0}'.format(PERF_EMAIL_DOMAIN)
+# The SESSION_MODES compared with API tokens
+API_SESSION_MODES = ('db', 'cached_db', 'signed_cookies')
+
+
+class AuthBenchmark(object):
+    """
+    Benchmark cases for signing up and logging in through the HTML views, with each password hashing policy. Hashing
+    the password is most of the cost of both, and a sync worker can only handle one request at a time, so the number
+    of signups/logins per second that one worker can handle is 1000 / the median time in ms.
+
+    The API cases compare authenticating an API request with a session (in each of API_SESSION_MODES) against an API
+    token. They list the events of a user who hasn't organised any, so that the cost is mostly authentication.
+
+    The cases are rolled back, so no users are left behind.
+    """
+
+    def __init__(self, runner, policies=None):
+        """
+        :param runner: BenchmarkRunner to run the cases with
+        :param policies: Names of the policies to benchmark, defaults to all of them
+        :type policies: list
+        """
+        self.runner = runner
+        self.policies = policies or list(settings.PASSWORD_HASHER_POLICIES)
+        self.client = Client()
+
+    def run(self):
+        """
+        Run all the cases
+
+        :return: The runner's results
+        :rtype: dict
+        """
+        for policy in self.policies:
+            with override_settings(PASSWORD_HASHERS=get_policy_hashers(policy)):
+                self.run_signup(policy)
+                self.run_login(policy)
+        self.run_api()
+        return self.runner.results
+
+    def _post(self, url, data):
+        response = self.client.post(url, data, secure=True)
+        assert response.status_code == 302, '{0} returned {1}'.format(url, response.status_code)
+
+    def run_signup(self, policy):
+        data = {'email': SIGNUP_EMAIL, 'password1': SIGNUP_PASSWORD, 'password2': SIGNUP_PASSWORD}
+        self.runner.run('auth.signup[{0}]'.format(policy), lambda: self._post(reverse('user_register'), data),
+                        setup=self.client.logout, rollback=True)
+
+    def run_login(self, policy):
+        def setup():
+            self.client.logout()
+            get_user_model().objects.create_user(email=LOGIN_EMAIL, password=PERF_USER_PASSWORD)
+
+        data = {'username': LOGIN_EMAIL, 'password': PERF_USER_PASSWORD}
+        self.runner.run('auth.login[{0}]'.format(policy), lambda: self._post(reverse('user_login'), data),
+                        setup=setup, rollback=True)
+
+    def _get(self, client, url, data):
+        response = client.get(url, data, secure=True)
+        assert response.status_code == 200, '{0} returned {1}'.format(url, response.status_code)
+
+    def run_api(self):
+        url = reverse('event-list')
+        data = {'filter': 'o'}
+        # Every case is requested many times by the same user, so that no request is throttled
+        rates = dict.fromkeys(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), '1000000/s')
+        with transaction.atomic(), \
+                override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            user = get_user_model().objects.create_user(email=API_EMAIL, password=PERF_USER_PASSWORD)
+            for mode in API_SESSION_MODES:
+                with override_settings(SESSION_ENGINE=settings.SESSION_MODES[mode]):
+                    client = Client()
+                    client.force_login(user)
+                    self.runner.run('auth.api[session:{0}]'.format(mode), lambda: self._get(client, url, data))
+
+            with override_settings(API_TOKEN_AUTHENTICATION=True):
+                client = Client(HTTP_AUTHORIZATION='Bearer {0}'.format(get_api_token(user)))
+                self.runner.run('auth.api[token]', lambda: self._get(client, url, data))
+            transaction.set_rollback(True)
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.shortcuts import reverse
+from django.test import Client, override_settings
+
+from events.models import Event
+from django_events_management.middleware import SUPPORTED_ENCODINGS, compress
+from .suite import get_benchmark_event
+
+
+class CompressionBenchmark(object):
+    """
+    Benchmark cases for response compression (see django_events_management.middleware.CompressionMiddleware), on
+    representative API payloads: a page of the event list, the detail of the event with the most attendees and a batch
+    of a page of events, with the HTML events list for comparison.
+
+    The "identity" case times the uncompressed request. The case for each of the SUPPORTED_ENCODINGS times compressing
+    its response, which is the time the middleware adds to the request. Each result records the size of the response
+    and the time it would take to send at the given bandwidth, and the compressed cases record the bytes and time
+    saved: the transfer time saved less the time taken to compress.
+    """
+
+    def __init__(self, runner, bandwidth=10, page_size=30):
+        """
+        :param runner: BenchmarkRunner to run the cases with
+        :param bandwidth: Bandwidth of the client's connection in Mbit/s
+        :type bandwidth: float
+        :param page_size: Number of events in the batch
+        :type page_size: int
+        """
+        self.runner = runner
+        self.bandwidth = bandwidth
+        self.event = get_benchmark_event()
+        self.client = Client()
+        self.client.force_login(self.event.organiser)
+        batch_ids = Event.objects.order_by('pk').values_list('pk', flat=True)[:page_size]
+        self.payloads = {
+            'api.event.list': (reverse('event-list'), {}),
+            'api.event.retrieve': (reverse('event-detail', args=(self.event.pk,)), {}),
+            'api.event.batch': (reverse('event-batch'), {'ids': ','.join(str(pk) for pk in batch_ids)}),
+            'html.events_list': (reverse('events_list'), {}),
+        }
+
+    def run(self):
+        """
+        Run all the cases
+
+        :return: The runner's results
+        :rtype: dict
+        """
+        rates = dict.fromkeys(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), '1000000/s')
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            for name, (url, data) in self.payloads.items():
+                self.run_payload(name, url, data)
+        return self.runner.results
+
+    def _get(self, url, data, encoding):
+        response = self.client.get(url, data, secure=True, HTTP_ACCEPT_ENCODING=encoding)
+        assert response.status_code == 200, '{0} returned {1}'.format(url, response.status_code)
+        assert response.get('Content-Encoding', 'identity') == encoding, \
+            '{0} was not compressed with {1}'.format(url, encoding)
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def transfer_ms(self, size):
+        """
+        Return the time in ms to send a number of bytes at the benchmark's bandwidth
+        """
+        return size * 8 / (self.bandwidth * 1000)
+
+    def run_payload(self, name, url, data):
+        uncompressed = self.runner.run('compression.{0}[identity]'.format(name),
+                                       lambda: self._get(url, data, 'identity'))
+        content = self._get(url, data, 'identity')
+        uncompressed['bytes'] = len(content)
+        uncompressed['transfer_ms'] = self.transfer_ms(len(content))
+        for encoding in SUPPORTED_ENCODINGS:
+            # Only the compression is timed, as it is much quicker than the variation in the time of the whole request
+            result = self.runner.run('compression.{0}[{1}]'.format(name, encoding),
+                                     lambda: compress(content, encoding))
+            # The same bytes as the middleware sends
+            result['bytes'] = len(self._get(url, data, encoding))
+            result['transfer_ms'] = self.transfer_ms(result['bytes'])
+            result['bytes_saved'] = uncompressed['bytes'] - result['bytes']
+            result['time_saved_ms'] = uncompressed['transfer_ms'] - result['transfer_ms'] - result['median_ms']
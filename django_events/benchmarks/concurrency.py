@@ -0,0 +1,150 @@
+import os
+import time
+import random
+import datetime
+import tempfile
+import multiprocessing
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction, OperationalError
+
+from events.models import Event
+
+CONCURRENCY_DB_ALIAS = 'sqlite_concurrency'
+
+# SQLite's defaults, as used before the connection tuning was added
+DEFAULT_SQLITE_OPTIONS = {
+    'transaction_mode': 'DEFERRED',
+    'pragmas': {'journal_mode': 'DELETE'},
+}
+
+ROLE_WRITER = 'writer'
+ROLE_READER = 'reader'
+
+
+def _create_database(path, options, users, events):
+    """
+    Create a SQLite database containing just the users and events tables, with some data in them
+
+    :param path: Path of the database file
+    :param options: OPTIONS for the database connection
+    :param users: Number of users to create
+    :param events: Number of (future) events to create
+    """
+    connections.databases[CONCURRENCY_DB_ALIAS] = {
+        'ENGINE': 'django_events_management.sqlite_backend',
+        'NAME': path,
+        'OPTIONS': options,
+    }
+    connection = connections[CONCURRENCY_DB_ALIAS]
+    user_model = get_user_model()
+    with connection.schema_editor() as schema_editor:
+        schema_editor.create_model(user_model)
+        schema_editor.create_model(Event)
+
+    user_model.objects.using(CONCURRENCY_DB_ALIAS).bulk_create(
+        user_model(email='user{0}@concurrency.events.com'.format(i), password='!') for i in range(users))
+    organiser = user_model.objects.using(CONCURRENCY_DB_ALIAS).first()
+    now = datetime.datetime.now()
+    Event.objects.using(CONCURRENCY_DB_ALIAS).bulk_create(
+        Event(title='Event {0}'.format(i), organiser=organiser, date_time=now + datetime.timedelta(days=1 + i))
+        for i in range(events))
+
+    # The worker processes must open their own connections
+    connection.close()
+
+
+def _worker(role, duration, seed, results):
+    """
+    Run in a child process. Writers repeatedly toggle the attendance of a random user at a random event, in the same
+    way as attend/unattend (a read then a write in one transaction). Readers repeatedly load the first page of the
+    current events.
+    """
+    rnd = random.Random(seed)
+    through = Event.attendees.through
+    user_ids = list(get_user_model().objects.using(CONCURRENCY_DB_ALIAS).values_list('id', flat=True))
+    event_ids = list(Event.objects.using(CONCURRENCY_DB_ALIAS).values_list('id', flat=True))
+
+    operations = errors = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        try:
+            if role == ROLE_WRITER:
+                event_id, user_id = rnd.choice(event_ids), rnd.choice(user_ids)
+                with transaction.atomic(using=CONCURRENCY_DB_ALIAS):
+                    attendance = through.objects.using(CONCURRENCY_DB_ALIAS).filter(event_id=event_id, user_id=user_id)
+                    if attendance.exists():
+                        attendance.delete()
+                    else:
+                        attendance.create(event_id=event_id, user_id=user_id)
+            else:
+                list(Event.objects.using(CONCURRENCY_DB_ALIAS).get_current_events()[:30])
+            operations += 1
+        except OperationalError:
+            errors += 1
+
+    connections[CONCURRENCY_DB_ALIAS].close()
+    results.put((role, operations, errors))
+
+
+def run_concurrency_benchmark(options, writers=4, readers=4, duration=5.0, users=200, events=50):
+    """
+    Run parallel writer and reader processes (like gunicorn workers) against a new SQLite database using the given
+    connection OPTIONS, and measure their throughput and the number of errors (e.g. "database is locked")
+
+    Requires the "fork" multiprocessing start method, so is not supported on Windows.
+
+    :param options: OPTIONS for the database connection
+    :param writers: Number of writer processes
+    :param readers: Number of reader processes
+    :param duration: Number of seconds to run for
+    :param users: Number of users in the database
+    :param events: Number of events in the database
+    :return: Dictionary of writes/reads per second and write/read errors
+    :rtype: dict
+    """
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'concurrency.sqlite3')
+    try:
+        _create_database(path, options, users, events)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=_worker, args=(role, duration, index, results))
+                     for index, role in enumerate([ROLE_WRITER] * writers + [ROLE_READER] * readers)]
+        for process in processes:
+            process.start()
+        totals = {ROLE_WRITER: [0, 0], ROLE_READER: [0, 0]}
+        for _ in processes:
+            role, operations, errors = results.get()
+            totals[role][0] += operations
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+    finally:
+        connections[CONCURRENCY_DB_ALIAS].close()
+        del connections[CONCURRENCY_DB_ALIAS]
+        del connections.databases[CONCURRENCY_DB_ALIAS]
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    return {
+        'writes_per_second': totals[ROLE_WRITER][0] / duration,
+        'write_errors': totals[ROLE_WRITER][1],
+        'reads_per_second': totals[ROLE_READER][0] / duration,
+        'read_errors': totals[ROLE_READER][1],
+    }
+
+
+def compare_sqlite_options(**kwargs):
+    """
+    Run the concurrency benchmark with SQLite's default settings and with the tuned settings (SQLITE_OPTIONS)
+
+    :param kwargs: Arguments for run_concurrency_benchmark()
+    :return: Results keyed by "default" and "tuned"
+    :rtype: dict
+    """
+    return {
+        'default': run_concurrency_benchmark(DEFAULT_SQLITE_OPTIONS, **kwargs),
+        'tuned': run_concurrency_benchmark(settings.SQLITE_OPTIONS, **kwargs),
+    }
@@ -0,0 +1,105 @@
+import ssl
+import time
+import statistics
+import http.client
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+def _client(url, requests, keepalive, headers, context, timeout):
+    """
+    Run in a thread. Makes requests one after another, over one connection if keepalive is True, or a new connection
+    for each request otherwise (including the TLS handshake for an https URL).
+
+    :return: (latencies in ms, Counter of status codes, Counter of X-Cache-Status values, number of errors)
+    :rtype: tuple
+    """
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    headers = dict(headers, Connection='keep-alive' if keepalive else 'close')
+
+    def connect():
+        if parts.scheme == 'https':
+            return http.client.HTTPSConnection(parts.netloc, timeout=timeout, context=context)
+        return http.client.HTTPConnection(parts.netloc, timeout=timeout)
+
+    latencies, statuses, cache_statuses = [], Counter(), Counter()
+    errors = 0
+    connection = None
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = connect()
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if connection is not None:
+                connection.close()
+                connection = None
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status] += 1
+        cache_statuses[response.getheader('X-Cache-Status', 'none')] += 1
+        if not keepalive or response.will_close:
+            connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+    return latencies, statuses, cache_statuses, errors
+
+
+def run_load_test(url, requests=1000, concurrency=10, keepalive=True, headers=None, verify=True, timeout=30):
+    """
+    Request a URL from a number of concurrent clients and measure the throughput and latency, e.g. to compare NGINX
+    configurations. Each client is a thread making one request at a time.
+
+    :param url: http or https URL to request
+    :type url: str
+    :param requests: Total number of requests, split between the clients
+    :type requests: int
+    :param concurrency: Number of concurrent clients
+    :type concurrency: int
+    :param keepalive: If True each client reuses its connection, otherwise it opens a new one for each request
+    :type keepalive: bool
+    :param headers: Extra request headers, e.g. a session cookie
+    :type headers: dict
+    :param verify: If False the server's TLS certificate isn't checked (for the self-signed localhost certificate)
+    :type verify: bool
+    :param timeout: Socket timeout in seconds
+    :type timeout: float
+    :return: The results
+    :rtype: dict
+    """
+    context = ssl.create_default_context() if verify else ssl._create_unverified_context()
+    counts = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda count: _client(url, count, keepalive, headers or {}, context, timeout),
+                                    counts))
+    duration = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    statuses, cache_statuses = Counter(), Counter()
+    for _, client_statuses, client_cache_statuses, _ in results:
+        statuses.update(client_statuses)
+        cache_statuses.update(client_cache_statuses)
+    return {
+        'url': url,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'keepalive': keepalive,
+        'errors': sum(result[3] for result in results),
+        'duration_s': duration,
+        'requests_per_second': len(latencies) / duration,
+        'median_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'cache_statuses': dict(cache_statuses),
+    }
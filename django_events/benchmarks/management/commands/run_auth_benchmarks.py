@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from benchmarks.runner import BenchmarkRunner
+from benchmarks.auth import AuthBenchmark
+
+
+class Command(BaseCommand):
+    help = "Measures the latency of signing up and logging in with each password hashing policy, and of API requests " \
+           "authenticated with each session mode and with an API token, along with the number per second that a " \
+           "single sync worker can handle."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policies', nargs='+', choices=list(settings.PASSWORD_HASHER_POLICIES),
+                            help='Password hashing policies to benchmark, defaults to all of them')
+        parser.add_argument('--output', help='Optional JSON file to write the results to')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--warmup', type=int, default=2, help='Un-timed runs per case')
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmarks and prints the results
+        """
+        runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+        benchmark = AuthBenchmark(runner, options['policies'])
+        benchmark.run()
+
+        for name, result in sorted(runner.results.items()):
+            self.stdout.write('{0:<34} {1:>9.2f} ms median {2:>9.2f} ms p95 {3:>8.1f} /sec per worker'.format(
+                name, result['median_ms'], result['p95_ms'], 1000 / result['median_ms']))
+
+        if options['output']:
+            runner.write(options['output'], policies=benchmark.policies)
+            self.stdout.write('Results written to {0}'.format(options['output']))
@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand
+
+from benchmarks.runner import BenchmarkRunner, compare_results
+from benchmarks.suite import BenchmarkSuite, get_dataset_size
+
+
+class Command(BaseCommand):
+    help = "Measures the latency and number of queries of every EventQuerySet method, API endpoint and HTML view " \
+           "against the current database, and writes the results to a JSON file. Use seed_perf_data to generate a " \
+           "data set first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write the results to')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--warmup', type=int, default=2, help='Un-timed runs per case')
+        parser.add_argument('--compare', help='JSON file of previous results to compare against')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Fractional increase in median time that is reported as a regression')
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmarks, writes the results and optionally compares them with a previous run
+        """
+        runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+        BenchmarkSuite(runner).run()
+
+        for name, result in sorted(runner.results.items()):
+            self.stdout.write('{0:<50} {1:>9.2f} ms median {2:>9.2f} ms p95 {3:>4} queries'.format(
+                name, result['median_ms'], result['p95_ms'], result['queries']))
+
+        runner.write(options['output'], dataset=get_dataset_size())
+        self.stdout.write('Results written to {0}'.format(options['output']))
+
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                previous = json.load(previous_file)
+            self.stdout.write('Compared with {0} ({1}):'.format(options['compare'], previous.get('commit')))
+            for name, old_median, new_median, change, query_change, regressed in compare_results(
+                    previous, runner.to_dict(), options['threshold']):
+                self.stdout.write('{0:<50} {1:>9.2f} -> {2:>9.2f} ms ({3:+.0%}) {4:+d} queries{5}'.format(
+                    name, old_median, new_median, change, query_change, '  REGRESSION' if regressed else ''))
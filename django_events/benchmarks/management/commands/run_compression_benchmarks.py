@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.runner import BenchmarkRunner
+from benchmarks.compression import CompressionBenchmark
+from benchmarks.suite import get_dataset_size
+
+
+class Command(BaseCommand):
+    help = "Measures the size of representative API and HTML responses uncompressed and with each supported " \
+           "compression, the time taken to serve them uncompressed and to compress them, and the bytes and time " \
+           "saved on a connection of the given bandwidth. Use seed_perf_data to generate a data set first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bandwidth', type=float, default=10,
+                            help="Bandwidth of the client's connection in Mbit/s")
+        parser.add_argument('--output', help='Optional JSON file to write the results to')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--warmup', type=int, default=2, help='Un-timed runs per case')
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmarks and prints the results
+        """
+        runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+        CompressionBenchmark(runner, options['bandwidth']).run()
+
+        for name, result in sorted(runner.results.items()):
+            self.stdout.write('{0:<40} {1:>9} bytes {2:>9.2f} ms median {3:>9.2f} ms transfer{4}'.format(
+                name, result['bytes'], result['median_ms'], result['transfer_ms'],
+                '  saved {0} bytes, {1:.2f} ms'.format(result['bytes_saved'], result['time_saved_ms'])
+                if 'bytes_saved' in result else ''))
+
+        if options['output']:
+            runner.write(options['output'], dataset=get_dataset_size(), bandwidth=options['bandwidth'])
+            self.stdout.write('Results written to {0}'.format(options['output']))
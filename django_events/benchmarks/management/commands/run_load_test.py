@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.load import run_load_test
+
+
+class Command(BaseCommand):
+    help = "Requests a URL from a number of concurrent clients and reports the throughput, latency and response " \
+           "statuses, including NGINX's X-Cache-Status. Use it against a running deployment (e.g. " \
+           "https://localhost/) to compare configurations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL to request')
+        parser.add_argument('--requests', type=int, default=1000, help='Total number of requests')
+        parser.add_argument('--concurrency', type=int, default=10, help='Number of concurrent clients')
+        parser.add_argument('--no-keepalive', action='store_true',
+                            help='Open a new connection for every request rather than reusing it')
+        parser.add_argument('--header', action='append', default=[],
+                            help='Extra request header, e.g. "Cookie: sessionid=..." (may be repeated)')
+        parser.add_argument('--insecure', action='store_true',
+                            help="Don't check the TLS certificate, e.g. for the self-signed localhost certificate")
+        parser.add_argument('--output', help='Optional JSON file to write the results to')
+
+    def handle(self, *args, **options):
+        """
+        Runs the load test and prints the results
+        """
+        headers = {}
+        for header in options['header']:
+            name, separator, value = header.partition(':')
+            if not separator:
+                raise CommandError('Headers must be given as "Name: value"')
+            headers[name.strip()] = value.strip()
+
+        result = run_load_test(options['url'], requests=options['requests'], concurrency=options['concurrency'],
+                               keepalive=not options['no_keepalive'], headers=headers,
+                               verify=not options['insecure'])
+
+        self.stdout.write('{0} requests in {1:.2f}s, {2} errors'.format(
+            result['requests'], result['duration_s'], result['errors']))
+        if result['requests']:
+            self.stdout.write('{0:.1f} requests/sec, {1:.2f} ms median, {2:.2f} ms p95'.format(
+                result['requests_per_second'], result['median_ms'], result['p95_ms']))
+        self.stdout.write('Statuses: {0}'.format(', '.join(
+            '{0} x{1}'.format(status, count) for status, count in result['statuses'].items())))
+        self.stdout.write('Cache: {0}'.format(', '.join(
+            '{0} x{1}'.format(status, count) for status, count in sorted(result['cache_statuses'].items()))))
+
+        if options['output']:
+            with open(options['output'], 'w') as results_file:
+                json.dump(result, results_file, indent=2)
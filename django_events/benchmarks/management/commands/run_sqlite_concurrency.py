@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand
+
+from benchmarks.concurrency import compare_sqlite_options
+
+
+class Command(BaseCommand):
+    help = "Runs parallel attendance writers against event list readers on a temporary SQLite database, once with " \
+           "SQLite's default settings and once with the tuned settings (SQLITE_OPTIONS), and reports the " \
+           "throughput and number of errors of each."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Number of writer processes')
+        parser.add_argument('--readers', type=int, default=4, help='Number of reader processes')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run each configuration for')
+        parser.add_argument('--output', help='Optional JSON file to write the results to')
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmark and prints the results
+        """
+        results = compare_sqlite_options(writers=options['writers'],
+                                         readers=options['readers'],
+                                         duration=options['duration'])
+
+        self.stdout.write('{0:<10} {1:>12} {2:>14} {3:>12} {4:>14}'.format(
+            'Settings', 'Writes/sec', 'Write errors', 'Reads/sec', 'Read errors'))
+        for name, result in results.items():
+            self.stdout.write('{0:<10} {1:>12.1f} {2:>14} {3:>12.1f} {4:>14}'.format(
+                name, result['writes_per_second'], result['write_errors'], result['reads_per_second'],
+                result['read_errors']))
+
+        if options['output']:
+            with open(options['output'], 'w') as results_file:
+                json.dump(results, results_file, indent=2)
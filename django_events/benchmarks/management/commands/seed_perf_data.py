@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.seeding import PerfDataGenerator, DISTRIBUTIONS, DISTRIBUTION_UNIFORM, PERF_USER_PASSWORD
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic data set of users, events, attendance and tags for performance testing. " \
+           "All users created have the password '{0}'.".format(PERF_USER_PASSWORD)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--events', type=int, default=10000, help='Number of events to create')
+        parser.add_argument('--attendees', type=int, default=10, help='Average number of attendees per event')
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default=DISTRIBUTION_UNIFORM,
+                            help='Distribution of attendees across events')
+        parser.add_argument('--past-ratio', type=float, default=0.5, help='Fraction of events in the past')
+        parser.add_argument('--located-ratio', type=float, default=0.8, help='Fraction of events with a location')
+        parser.add_argument('--tags', type=float, default=1, help='Average number of tags per event')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first')
+
+    def handle(self, *args, **options):
+        """
+        Generates the data set
+        """
+        generator = PerfDataGenerator(seed=options['seed'], batch_size=options['batch_size'], stdout=self.stdout)
+        if options['clear']:
+            generator.clear()
+            self.stdout.write('Cleared previously generated data')
+
+        generator.generate(users=options['users'],
+                           events=options['events'],
+                           mean_attendees=options['attendees'],
+                           distribution=options['distribution'],
+                           past_ratio=options['past_ratio'],
+                           located_ratio=options['located_ratio'],
+                           mean_tags=options['tags'])
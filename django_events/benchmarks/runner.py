@@ -0,0 +1,136 @@
+import json
+import time
+import platform
+import statistics
+import subprocess
+import datetime
+import django
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def get_git_commit():
+    """
+    Return the current git commit hash, or None if it can't be determined
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkRunner(object):
+    """
+    Times a set of benchmark cases and records the number of queries each one issues.
+
+    The queries are counted on a separate run from the timed ones, as capturing queries adds overhead.
+    """
+
+    def __init__(self, iterations=20, warmup=2):
+        """
+        :param iterations: Number of timed runs per case
+        :type iterations: int
+        :param warmup: Number of un-timed runs per case before timing starts
+        :type warmup: int
+        """
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results = {}
+
+    def run(self, name, func, setup=None, rollback=False):
+        """
+        Run a benchmark case
+
+        :param name: Name of the case
+        :type name: str
+        :param func: Callable to benchmark
+        :param setup: Optional callable run before each call to func, it is not timed
+        :param rollback: If True, each run is made in a transaction that is rolled back so that write cases don't
+                         change the data set
+        :return: The result of the case
+        :rtype: dict
+        """
+        def run_once(capture=False):
+            with transaction.atomic():
+                if setup:
+                    setup()
+                if capture:
+                    with CaptureQueriesContext(connection) as queries:
+                        func()
+                    elapsed = len(queries)
+                else:
+                    start = time.perf_counter()
+                    func()
+                    elapsed = time.perf_counter() - start
+                if rollback:
+                    transaction.set_rollback(True)
+            return elapsed
+
+        query_count = run_once(capture=True)
+        for _ in range(self.warmup):
+            run_once()
+        timings = sorted(run_once() * 1000 for _ in range(self.iterations))
+
+        result = {
+            'queries': query_count,
+            'iterations': self.iterations,
+            'mean_ms': statistics.mean(timings),
+            'median_ms': statistics.median(timings),
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'min_ms': timings[0],
+            'max_ms': timings[-1],
+        }
+        self.results[name] = result
+        return result
+
+    def to_dict(self, **metadata):
+        """
+        Return the results, along with details of the environment they were recorded in
+
+        :param metadata: Any extra details to record (e.g. the size of the data set)
+        :rtype: dict
+        """
+        return {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'commit': get_git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'metadata': metadata,
+            'results': self.results,
+        }
+
+    def write(self, path, **metadata):
+        """
+        Write the results to a JSON file
+
+        :param path: Path of the file
+        :param metadata: Any extra details to record
+        """
+        with open(path, 'w') as results_file:
+            json.dump(self.to_dict(**metadata), results_file, indent=2, sort_keys=True)
+
+
+def compare_results(previous, current, threshold=0.1):
+    """
+    Compare two sets of results (as written by BenchmarkRunner.write())
+
+    :param previous: Results to compare against
+    :type previous: dict
+    :param current: New results
+    :type current: dict
+    :param threshold: Fractional increase in median time above which a case is flagged as a regression
+    :type threshold: float
+    :return: A row per case in both results: (name, previous median, current median, change, query change, regressed)
+    :rtype: list
+    """
+    rows = []
+    for name, result in sorted(current['results'].items()):
+        old = previous['results'].get(name)
+        if not old:
+            continue
+        change = (result['median_ms'] - old['median_ms']) / old['median_ms'] if old['median_ms'] else 0.0
+        query_change = result['queries'] - old['queries']
+        rows.append((name, old['median_ms'], result['median_ms'], change, query_change,
+                     change > threshold or query_change > 0))
+    return rows
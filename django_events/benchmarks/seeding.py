@@ -0,0 +1,222 @@
+import random
+import datetime
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+
+from events.models import Event, EventTag, Tag, get_geohash
+
+# All generated users have an email address on this domain so that they can be found (and cleared) later
+PERF_EMAIL_DOMAIN = 'perf.events.com'
+
+PERF_USER_PASSWORD = 'password'
+
+DISTRIBUTION_UNIFORM = 'uniform'
+DISTRIBUTION_POPULAR = 'popular'
+DISTRIBUTIONS = (DISTRIBUTION_UNIFORM, DISTRIBUTION_POPULAR)
+
+# Generated events are clustered around these (latitude, longitude)s, so that some areas are much busier than others
+PERF_LOCATIONS = [
+    (51.5074, -0.1278),
+    (40.7128, -74.0060),
+    (48.8566, 2.3522),
+    (35.6762, 139.6503),
+    (-33.8688, 151.2093),
+    (52.5200, 13.4050),
+    (19.4326, -99.1332),
+    (-23.5505, -46.6333),
+    (28.6139, 77.2090),
+    (55.7558, 37.6173),
+]
+
+# Tags given to generated events. Earlier tags are given to more events, so that some tags are much more popular.
+PERF_TAGS = ['social', 'workshop', 'meetup', 'talk', 'sport', 'music', 'food', 'outdoors', 'family', 'charity',
+             'film', 'games', 'language', 'art', 'tech', 'books', 'dance', 'theatre', 'volunteering', 'networking']
+
+
+def get_perf_users():
+    """
+    Return a query set of all the generated users
+    """
+    return get_user_model().objects.filter(email__endswith='@' + PERF_EMAIL_DOMAIN)
+
+
+class PerfDataGenerator(object):
+    """
+    Generates a synthetic data set of users, events and attendance using bulk_create so that large data sets can be
+    created quickly. Given the same seed the same data set shape is generated (dates are relative to now).
+    """
+
+    def __init__(self, seed=0, batch_size=1000, stdout=None):
+        """
+        :param seed: Seed for the random number generator
+        :type seed: int
+        :param batch_size: Number of rows to insert per query
+        :type batch_size: int
+        :param stdout: Optional stream to write progress to
+        """
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    @staticmethod
+    def clear():
+        """
+        Delete all the generated users, along with their events and attendance
+        """
+        users = get_perf_users()
+        Event.objects.filter(organiser__in=users).delete()
+        users.delete()
+
+    def create_users(self, count):
+        """
+        Create users, all of which have the password PERF_USER_PASSWORD. The password is only hashed once.
+
+        :param count: Number of users to create
+        :return: IDs of the users created
+        :rtype: list
+        """
+        user_model = get_user_model()
+        start_index = get_perf_users().count()
+        max_id = user_model.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        password = make_password(PERF_USER_PASSWORD)
+
+        users = (user_model(email='user{0}@{1}'.format(start_index + i, PERF_EMAIL_DOMAIN), password=password)
+                 for i in range(count))
+        self._bulk_create(user_model, users)
+        self.log('Created {0} users'.format(count))
+        return list(user_model.objects.filter(id__gt=max_id).values_list('id', flat=True))
+
+    def create_events(self, count, organiser_ids, past_ratio=0.5, days=365, located_ratio=0.8):
+        """
+        Create events with a random organiser, spread evenly over the given number of days either side of now
+
+        :param count: Number of events to create
+        :param organiser_ids: IDs of the users to choose organisers from
+        :param past_ratio: Fraction of the events that are in the past
+        :param days: Events are created up to this many days in the past/future
+        :param located_ratio: Fraction of the events that have a location, normally distributed around one of the
+                              PERF_LOCATIONS (with a standard deviation of about 50km)
+        :return: IDs of the events created
+        :rtype: list
+        """
+        max_id = Event.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        now = datetime.datetime.now()
+
+        def generate():
+            for i in range(count):
+                offset = datetime.timedelta(seconds=self.random.randint(60, days * 24 * 60 * 60))
+                date_time = now - offset if self.random.random() < past_ratio else now + offset
+                latitude = longitude = None
+                if self.random.random() < located_ratio:
+                    latitude, longitude = self.random.choice(PERF_LOCATIONS)
+                    latitude = max(-90.0, min(90.0, self.random.gauss(latitude, 0.5)))
+                    longitude = (self.random.gauss(longitude, 0.5) + 180) % 360 - 180
+                # bulk_create() doesn't call save(), so the geohash is set here
+                yield Event(title='Perf Event {0}'.format(i),
+                            description='Description of event {0}. '.format(i) * self.random.randint(1, 20),
+                            organiser_id=self.random.choice(organiser_ids),
+                            date_time=date_time,
+                            latitude=latitude,
+                            longitude=longitude,
+                            geohash=get_geohash(latitude, longitude))
+
+        self._bulk_create(Event, generate())
+        self.log('Created {0} events'.format(count))
+        return list(Event.objects.filter(id__gt=max_id).values_list('id', flat=True))
+
+    def create_attendance(self, event_ids, user_ids, mean_attendees=10, distribution=DISTRIBUTION_UNIFORM):
+        """
+        Add attendees to events
+
+        :param event_ids: IDs of the events
+        :param user_ids: IDs of the users to choose attendees from
+        :param mean_attendees: Average number of attendees per event
+        :param distribution: "uniform" - each event has between 0 and 2x the mean attendees. "popular" - a Pareto
+                             distribution where a few events have very large numbers of attendees.
+        :return: Number of attendance rows created
+        :rtype: int
+        """
+        through = Event.attendees.through
+        total = [0]
+
+        def attendee_count():
+            if distribution == DISTRIBUTION_POPULAR:
+                # A Pareto distribution with alpha=1.5 has a mean of 3 before scaling
+                count = int(self.random.paretovariate(1.5) * mean_attendees / 3)
+            else:
+                count = self.random.randint(0, mean_attendees * 2)
+            return min(count, len(user_ids))
+
+        def generate():
+            for event_id in event_ids:
+                for user_id in self.random.sample(user_ids, attendee_count()):
+                    total[0] += 1
+                    yield through(event_id=event_id, user_id=user_id)
+
+        self._bulk_create(through, generate())
+        self.log('Created {0} attendances'.format(total[0]))
+        return total[0]
+
+    def create_tags(self, event_ids, mean_tags=1):
+        """
+        Tag events with the PERF_TAGS, chosen with a Zipf-like distribution
+
+        :param event_ids: IDs of the events
+        :param mean_tags: Average number of tags per event, each event has between 0 and 2x the mean
+        :return: Number of event tags created
+        :rtype: int
+        """
+        Tag.objects.bulk_create((Tag(name=name) for name in PERF_TAGS), ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(name__in=PERF_TAGS).values_list('name', 'id'))
+        weights = [1 / (rank + 1) for rank in range(len(PERF_TAGS))]
+        total = [0]
+
+        def generate():
+            for event_id in event_ids:
+                count = self.random.randint(0, int(mean_tags * 2))
+                names = set(self.random.choices(PERF_TAGS, weights, k=count))
+                for name in names:
+                    total[0] += 1
+                    yield EventTag(event_id=event_id, tag_id=tag_ids[name])
+
+        self._bulk_create(EventTag, generate())
+        self.log('Created {0} event tags'.format(total[0]))
+        return total[0]
+
+    def generate(self, users, events, mean_attendees=10, distribution=DISTRIBUTION_UNIFORM, past_ratio=0.5,
+                 located_ratio=0.8, mean_tags=1):
+        """
+        Generate a complete data set in a single transaction
+
+        :param users: Number of users
+        :param events: Number of events
+        :param mean_attendees: Average number of attendees per event
+        :param distribution: Distribution of attendees, see create_attendance()
+        :param past_ratio: Fraction of the events that are in the past
+        :param located_ratio: Fraction of the events that have a location
+        :param mean_tags: Average number of tags per event
+        """
+        with transaction.atomic():
+            user_ids = self.create_users(users)
+            event_ids = self.create_events(events, user_ids, past_ratio=past_ratio, located_ratio=located_ratio)
+            self.create_attendance(event_ids, user_ids, mean_attendees, distribution)
+            self.create_tags(event_ids, mean_tags)
+
+    def _bulk_create(self, model, objects):
+        """
+        Insert objects from a (possibly lazy) iterable in batches, so the whole data set is never held in memory
+        """
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
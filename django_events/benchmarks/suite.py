@@ -0,0 +1,179 @@
+import datetime
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.shortcuts import reverse
+from django.conf import settings
+from django.test import Client, override_settings
+
+from events.models import Event
+from events.geo import within_radius
+from .seeding import PERF_LOCATIONS, PERF_TAGS
+
+
+class BenchmarkSuite(object):
+    """
+    Benchmark cases for every EventQuerySet method, API endpoint and HTML view. They are run against whatever data
+    is in the database, normally generated with the seed_perf_data command.
+
+    The cases are made as the organiser of the future event with the most attendees, so that the attendee lists and
+    is_organiser paths are exercised. Write cases are rolled back.
+
+    The location searches are made around the first of the PERF_LOCATIONS, the busiest kind of area in a generated
+    data set, and the tag filters use the most popular of the PERF_TAGS.
+    """
+
+    def __init__(self, runner, page_size=30, near_radius=10):
+        """
+        :param runner: BenchmarkRunner to run the cases with
+        :param page_size: Number of events evaluated for the QuerySet list cases
+        :param near_radius: Radius in km of the location searches
+        """
+        self.runner = runner
+        self.page_size = page_size
+        self.near = PERF_LOCATIONS[0] + (near_radius,)
+        self.tag = PERF_TAGS[0]
+
+        self.event = get_benchmark_event()
+        self.user = self.event.organiser
+        self.other_event = Event.objects.get_current_events().filter(recurrence='')\
+            .exclude(organiser=self.user).first() or self.event
+
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.anonymous_client = Client()
+
+    def run(self):
+        """
+        Run all the cases
+
+        :return: The runner's results
+        :rtype: dict
+        """
+        # Every case is requested many times by the same user, so raise the throttle rates far enough that no request
+        # is throttled (the throttles' cache lookups are still measured)
+        rates = dict.fromkeys(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), '1000000/s')
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+            self.run_queryset_cases()
+            self.run_api_cases()
+            self.run_html_cases()
+        return self.runner.results
+
+    def run_queryset_cases(self):
+        user = self.user
+        list_methods = {
+            'get_current_events': lambda: Event.objects.get_current_events(),
+            'get_events_in_past': lambda: Event.objects.get_events_in_past(),
+            'get_current_occurrences': lambda: Event.objects.get_current_occurrences(),
+            'get_past_occurrences': lambda: Event.objects.get_past_occurrences(),
+            'get_events_organised_by_user': lambda: Event.objects.get_events_organised_by_user(user),
+            'get_events_attended_by_user': lambda: Event.objects.get_events_attended_by_user(user),
+            'near.get_current_occurrences': lambda: Event.objects.near(*self.near).get_current_occurrences(),
+            'near.get_current_events': lambda: Event.objects.near(*self.near).get_current_events(),
+            # The same search without the geohash index, for comparison
+            'near_scan.get_current_events': lambda: Event.objects.filter(within_radius(*self.near))
+            .get_current_events(),
+            'tagged.get_current_occurrences': lambda: Event.objects.tagged(self.tag).get_current_occurrences(),
+        }
+        for name, get_queryset in list_methods.items():
+            self.runner.run('queryset.{0}.page'.format(name),
+                            lambda get_queryset=get_queryset: list(get_queryset()[:self.page_size]))
+            self.runner.run('queryset.{0}.count'.format(name),
+                            lambda get_queryset=get_queryset: get_queryset().count())
+        self.runner.run('queryset.get_event', lambda: Event.objects.get_event(self.event.pk, user))
+        # Uncached, see events.tags.get_tag_counts()
+        self.runner.run('queryset.get_tag_counts', lambda: Event.objects.get_tag_counts())
+
+    def near_params(self):
+        latitude, longitude, radius = self.near
+        return {'near': '{0},{1}'.format(latitude, longitude), 'radius': radius}
+
+    def _request(self, name, method, url, client=None, rollback=False, setup=None, status=200, **kwargs):
+        client = client or self.client
+
+        def request():
+            response = getattr(client, method)(url, secure=True, **kwargs)
+            # Render the whole response, including any streaming content
+            if response.streaming:
+                b''.join(response.streaming_content)
+            # A case that fails (e.g. a form error or a permission check) wouldn't measure the path it is named after
+            assert response.status_code == status, '{0} returned {1}'.format(name, response.status_code)
+
+        self.runner.run(name, request, setup=setup, rollback=rollback)
+
+    def run_api_cases(self):
+        event_detail = reverse('event-detail', args=(self.event.pk,))
+        event_data = {'title': 'Benchmark Event',
+                      'description': 'Benchmark event description',
+                      'date_time': (datetime.datetime.now() + datetime.timedelta(days=7)).isoformat()}
+
+        self._request('api.root', 'get', reverse('api-root'))
+        for query_filter in ('', 'o', 'a', 'p'):
+            self._request('api.event.list[{0}]'.format(query_filter or 'current'), 'get', reverse('event-list'),
+                          data={'filter': query_filter})
+        self._request('api.event.list[near]', 'get', reverse('event-list'), data=self.near_params())
+        self._request('api.event.list[tag]', 'get', reverse('event-list'), data={'tag': self.tag})
+        self._request('api.event.tags', 'get', reverse('event-tags'))
+        self._request('api.event.retrieve', 'get', event_detail)
+        # The same number of events as a page of the list, to compare with retrieving them one at a time
+        batch_ids = Event.objects.order_by('pk').values_list('pk', flat=True)[:self.page_size]
+        self._request('api.event.batch', 'get', reverse('event-batch'),
+                      data={'ids': ','.join(str(pk) for pk in batch_ids)})
+        self._request('api.event.create', 'post', reverse('event-list'), rollback=True, status=201,
+                      data=event_data, content_type='application/json')
+        self._request('api.event.update', 'put', event_detail, rollback=True,
+                      data=event_data, content_type='application/json')
+        self._request('api.event.partial_update', 'patch', event_detail, rollback=True,
+                      data={'title': 'Benchmark Event'}, content_type='application/json')
+        self._request('api.event.destroy', 'delete', event_detail, rollback=True, status=204)
+        self._request('api.event.attend', 'post', reverse('event-attend', args=(self.other_event.pk,)),
+                      rollback=True, status=202, setup=lambda: self.other_event.attendees.remove(self.user))
+        self._request('api.event.unattend', 'post', reverse('event-unattend', args=(self.other_event.pk,)),
+                      rollback=True, status=202, setup=lambda: self.other_event.attendees.add(self.user))
+
+    def run_html_cases(self):
+        event_data = {'title': 'Benchmark Event',
+                      'description': 'Benchmark event description',
+                      'date_time': (datetime.datetime.now() + datetime.timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')}
+        event_edit = reverse('events_edit', args=(self.event.pk,))
+
+        self._request('html.index.anonymous', 'get', reverse('index'), client=self.anonymous_client)
+        # Redirects to the events list
+        self._request('html.index.authenticated', 'get', reverse('index'), status=302)
+        self._request('html.login', 'get', reverse('user_login'), client=self.anonymous_client)
+        self._request('html.register', 'get', reverse('user_register'), client=self.anonymous_client)
+        for query_filter in ('', 'o', 'a', 'p'):
+            self._request('html.events_list[{0}]'.format(query_filter or 'current'), 'get', reverse('events_list'),
+                          data={'filter': query_filter})
+        self._request('html.events_list[near]', 'get', reverse('events_list'), data=self.near_params())
+        self._request('html.events_list[tag]', 'get', reverse('events_list'), data={'tag': self.tag})
+        self._request('html.events_view', 'get', reverse('events_view', args=(self.event.pk,)))
+        self._request('html.events_create.get', 'get', reverse('events_create'))
+        self._request('html.events_create.post', 'post', reverse('events_create'), rollback=True, status=302,
+                      data=event_data)
+        self._request('html.events_edit.get', 'get', event_edit)
+        self._request('html.events_edit.post', 'post', event_edit, rollback=True, status=302, data=event_data)
+
+
+def get_benchmark_event():
+    """
+    Return the future event with the most attendees, which the cases are made as the organiser of
+
+    :raises ValueError: if there are no future events
+    """
+    event = Event.objects.filter(date_time__gte=datetime.datetime.now())\
+        .annotate(attendees_count=Count('attendees'))\
+        .order_by('-attendees_count', 'pk').first()
+    if event is None:
+        raise ValueError('There are no future events to benchmark, run seed_perf_data first')
+    return event
+
+
+def get_dataset_size():
+    """
+    Return the size of the data set being benchmarked, to store alongside the results
+    """
+    return {
+        'users': get_user_model().objects.count(),
+        'events': Event.objects.count(),
+        'attendances': Event.attendees.through.objects.count(),
+    }
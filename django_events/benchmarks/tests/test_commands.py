@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import tempfile
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+
+from events.models import Event
+from benchmarks.seeding import get_perf_users
+
+
+class TestSeedPerfData(TestCase):
+
+    def test_seed_perf_data(self):
+        out = StringIO()
+        call_command('seed_perf_data', users=20, events=30, attendees=2, stdout=out)
+        self.assertIn('Created 20 users', out.getvalue())
+        self.assertEqual(get_perf_users().count(), 20)
+        self.assertEqual(Event.objects.count(), 30)
+
+    def test_seed_perf_data_clear(self):
+        call_command('seed_perf_data', users=20, events=30, stdout=StringIO())
+        call_command('seed_perf_data', users=10, events=5, clear=True, stdout=StringIO())
+        self.assertEqual(get_perf_users().count(), 10)
+        self.assertEqual(Event.objects.count(), 5)
+
+
+class TestRunBenchmarks(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.output_dir, 'results.json')
+        call_command('seed_perf_data', users=20, events=40, attendees=3, past_ratio=0.5, stdout=StringIO())
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def _run_benchmarks(self, **options):
+        out = StringIO()
+        call_command('run_benchmarks', iterations=1, warmup=0, output=self.output, stdout=out, **options)
+        with open(self.output) as results_file:
+            return json.load(results_file), out.getvalue()
+
+    def test_run_benchmarks(self):
+        event_count = Event.objects.count()
+        attendance_count = Event.attendees.through.objects.count()
+
+        results, _ = self._run_benchmarks()
+        self.assertEqual(results['metadata']['dataset']['events'], event_count)
+        for name in ('queryset.get_current_events.page', 'queryset.get_events_in_past.count',
+                     'queryset.get_events_organised_by_user.page', 'queryset.get_events_attended_by_user.count',
+                     'queryset.get_event', 'api.event.list[current]', 'api.event.retrieve', 'api.event.attend',
+                     'api.event.destroy', 'html.events_list[p]', 'html.events_edit.post', 'html.index.anonymous',
+                     'queryset.near.get_current_events.page', 'queryset.near_scan.get_current_events.count',
+                     'api.event.list[near]', 'html.events_list[near]', 'api.event.batch',
+                     'queryset.tagged.get_current_occurrences.page', 'queryset.get_tag_counts', 'api.event.list[tag]',
+                     'api.event.tags', 'html.events_list[tag]'):
+            self.assertIn(name, results['results'])
+        self.assertEqual(results['results']['queryset.get_event']['queries'], 1)
+
+        # The write cases are rolled back
+        self.assertEqual(Event.objects.count(), event_count)
+        self.assertEqual(Event.attendees.through.objects.count(), attendance_count)
+
+    def test_run_benchmarks_compare(self):
+        previous, _ = self._run_benchmarks()
+        previous['results']['api.root']['queries'] -= 1
+        previous_path = os.path.join(self.output_dir, 'previous.json')
+        with open(previous_path, 'w') as previous_file:
+            json.dump(previous, previous_file)
+
+        _, out = self._run_benchmarks(compare=previous_path)
+        self.assertIn('Compared with', out)
+        self.assertRegex(out, r'api\.root .* \+1 queries  REGRESSION')
+
+    def test_run_benchmarks_no_events(self):
+        Event.objects.all().delete()
+        with self.assertRaises(ValueError):
+            self._run_benchmarks()
+
+
+@override_settings(PBKDF2_ITERATIONS=1000, SCRYPT_WORK_FACTOR=2 ** 10)
+class TestRunAuthBenchmarks(TestCase):
+
+    def test_run_auth_benchmarks(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        output = os.path.join(output_dir, 'results.json')
+        out = StringIO()
+        call_command('run_auth_benchmarks', iterations=1, warmup=0, policies=['pbkdf2', 'scrypt'], output=output,
+                     stdout=out)
+        with open(output) as results_file:
+            results = json.load(results_file)
+        self.assertEqual(set(results['results']),
+                         {'auth.signup[pbkdf2]', 'auth.login[pbkdf2]', 'auth.signup[scrypt]', 'auth.login[scrypt]',
+                          'auth.api[session:db]', 'auth.api[session:cached_db]', 'auth.api[session:signed_cookies]',
+                          'auth.api[token]'})
+        # A token doesn't need the session lookup
+        self.assertLess(results['results']['auth.api[token]']['queries'],
+                        results['results']['auth.api[session:db]']['queries'])
+        self.assertIn('/sec per worker', out.getvalue())
+        # The cases are rolled back
+        self.assertEqual(get_perf_users().count(), 0)
+
+
+class TestRunCompressionBenchmarks(TestCase):
+
+    def test_run_compression_benchmarks(self):
+        call_command('seed_perf_data', users=20, events=40, attendees=10, stdout=StringIO())
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        output = os.path.join(output_dir, 'results.json')
+        out = StringIO()
+        call_command('run_compression_benchmarks', iterations=1, warmup=0, output=output, stdout=out)
+        with open(output) as results_file:
+            results = json.load(results_file)['results']
+        for name in ('api.event.list', 'api.event.retrieve', 'api.event.batch', 'html.events_list'):
+            self.assertIn('compression.{0}[identity]'.format(name), results)
+            gzipped = results['compression.{0}[gzip]'.format(name)]
+            self.assertLess(gzipped['bytes'], results['compression.{0}[identity]'.format(name)]['bytes'])
+            self.assertGreater(gzipped['bytes_saved'], 0)
+        self.assertIn('saved', out.getvalue())
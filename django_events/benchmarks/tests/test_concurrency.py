@@ -0,0 +1,17 @@
+import sys
+from unittest import skipIf
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from benchmarks.concurrency import run_concurrency_benchmark
+
+
+@skipIf(sys.platform == 'win32', 'Requires the fork multiprocessing start method')
+class TestSQLiteConcurrency(SimpleTestCase):
+
+    def test_tuned_settings_no_errors(self):
+        results = run_concurrency_benchmark(settings.SQLITE_OPTIONS, writers=3, readers=3, duration=1.0, events=10)
+        self.assertGreater(results['writes_per_second'], 0)
+        self.assertGreater(results['reads_per_second'], 0)
+        self.assertEqual(results['write_errors'], 0)
+        self.assertEqual(results['read_errors'], 0)
@@ -0,0 +1,29 @@
+from io import StringIO
+from django.test import LiveServerTestCase, override_settings
+from django.core.management import call_command, CommandError
+
+from benchmarks.load import run_load_test
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TestLoadTest(LiveServerTestCase):
+
+    def test_run_load_test(self):
+        for keepalive in (True, False):
+            result = run_load_test(self.live_server_url + '/', requests=10, concurrency=3, keepalive=keepalive)
+            self.assertEqual(result['requests'], 10)
+            self.assertEqual(result['errors'], 0)
+            self.assertEqual(result['statuses'], {'200': 10})
+            self.assertEqual(result['cache_statuses'], {'none': 10})
+            self.assertGreater(result['requests_per_second'], 0)
+
+    def test_run_load_test_command(self):
+        # A page that doesn't write to the database: the live server's threads share the in-memory test database, so
+        # concurrent session writes (e.g. from the login page) can fail
+        out = StringIO()
+        call_command('run_load_test', self.live_server_url + '/', requests=4, concurrency=2,
+                     header=['X-Forwarded-Proto: https'], stdout=out)
+        self.assertIn('4 requests', out.getvalue())
+        self.assertIn('200 x4', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('run_load_test', self.live_server_url, header=['X-Forwarded-Proto'], stdout=out)
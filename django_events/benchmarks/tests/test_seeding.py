@@ -0,0 +1,86 @@
+import datetime
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from events.models import Event, EventTag, Tag
+from events.geo import encode_geohash
+from benchmarks.seeding import PerfDataGenerator, get_perf_users, DISTRIBUTION_POPULAR, PERF_USER_PASSWORD, PERF_TAGS
+
+
+class TestPerfDataGenerator(TestCase):
+
+    def test_create_users(self):
+        user_ids = PerfDataGenerator().create_users(5)
+        self.assertEqual(len(user_ids), 5)
+        self.assertEqual(get_perf_users().count(), 5)
+        self.assertTrue(get_perf_users().first().check_password(PERF_USER_PASSWORD))
+
+    def test_create_users_twice_unique_emails(self):
+        generator = PerfDataGenerator()
+        generator.create_users(3)
+        user_ids = generator.create_users(3)
+        self.assertEqual(len(user_ids), 3)
+        self.assertEqual(get_perf_users().count(), 6)
+
+    def test_create_events_past_ratio(self):
+        generator = PerfDataGenerator()
+        user_ids = generator.create_users(2)
+        event_ids = generator.create_events(20, user_ids, past_ratio=1)
+        self.assertEqual(len(event_ids), 20)
+        self.assertEqual(Event.objects.filter(date_time__lt=datetime.datetime.now()).count(), 20)
+        self.assertEqual(Event.objects.exclude(organiser__in=user_ids).count(), 0)
+
+    def test_create_events_located(self):
+        generator = PerfDataGenerator()
+        user_ids = generator.create_users(2)
+        generator.create_events(20, user_ids, located_ratio=1)
+        generator.create_events(10, user_ids, located_ratio=0)
+        self.assertEqual(Event.objects.filter(latitude__isnull=True, geohash='').count(), 10)
+        for event in Event.objects.filter(latitude__isnull=False):
+            self.assertEqual(event.geohash, encode_geohash(event.latitude, event.longitude))
+
+    def test_create_attendance_uniform(self):
+        generator = PerfDataGenerator()
+        user_ids = generator.create_users(10)
+        event_ids = generator.create_events(10, user_ids)
+        total = generator.create_attendance(event_ids, user_ids, mean_attendees=3)
+        self.assertEqual(Event.attendees.through.objects.count(), total)
+        for event in Event.objects.annotate(attendees_count=Count('attendees')):
+            self.assertLessEqual(event.attendees_count, 6)
+
+    def test_create_attendance_popular_capped(self):
+        generator = PerfDataGenerator()
+        user_ids = generator.create_users(5)
+        event_ids = generator.create_events(50, user_ids)
+        total = generator.create_attendance(event_ids, user_ids, mean_attendees=100,
+                                            distribution=DISTRIBUTION_POPULAR)
+        self.assertLessEqual(total, 50 * 5)
+
+    def test_create_tags(self):
+        generator = PerfDataGenerator()
+        user_ids = generator.create_users(2)
+        event_ids = generator.create_events(50, user_ids)
+        total = generator.create_tags(event_ids, mean_tags=2)
+        self.assertEqual(EventTag.objects.count(), total)
+        self.assertGreater(total, 0)
+        for event in Event.objects.annotate(tags_count=Count('tags')):
+            self.assertLessEqual(event.tags_count, 4)
+        # Tagging more events reuses the same tags
+        generator.create_tags(generator.create_events(10, user_ids))
+        self.assertEqual(Tag.objects.count(), len(PERF_TAGS))
+
+    def test_generate_reproducible(self):
+        PerfDataGenerator(seed=1, batch_size=7).generate(users=10, events=20, mean_attendees=4)
+        first = Event.attendees.through.objects.count()
+        PerfDataGenerator.clear()
+        PerfDataGenerator(seed=1, batch_size=3).generate(users=10, events=20, mean_attendees=4)
+        self.assertEqual(Event.attendees.through.objects.count(), first)
+
+    def test_clear(self):
+        other_user = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        PerfDataGenerator().generate(users=5, events=5)
+        PerfDataGenerator.clear()
+        self.assertEqual(get_perf_users().count(), 0)
+        self.assertEqual(Event.objects.count(), 0)
+        self.assertTrue(get_user_model().objects.filter(pk=other_user.pk).exists())
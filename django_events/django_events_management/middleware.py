@@ -0,0 +1,232 @@
+import time
+import zlib
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .routers import PINNED_TO_PRIMARY, WROTE_TO_PRIMARY
+
+PIN_SESSION_KEY = '_pinned_to_primary_until'
+# Content codings that responses can be compressed with, in order of preference
+SUPPORTED_ENCODINGS = ('br', 'gzip')
+
+
+class PrimaryPinningMiddleware(object):
+    """
+    Provides read-your-writes consistency when reads are routed to replicas (see routers.PrimaryReplicaRouter).
+
+    Once a request writes to a replicated model, the rest of that request reads from the primary. The session is
+    then pinned to the primary for REPLICA_PIN_SECONDS (which should be longer than the replication lag), so that the
+    next request (e.g. the AJAX refresh after attending an event) doesn't read stale data from a replica.
+
+    Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        pinned_until = session.get(PIN_SESSION_KEY, 0) if session is not None else 0
+        pinned_token = PINNED_TO_PRIMARY.set(pinned_until > time.time())
+        wrote_token = WROTE_TO_PRIMARY.set(False)
+
+        try:
+            response = self.get_response(request)
+            if WROTE_TO_PRIMARY.get() and session is not None:
+                session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        finally:
+            PINNED_TO_PRIMARY.reset(pinned_token)
+            WROTE_TO_PRIMARY.reset(wrote_token)
+        return response
+
+
+def choose_encoding(accept_encoding):
+    """
+    Choose the content coding for a response from a request's Accept-Encoding header, e.g. "gzip, deflate, br". Of the
+    codings the client accepts, the one with the highest q-value is chosen, preferring brotli to gzip on a tie.
+
+    :param accept_encoding: Value of the Accept-Encoding header
+    :type accept_encoding: str
+    :return: 'br', 'gzip' or None to leave the response uncompressed
+    :rtype: str
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def get_compressor(encoding):
+    """
+    Return a compressor for a content coding, with the compress/flush/finish interface of zlib's compression objects
+
+    :param encoding: 'br' or 'gzip'
+    :type encoding: str
+    """
+    if encoding == 'br':
+        return BrotliCompressor(brotli.Compressor(mode=brotli.MODE_TEXT, quality=settings.BROTLI_QUALITY))
+    # wbits of 16 + MAX_WBITS writes a gzip header and trailer
+    return GzipCompressor(zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS))
+
+
+class GzipCompressor(object):
+    """
+    gzip compressor, using zlib
+    """
+
+    def __init__(self, compressobj):
+        self.compressobj = compressobj
+
+    def compress(self, data):
+        return self.compressobj.compress(data)
+
+    def flush(self):
+        # Ends the output on a byte boundary, so that the client can decompress everything sent so far
+        return self.compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressobj.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(object):
+    """
+    Brotli compressor, adapting brotli.Compressor to the interface of GzipCompressor
+    """
+
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def compress(content, encoding):
+    """
+    Compress the whole content of a response
+
+    :param content: The content
+    :type content: bytes
+    :param encoding: 'br' or 'gzip'
+    :type encoding: str
+    :rtype: bytes
+    """
+    compressor = get_compressor(encoding)
+    return compressor.compress(content) + compressor.finish()
+
+
+def compress_sequence(sequence, encoding, flush_size=16 * 1024):
+    """
+    Compress the content of a streaming response as it is generated. The output is flushed once at least flush_size
+    bytes have been added since the last flush, so that the client receives the content in step with the view without
+    each small chunk (e.g. a single calendar event) costing a flush.
+
+    :param sequence: Iterable of bytes
+    :param encoding: 'br' or 'gzip'
+    :type encoding: str
+    :param flush_size: Number of uncompressed bytes between flushes
+    :type flush_size: int
+    :return: Generator of compressed bytes
+    """
+    compressor = get_compressor(encoding)
+    unflushed = 0
+    for chunk in sequence:
+        data = compressor.compress(chunk)
+        unflushed += len(chunk)
+        if unflushed >= flush_size:
+            data += compressor.flush()
+            unflushed = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses text responses (HTML, JSON, iCalendar etc.) with brotli or gzip, whichever the client prefers (see
+    choose_encoding()). Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as they are, as they would barely
+    shrink, and so are responses that are already encoded or marked "Cache-Control: no-transform".
+
+    Streaming responses are compressed as they are generated rather than being read into memory. A strong ETag is made
+    weak, as the compressed bytes differ from the ones it was calculated for. If-None-Match uses the weak comparison,
+    so conditional requests (e.g. for the calendar feed) still get a 304.
+
+    Compressing a response that reflects attacker controlled input (e.g. a query parameter) alongside a secret can leak
+    the secret through the compressed size (BREACH). Django masks the CSRF token differently in every response, but
+    any other per-user secret (e.g. the calendar feed token) must be kept out of pages that echo request input, or the
+    view must opt out of compression with "Cache-Control: no-transform" (see events.views.EventCalendarLink).
+
+    Must come before any middleware that reads or changes the response content, other than MetricsMiddleware, so that
+    the time taken to compress is included in the request duration.
+    """
+
+    compressible_content_types = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                                  'image/svg+xml')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+
+        # Caches must keep the compressed and uncompressed responses apart
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def is_compressible(self, response):
+        """
+        Return whether a response should be compressed for clients that accept it
+
+        :param response: The response
+        :rtype: bool
+        """
+        if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type.startswith(self.compressible_content_types)
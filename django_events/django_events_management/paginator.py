@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections, DatabaseError
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using):
+    """
+    Return the number of rows in a model's table from the database's statistics, without counting them. The
+    statistics are updated by ANALYZE (which PostgreSQL's autovacuum runs automatically, and SQLite runs as part of
+    PRAGMA optimize), so the estimate may be out of date.
+
+    :param model: The model
+    :param using: Database alias
+    :type using: str
+    :return: The estimated number of rows, or None if the database has no estimate
+    :rtype: int
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        # The first number in each of a table's stats is its number of rows
+        sql = 'SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # SQLite only creates sqlite_stat1 the first time ANALYZE is run
+        return None
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of large tables. When the whole table is listed (no search, filters or date
+    hierarchy) the number of rows is taken from the database's statistics rather than from a COUNT(*), which has to
+    scan the table. The estimate is only used for tables with at least ADMIN_ESTIMATED_COUNT_THRESHOLD rows, where being
+    slightly out only affects the number of pages shown. Filtered lists are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        query_set = self.object_list
+        if isinstance(query_set, QuerySet) and not query_set.query.where:
+            estimate = estimate_row_count(query_set.model, query_set.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super(EstimatedCountPaginator, self).count
@@ -0,0 +1,50 @@
+import random
+import contextvars
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+# True once the current request (or a recent request in the same session) has written to a replicated model. Reads
+# are then sent to the primary so that the user always sees their own writes. Set by PrimaryPinningMiddleware.
+PINNED_TO_PRIMARY = contextvars.ContextVar('pinned_to_primary', default=False)
+
+# Set to True when a replicated model is written to during the current request
+WROTE_TO_PRIMARY = contextvars.ContextVar('wrote_to_primary', default=False)
+
+
+class PrimaryReplicaRouter(object):
+    """
+    Database router that sends reads of the apps in REPLICA_APPS (e.g. the event list and detail queries) to a
+    randomly chosen database in REPLICA_DATABASES, and all writes to the primary.
+
+    Reads go to the primary instead when:
+    -No replicas are configured
+    -The model is not in REPLICA_APPS (e.g. users and sessions, which must be read straight after they are written)
+    -A transaction is open on the primary, as the replica can't see its uncommitted changes
+    -The request has already written to a replicated model, or the session did so within REPLICA_PIN_SECONDS
+    """
+
+    @staticmethod
+    def is_replicated(model):
+        return model._meta.app_label in settings.REPLICA_APPS
+
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_DATABASES or not self.is_replicated(model):
+            return None
+        if PINNED_TO_PRIMARY.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        if not settings.REPLICA_DATABASES:
+            return None
+        if self.is_replicated(model):
+            WROTE_TO_PRIMARY.set(True)
+            PINNED_TO_PRIMARY.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
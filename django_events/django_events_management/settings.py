@@ -26,16 +26,22 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'events',
-    'users'
+    'events.apps.EventsConfig',
+    'users.apps.UsersConfig',
+    'metrics',
+    'benchmarks',
+    'jobs'
 ]
 
 MIDDLEWARE = [
+    'metrics.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django_events_management.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django_events_management.middleware.PrimaryPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,13 +70,60 @@ WSGI_APPLICATION = 'django_events_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# SQLite is tuned for concurrent access by multiple gunicorn workers (see sqlite_backend.base.DatabaseWrapper):
+# -WAL journaling lets readers carry on while a write is in progress
+# -synchronous=NORMAL is safe with WAL, and only syncs at checkpoints rather than on every commit
+# -Writers wait up to the busy timeout for the lock rather than failing with "database is locked"
+# -Transactions take the write lock when they begin, so that the busy timeout applies to them
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+SQLITE_OPTIONS = {
+    'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+    'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+    'pragmas': {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # Negative values are in KiB rather than pages
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'temp_store': 'MEMORY',
+    },
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'django_events_management.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# Read replicas. Reads of the apps in REPLICA_APPS are spread across the replicas, writes always go to "default".
+# DATABASE_REPLICAS is a ';' separated list of SQLite files. For local testing these can be kept up to date with
+# "python manage.py sync_sqlite_replicas".
+# https://docs.djangoproject.com/en/3.0/topics/db/multi-db/
+
+REPLICA_DATABASES = []
+
+for index, replica_name in enumerate(name for name in os.environ.get('DATABASE_REPLICAS', '').split(';') if name):
+    replica_alias = 'replica{0}'.format(index + 1)
+    DATABASES[replica_alias] = {
+        'ENGINE': 'django_events_management.sqlite_backend',
+        'NAME': os.path.join(BASE_DIR, replica_name),
+        'OPTIONS': SQLITE_OPTIONS,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(replica_alias)
+
+DATABASE_ROUTERS = ['django_events_management.routers.PrimaryReplicaRouter']
+
+REPLICA_APPS = ['events']
+
+# After a user writes to a replicated model, their reads go to the primary for this many seconds. This should be
+# longer than the replication lag.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -92,6 +145,72 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'users.User'
 
+# The authenticated User is cached for a short period to avoid a users table lookup on every request. Saving or
+# deleting a User removes them from the cache.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+]
+
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 30))
+
+# Password hashing (see users.hashers)
+# PASSWORD_HASHER selects how new passwords are hashed:
+# -scrypt - scrypt from the standard library, using 128 * SCRYPT_WORK_FACTOR * SCRYPT_BLOCK_SIZE bytes (16MB) per hash
+# -argon2 - Argon2 using ARGON2_MEMORY_COST KiB per hash, requires the argon2-cffi package
+# -pbkdf2 - PBKDF2-SHA256 with PBKDF2_ITERATIONS iterations (Django's default)
+# Passwords hashed by the other hashers, or with different costs, are still accepted, and are rehashed with the current
+# settings when the user next logs in.
+
+PASSWORD_HASHER_POLICIES = {
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_POLICIES[PASSWORD_HASHER]] + \
+    [hasher for name, hasher in PASSWORD_HASHER_POLICIES.items() if name != PASSWORD_HASHER]
+
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 180000))
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14))
+SCRYPT_BLOCK_SIZE = int(os.environ.get('SCRYPT_BLOCK_SIZE', 8))
+SCRYPT_PARALLELISM = int(os.environ.get('SCRYPT_PARALLELISM', 1))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+
+# Caching
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# The local memory cache is per process. When running multiple workers, point this at a shared cache (e.g. memcached)
+# so that sessions and User invalidations are seen by every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/3.0/topics/http/sessions/
+# SESSION_MODE selects where session data lives:
+# -db - Database only (one SELECT per request)
+# -cached_db - Write-through cache, falling back to the database on a cache miss
+# -cache - Cache only, sessions are lost if the cache is cleared
+# -signed_cookies - Stored client side in a signed cookie, no server side lookup at all
+
+SESSION_MODES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_ENGINE = SESSION_MODES[os.environ.get('SESSION_MODE', 'cached_db')]
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -117,6 +236,12 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = '/static/'
 
+# Hashed file names (e.g. main.3c5f1e2a9b7d.css) let NGINX serve static files with a long-lived cache header, and
+# pre-compressed .gz/.br copies are written at collectstatic time. The manifest only exists after collectstatic, so
+# test_settings uses the plain storage.
+if not DEBUG:
+    STATICFILES_STORAGE = 'django_events_management.storage.CompressedManifestStaticFilesStorage'
+
 
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
@@ -135,6 +260,59 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
     SECURE_REFERRER_POLICY = 'same-origin'
 
+# NGINX terminates TLS and proxies to gunicorn over plain HTTP on the internal network, setting X-Forwarded-Proto so that
+# Django knows the request was made over HTTPS (for SECURE_SSL_REDIRECT, secure cookies and CSRF checks). Only enable
+# this when gunicorn can't be reached except through NGINX, as clients could otherwise set the header themselves.
+if bool(int(os.environ.get('BEHIND_PROXY', 0))):
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
+
+# Events that happened more than this many days ago are moved to the archive tables by the archive_events command
+EVENT_ARCHIVE_DAYS = int(os.environ.get('EVENT_ARCHIVE_DAYS', 90))
+
+# The list of future events includes the occurrences of recurring events up to this many days ahead
+EVENT_RECURRENCE_HORIZON_DAYS = int(os.environ.get('EVENT_RECURRENCE_HORIZON_DAYS', 365))
+
+# The number of current events with each tag, shown on the events list, is cached for this many seconds. Changing an
+# event's tags clears it.
+TAG_COUNTS_CACHE_TIMEOUT = int(os.environ.get('TAG_COUNTS_CACHE_TIMEOUT', 60))
+
+# Background jobs (see jobs.queue), run by the run_worker command. A failed job is retried after JOB_RETRY_DELAY_SECONDS,
+# doubling after each attempt, up to JOB_MAX_ATTEMPTS times. A job that has been running for longer than
+# JOB_LOCK_TIMEOUT_SECONDS is assumed to belong to a worker that died, and is run again.
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY_SECONDS = int(os.environ.get('JOB_RETRY_DELAY_SECONDS', 30))
+JOB_LOCK_TIMEOUT_SECONDS = int(os.environ.get('JOB_LOCK_TIMEOUT_SECONDS', 300))
+
+# Email, e.g. for RSVP notifications
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = bool(int(os.environ.get('EMAIL_USE_TLS', 0)))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'events@localhost')
+# Emails to the attendees of an event that has changed are sent this many at a time
+EVENT_NOTIFICATION_CHUNK_SIZE = int(os.environ.get('EVENT_NOTIFICATION_CHUNK_SIZE', 100))
+
+# Admin changelists of tables with at least this many rows show an estimated total (see paginator.py) rather than
+# counting every row
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000))
+
+# Text responses of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli (quality 0-11) or gzip (level 1-9),
+# whichever the client accepts (see middleware.CompressionMiddleware). The levels are lower than the ones used for the
+# static files, as the responses are compressed on every request.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+
+# Bearer token the Prometheus scraper uses to read /metrics. Staff users can always read it.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Queries issued by EventQuerySet that take at least this many milliseconds are logged along with their query plan.
+# 0 disables the slow query log.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 0))
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPagination',
@@ -143,5 +321,20 @@ REST_FRAMEWORK = {
         # There's no formal requirement for a public API, so on the least privilege principle, only allow access via
         # session authentication (to allow the AJAX to make requests)
         'rest_framework.authentication.SessionAuthentication',
-    ]
-}
\ No newline at end of file
+        # Signed bearer tokens for non-browser clients, only accepted when API_TOKEN_AUTHENTICATION is enabled
+        'api.authentication.SignedTokenAuthentication',
+    ],
+    # Token bucket rates (see api.throttling). 'user' applies to every request to the events API, the others to
+    # specific endpoints. A rate of 'N/period' allows bursts of up to N requests. The tests must be run with
+    # django_events_management.test_settings, which turns throttling off so that the tests don't throttle each other.
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_RATE_USER', '600/min'),
+        'event_list': os.environ.get('THROTTLE_RATE_EVENT_LIST', '120/min'),
+        'event_rsvp': os.environ.get('THROTTLE_RATE_EVENT_RSVP', '30/min'),
+    }
+}
+
+# API tokens (see api.authentication). Disabled by default, enable for integrations that can't use a session.
+# Tokens are issued with the api_token management command and expire after API_TOKEN_MAX_AGE seconds.
+API_TOKEN_AUTHENTICATION = bool(int(os.environ.get('API_TOKEN_AUTHENTICATION', 0)))
+API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE', 90 * 24 * 60 * 60))
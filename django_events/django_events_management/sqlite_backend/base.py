@@ -0,0 +1,50 @@
+import re
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_VALUE_REGEX = re.compile('^-?[A-Za-z0-9_]+$')
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend that tunes each new connection for concurrent use by multiple workers. Two extra OPTIONS are
+    supported:
+
+    -pragmas - Dictionary of PRAGMAs to run on each new connection, e.g. {'journal_mode': 'WAL'}
+    -transaction_mode - How transactions are started: DEFERRED (SQLite's default), IMMEDIATE or EXCLUSIVE. IMMEDIATE
+     takes the write lock when the transaction begins. A deferred transaction that reads and then writes (e.g. adding
+     an attendee) can't wait for the lock, so fails straight away with "database is locked" if another connection
+     wrote in the meantime.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(DatabaseWrapper, self).__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = (options.get('transaction_mode') or 'DEFERRED').upper()
+
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured('transaction_mode must be one of {0}'.format(', '.join(TRANSACTION_MODES)))
+        for name, value in self.pragmas.items():
+            if not PRAGMA_VALUE_REGEX.match(name) or not PRAGMA_VALUE_REGEX.match(str(value)):
+                raise ImproperlyConfigured('Invalid SQLite PRAGMA {0}={1}'.format(name, value))
+
+    def get_connection_params(self):
+        """
+        Remove the extra options, which sqlite3.connect() doesn't understand
+        """
+        kwargs = super(DatabaseWrapper, self).get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute('PRAGMA {0} = {1}'.format(name, value))
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN {0}'.format(self.transaction_mode))
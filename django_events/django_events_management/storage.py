@@ -0,0 +1,70 @@
+import gzip
+import logging
+import brotli
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage that adds a content hash to each file name (so the files can be cached forever by the
+    browser), and writes pre-compressed .gz and .br copies alongside them at collectstatic time. NGINX serves the
+    compressed copies directly using gzip_static/brotli_static, so nothing is compressed per request.
+    """
+
+    compress_extensions = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.txt', '.json')
+
+    # Files smaller than this are not worth compressing
+    min_compress_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        Hash the files as normal, then compress the original and the final hashed copy of every compressible file.
+        Compression is done after all hashing passes have completed so that intermediate copies are skipped.
+        """
+        yield from super(CompressedManifestStaticFilesStorage, self).post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+
+        for name in paths:
+            self.compress_file(name)
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if hashed_name:
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        """
+        Write gzip and brotli copies of the given file if it is compressible and compression actually saves space
+
+        :param name: Name of the file within the storage
+        :type name: str
+        """
+        if not name.endswith(self.compress_extensions):
+            return
+
+        with self.open(name) as original_file:
+            content = original_file.read()
+        if len(content) < self.min_compress_size:
+            return
+
+        # mtime=0 so that the output is reproducible between deployments
+        self._save_compressed(name + '.gz', content, gzip.compress(content, compresslevel=9, mtime=0))
+        self._save_compressed(name + '.br', content, brotli.compress(content))
+
+    def _save_compressed(self, name, content, compressed):
+        """
+        Save a compressed copy of a file, replacing any existing copy
+
+        :param name: Name of the compressed file
+        :param content: Uncompressed content
+        :param compressed: Compressed content
+        """
+        if len(compressed) >= len(content):
+            return
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(compressed))
+        logger.debug('Compressed %s (%d -> %d bytes)', name, len(content), len(compressed))
@@ -0,0 +1,15 @@
+"""
+Settings for running the tests:
+
+    python manage.py test --settings=django_events_management.test_settings
+
+or with DJANGO_SETTINGS_MODULE=django_events_management.test_settings for other test runners.
+"""
+from .settings import *  # noqa: F401,F403
+
+# The manifest of hashed static file names only exists after collectstatic
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# The throttle buckets are kept in the cache, which isn't reset between tests, so the tests would throttle each other.
+# Throttling is disabled, apart from the tests that enable it with override_settings.
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=dict.fromkeys(REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']))
@@ -0,0 +1,108 @@
+import gzip
+import json
+import zlib
+import brotli
+from django.test import TestCase, SimpleTestCase, RequestFactory, override_settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+from events.models import Event
+from events.calendar import get_calendar_token
+from ..middleware import CompressionMiddleware, choose_encoding, compress_sequence
+
+CONTENT = b'{"title": "Event", "description": "An event description"}' * 100
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class TestCompressionMiddleware(SimpleTestCase):
+
+    def get_response(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip;q=0.8'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, deflate'))
+        self.assertIsNone(choose_encoding(''))
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertEqual(choose_encoding('gzip, br'), 'br')
+
+    def test_gzip(self):
+        response = self.get_response(HttpResponse(CONTENT, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+
+    def test_brotli(self):
+        response = self.get_response(HttpResponse(CONTENT, content_type='text/html; charset=utf-8'), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), CONTENT)
+
+    def test_not_compressed(self):
+        # Too small, not text, already encoded, no-transform, not accepted
+        responses = [HttpResponse(CONTENT[:1000], content_type='application/json'),
+                     HttpResponse(CONTENT, content_type='image/png'),
+                     HttpResponse(CONTENT, content_type='text/plain')]
+        responses[2]['Content-Encoding'] = 'gzip'
+        for response in responses:
+            self.assertEqual(self.get_response(response).content, response.content)
+            self.assertFalse(response.has_header('Vary'))
+
+        response = HttpResponse(CONTENT, content_type='text/plain')
+        response['Cache-Control'] = 'no-transform'
+        self.assertFalse(self.get_response(response).has_header('Content-Encoding'))
+
+        response = self.get_response(HttpResponse(CONTENT, content_type='text/plain'), 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # Compressible, so a cache must not give this response to a client that accepts gzip
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_etag_made_weak(self):
+        response = HttpResponse(CONTENT, content_type='text/plain')
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.get_response(response)['ETag'], 'W/"abc"')
+        response = HttpResponse(CONTENT, content_type='text/plain')
+        response['ETag'] = 'W/"abc"'
+        self.assertEqual(self.get_response(response)['ETag'], 'W/"abc"')
+
+    def test_streaming(self):
+        chunks = [CONTENT[i:i + 500] for i in range(0, len(CONTENT), 500)]
+        response = self.get_response(StreamingHttpResponse(iter(chunks), content_type='text/calendar'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), CONTENT)
+
+    def test_compress_sequence_flushes(self):
+        chunks = [CONTENT] * 3
+        compressed = list(compress_sequence(iter(chunks), 'gzip', flush_size=len(CONTENT)))
+        # The output is flushed after the first chunk, so it can be decompressed without the rest of the stream
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(compressed[0]), CONTENT)
+
+
+class TestCompressedViews(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        for i in range(20):
+            Event.objects.create(title='Event {0}'.format(i), description='A description of the event ' * 10,
+                                 date_time='2030-01-01 12:00:00', organiser=self.user)
+        self.client.force_login(self.user)
+
+    def test_api_list(self):
+        response = self.client.get(reverse('event-list'), secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 20)
+
+    def test_calendar_conditional(self):
+        url = reverse('events_calendar', args=(get_calendar_token(self.user),))
+        response = self.client.get(url, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn(b'BEGIN:VCALENDAR', gzip.decompress(b''.join(response.streaming_content)))
+
+        response = self.client.get(url, secure=True, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
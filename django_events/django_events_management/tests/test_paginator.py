@@ -0,0 +1,46 @@
+from datetime import datetime
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.contrib.auth import get_user_model
+
+from events.models import Event
+from ..paginator import EstimatedCountPaginator, estimate_row_count
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=3)
+class TestEstimatedCountPaginator(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        for i in range(4):
+            Event.objects.create(title='Event {0}'.format(i), date_time=datetime(2030, 1, 1 + i), organiser=self.user)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_estimate_row_count(self):
+        self.analyze()
+        self.assertEqual(estimate_row_count(Event, 'default'), 4)
+
+    def test_estimate_is_used(self):
+        self.analyze()
+        Event.objects.create(title='Event 4', date_time=datetime(2030, 1, 5), organiser=self.user)
+        with self.assertNumQueries(1):
+            # The statistics are out of date, but no COUNT(*) is run
+            self.assertEqual(EstimatedCountPaginator(Event.objects.all(), 2).count, 4)
+
+    def test_filtered_count_exact(self):
+        self.analyze()
+        paginator = EstimatedCountPaginator(Event.objects.filter(date_time__gte=datetime(2030, 1, 2)), 2)
+        self.assertEqual(paginator.count, 3)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10)
+    def test_small_table_exact(self):
+        self.analyze()
+        Event.objects.create(title='Event 4', date_time=datetime(2030, 1, 5), organiser=self.user)
+        self.assertEqual(EstimatedCountPaginator(Event.objects.all(), 2).count, 5)
+
+    def test_no_statistics(self):
+        # Without statistics the rows are counted
+        self.assertEqual(EstimatedCountPaginator(Event.objects.all(), 2).count, 4)
@@ -0,0 +1,118 @@
+import time
+from django.test import TestCase, RequestFactory, override_settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+
+from events.models import Event
+from ..routers import PrimaryReplicaRouter, PINNED_TO_PRIMARY, WROTE_TO_PRIMARY
+from ..middleware import PrimaryPinningMiddleware, PIN_SESSION_KEY
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(REPLICA_DATABASES=REPLICAS, REPLICA_APPS=['events'])
+class TestPrimaryReplicaRouter(TestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.pinned_token = PINNED_TO_PRIMARY.set(False)
+        self.wrote_token = WROTE_TO_PRIMARY.set(False)
+
+    def tearDown(self):
+        PINNED_TO_PRIMARY.reset(self.pinned_token)
+        WROTE_TO_PRIMARY.reset(self.wrote_token)
+
+    def test_read_replicated_model(self):
+        # TestCase wraps each test in a transaction, which would pin the read to the primary
+        transaction.get_connection().in_atomic_block = False
+        try:
+            self.assertIn(self.router.db_for_read(Event), REPLICAS)
+            self.assertIn(self.router.db_for_read(Event.attendees.through), REPLICAS)
+        finally:
+            transaction.get_connection().in_atomic_block = True
+
+    def test_read_in_transaction(self):
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+
+    def test_read_not_replicated_model(self):
+        self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_read_no_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Event))
+
+    def test_write(self):
+        self.assertEqual(self.router.db_for_write(Event), 'default')
+        self.assertTrue(WROTE_TO_PRIMARY.get())
+        self.assertTrue(PINNED_TO_PRIMARY.get())
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_write_no_replicas(self):
+        self.assertIsNone(self.router.db_for_write(Event))
+        self.assertFalse(PINNED_TO_PRIMARY.get())
+
+    def test_write_not_replicated_model(self):
+        self.assertEqual(self.router.db_for_write(get_user_model()), 'default')
+        self.assertFalse(WROTE_TO_PRIMARY.get())
+
+    def test_read_after_write(self):
+        transaction.get_connection().in_atomic_block = False
+        try:
+            self.router.db_for_write(Event)
+            self.assertEqual(self.router.db_for_read(Event), 'default')
+        finally:
+            transaction.get_connection().in_atomic_block = True
+
+    def test_allow_migrate(self):
+        self.assertTrue(self.router.allow_migrate('default', 'events'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'events'))
+
+
+@override_settings(REPLICA_DATABASES=REPLICAS, REPLICA_APPS=['events'], REPLICA_PIN_SECONDS=5)
+class TestPrimaryPinningMiddleware(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.session = SessionStore()
+        self.router = PrimaryReplicaRouter()
+
+    def _handle(self, write=False):
+        pinned = []
+
+        def get_response(request):
+            pinned.append(PINNED_TO_PRIMARY.get())
+            if write:
+                self.router.db_for_write(Event)
+                pinned.append(PINNED_TO_PRIMARY.get())
+            return HttpResponse()
+
+        PrimaryPinningMiddleware(get_response)(self.request)
+        return pinned
+
+    def test_not_pinned(self):
+        self.assertEqual(self._handle(), [False])
+        self.assertNotIn(PIN_SESSION_KEY, self.request.session)
+
+    def test_write_pins_request_and_session(self):
+        self.assertEqual(self._handle(write=True), [False, True])
+        self.assertGreater(self.request.session[PIN_SESSION_KEY], time.time())
+        self.assertFalse(PINNED_TO_PRIMARY.get())
+
+    def test_next_request_pinned(self):
+        self._handle(write=True)
+        self.assertEqual(self._handle(), [True])
+
+    def test_pin_expires(self):
+        self.request.session[PIN_SESSION_KEY] = time.time() - 1
+        self.assertEqual(self._handle(), [False])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        self.assertEqual(self._handle(write=True), [False, False])
+        self.assertNotIn(PIN_SESSION_KEY, self.request.session)
+
+    def test_no_session(self):
+        del self.request.session
+        self.assertEqual(self._handle(write=True), [False, True])
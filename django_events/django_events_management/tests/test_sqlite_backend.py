@@ -0,0 +1,70 @@
+import os
+import tempfile
+import shutil
+from django.test import SimpleTestCase
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+
+OPTIONS = {
+    'timeout': 2,
+    'transaction_mode': 'IMMEDIATE',
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 2000,
+        'cache_size': -1024,
+    },
+}
+
+
+class TestSQLiteBackend(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _get_connection(self, options):
+        handler = ConnectionHandler({'default': {'ENGINE': 'django_events_management.sqlite_backend',
+                                                 'NAME': os.path.join(self.directory, 'test.sqlite3'),
+                                                 'OPTIONS': options}})
+        connection = handler['default']
+        self.addCleanup(connection.close)
+        return connection
+
+    def _pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA {0}'.format(name))
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        connection = self._get_connection(OPTIONS)
+        self.assertEqual(self._pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self._pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self._pragma(connection, 'busy_timeout'), 2000)
+        self.assertEqual(self._pragma(connection, 'cache_size'), -1024)
+        # Django's own initialisation still runs
+        self.assertEqual(self._pragma(connection, 'foreign_keys'), 1)
+
+    def test_transaction_immediate(self):
+        connection = self._get_connection(OPTIONS)
+        executed = []
+        with connection.execute_wrapper(lambda execute, sql, *args: executed.append(sql) or execute(sql, *args)):
+            # This is how transaction.atomic() starts a transaction on SQLite
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            connection.set_autocommit(True)
+        self.assertEqual(executed, ['BEGIN IMMEDIATE'])
+
+    def test_default_options(self):
+        connection = self._get_connection({})
+        self.assertEqual(self._pragma(connection, 'journal_mode'), 'delete')
+        self.assertEqual(connection.transaction_mode, 'DEFERRED')
+
+    def test_invalid_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self._get_connection({'transaction_mode': 'SOMETIMES'})
+
+    def test_invalid_pragma(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self._get_connection({'pragmas': {'journal_mode': 'WAL; DROP TABLE events_event'}})
@@ -0,0 +1,75 @@
+import os
+import gzip
+import shutil
+import tempfile
+import brotli
+from django.test import SimpleTestCase, override_settings
+
+from ..storage import CompressedManifestStaticFilesStorage
+
+
+class TestCompressedManifestStaticFilesStorage(SimpleTestCase):
+
+    CSS_CONTENT = b'body { background: url("../img/bg.png"); }\n' * 50
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.source_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source_dir, 'css'))
+        os.makedirs(os.path.join(self.source_dir, 'img'))
+        with open(os.path.join(self.source_dir, 'css', 'main.css'), 'wb') as css_file:
+            css_file.write(self.CSS_CONTENT)
+        with open(os.path.join(self.source_dir, 'css', 'small.css'), 'wb') as css_file:
+            css_file.write(b'p { }')
+        with open(os.path.join(self.source_dir, 'img', 'bg.png'), 'wb') as png_file:
+            png_file.write(b'\x89PNG' * 100)
+
+        self.storage = CompressedManifestStaticFilesStorage(location=self.static_root)
+        self.paths = {}
+        for name in ('css/main.css', 'css/small.css', 'img/bg.png'):
+            with open(os.path.join(self.source_dir, name), 'rb') as source_file:
+                self.storage.save(name, source_file)
+            self.paths[name] = (self.storage, name)
+
+    def tearDown(self):
+        shutil.rmtree(self.static_root)
+        shutil.rmtree(self.source_dir)
+
+    def _post_process(self):
+        with override_settings(STATIC_ROOT=self.static_root):
+            return list(self.storage.post_process(self.paths))
+
+    def test_post_process_hashes_files(self):
+        self._post_process()
+        hashed_name = self.storage.stored_name('css/main.css')
+        self.assertRegex(hashed_name, r'^css/main\.[0-9a-f]{12}\.css$')
+        self.assertTrue(self.storage.exists(hashed_name))
+
+    def test_post_process_writes_gzip(self):
+        self._post_process()
+        hashed_name = self.storage.stored_name('css/main.css')
+        for name in ('css/main.css', hashed_name):
+            with self.storage.open(name + '.gz') as gz_file:
+                content = gzip.decompress(gz_file.read())
+            self.assertIn(b'url("../img/bg.', content)
+
+    def test_post_process_writes_brotli(self):
+        self._post_process()
+        hashed_name = self.storage.stored_name('css/main.css')
+        with self.storage.open(hashed_name + '.br') as br_file:
+            content = brotli.decompress(br_file.read())
+        with self.storage.open(hashed_name) as css_file:
+            self.assertEqual(content, css_file.read())
+
+    def test_post_process_skips_small_files(self):
+        self._post_process()
+        self.assertFalse(self.storage.exists('css/small.css.gz'))
+
+    def test_post_process_skips_binary_files(self):
+        self._post_process()
+        self.assertFalse(self.storage.exists('img/bg.png.gz'))
+
+    def test_post_process_dry_run(self):
+        with override_settings(STATIC_ROOT=self.static_root):
+            list(self.storage.post_process(self.paths, dry_run=True))
+        self.assertFalse(self.storage.exists('css/main.css.gz'))
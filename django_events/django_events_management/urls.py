@@ -7,5 +7,6 @@ urlpatterns = [
     path('admin', admin.site.urls),
     path('events/', include('events.urls')),
     path('users/', include('users.urls')),
-    path('api/', include('api.urls'))
+    path('api/', include('api.urls')),
+    path('metrics', include('metrics.urls'))
 ]
@@ -1,10 +1,59 @@
 from django.contrib import admin
-from .models import Event
+
+from django_events_management.paginator import EstimatedCountPaginator
+from .models import Event, OccurrenceAttendee, WaitlistEntry, Tag, EventTag
+
+
+class EventTagInline(admin.TabularInline):
+    model = EventTag
+    # Searches the tags rather than listing them all in a select box
+    autocomplete_fields = ('tag',)
+    extra = 1
 
 
 class EventAdmin(admin.ModelAdmin):
     list_display = ('id', 'organiser', 'title', 'date_time')
+    # Load the organisers with a join rather than one query per row
+    list_select_related = ('organiser',)
     ordering = ('date_time',)
+    # Filters on date_time ranges, which use its index
+    date_hierarchy = 'date_time'
+    # The default widgets would list every user in the system
+    raw_id_fields = ('organiser', 'attendees')
+    paginator = EstimatedCountPaginator
+    # Don't count the whole table again when the list is filtered
+    show_full_result_count = False
+    inlines = (EventTagInline,)
 
 
 admin.site.register(Event, EventAdmin)
+
+
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+admin.site.register(Tag, TagAdmin)
+
+
+class OccurrenceAttendeeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event', 'occurrence', 'user')
+    list_select_related = ('event', 'user')
+    raw_id_fields = ('event', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(OccurrenceAttendee, OccurrenceAttendeeAdmin)
+
+
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event', 'user', 'created')
+    list_select_related = ('event', 'user')
+    raw_id_fields = ('event', 'user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(WaitlistEntry, WaitlistEntryAdmin)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class EventsConfig(AppConfig):
     name = 'events'
+
+    def ready(self):
+        """
+        Connect the signal handlers and register the background job handlers
+        """
+        from . import signals, jobs  # noqa: F401
@@ -0,0 +1,69 @@
+import datetime
+from django.db import transaction
+
+from .models import Event, ArchivedEvent, EventTag, ArchivedEventTag
+
+ARCHIVED_FIELDS = ('id', 'title', 'description', 'organiser_id', 'date_time', 'updated', 'recurrence',
+                   'recurrence_interval', 'recurrence_until', 'capacity', 'latitude', 'longitude', 'geohash')
+
+
+def archive_events_batch(before, batch_size=500):
+    """
+    Move the oldest events that happened before the given date/time, along with their attendees and tags, from the Event
+    table into the ArchivedEvent table. This is done in a single transaction. Recurring events are never archived, as
+    their later occurrences may still be in the future.
+
+    :param before: Events before this date/time are archived
+    :type before: datetime.datetime
+    :param batch_size: Maximum number of events to move
+    :type batch_size: int
+    :return: Number of events archived
+    :rtype: int
+    """
+    with transaction.atomic():
+        events = list(Event.objects.filter(recurrence='', date_time__lt=before)
+                      .order_by('date_time', 'pk')
+                      .values(*ARCHIVED_FIELDS)[:batch_size])
+        if not events:
+            return 0
+        event_ids = [event['id'] for event in events]
+
+        ArchivedEvent.objects.bulk_create(ArchivedEvent(**event) for event in events)
+
+        attendance = Event.attendees.through.objects.filter(event_id__in=event_ids).values_list('event_id', 'user_id')
+        archived_through = ArchivedEvent.attendees.through
+        archived_through.objects.bulk_create(archived_through(archivedevent_id=event_id, user_id=user_id)
+                                             for event_id, user_id in attendance.iterator())
+
+        tagging = EventTag.objects.filter(event_id__in=event_ids).values_list('event_id', 'tag_id')
+        ArchivedEventTag.objects.bulk_create(ArchivedEventTag(event_id=event_id, tag_id=tag_id)
+                                             for event_id, tag_id in tagging.iterator())
+
+        # Also deletes the attendance and tags from the Event table
+        Event.objects.filter(id__in=event_ids).delete()
+    return len(events)
+
+
+def archive_events(days, batch_size=500, stdout=None):
+    """
+    Archive all events that happened more than the given number of days ago, in batches so that each transaction
+    (and the time the database is locked for) stays short
+
+    :param days: Events older than this many days are archived
+    :type days: int
+    :param batch_size: Number of events to archive per transaction
+    :type batch_size: int
+    :param stdout: Optional stream to write progress to
+    :return: Total number of events archived
+    :rtype: int
+    """
+    before = datetime.datetime.now() - datetime.timedelta(days=days)
+    total = 0
+    while True:
+        archived = archive_events_batch(before, batch_size)
+        if not archived:
+            break
+        total += archived
+        if stdout:
+            stdout.write('Archived {0} events'.format(total))
+    return total
@@ -0,0 +1,200 @@
+import datetime
+import hashlib
+from django.core import signing
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from django.utils import timezone
+
+from users.backends import get_user_cache_key
+from .models import Event, ArchivedEvent
+
+CALENDAR_TOKEN_SALT = 'events.calendar'
+# Lines longer than this many octets must be folded (RFC 5545 section 3.1)
+ICAL_LINE_LENGTH = 75
+ICAL_DATE_TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def get_calendar_token(user):
+    """
+    Return the token that identifies the given user's calendar feed. The token is the user's ID and calendar token
+    version signed with the SECRET_KEY. Changing the SECRET_KEY revokes every token, and revoke_calendar_token()
+    revokes one user's.
+
+    :param user: The user to create the token for
+    :rtype: str
+    """
+    return signing.Signer(salt=CALENDAR_TOKEN_SALT).sign('{0}:{1}'.format(user.pk, user.calendar_token_version))
+
+
+def revoke_calendar_token(user):
+    """
+    Revoke a user's calendar token by incrementing their calendar token version, e.g. if the feed URL has been shared
+    by mistake. The user will need to subscribe to the new URL from get_calendar_token().
+
+    :param user: The user whose token to revoke
+    """
+    get_user_model().objects.filter(pk=user.pk).update(calendar_token_version=F('calendar_token_version') + 1)
+    # update() doesn't send post_save, so remove the cached User here
+    cache.delete(get_user_cache_key(user.pk))
+    user.refresh_from_db(fields=['calendar_token_version'])
+
+
+def get_calendar_user_id(token):
+    """
+    Return the ID of the user a calendar token was created for. The signature is checked first, so only a valid token
+    costs a query: one to check that the user is active and the token hasn't been revoked.
+
+    :param token: Token from get_calendar_token()
+    :type token: str
+    :return: The user ID, or None if the token is not valid
+    :rtype: int
+    """
+    try:
+        user_id, version = (int(value) for value in signing.Signer(salt=CALENDAR_TOKEN_SALT).unsign(token).split(':'))
+    except (signing.BadSignature, ValueError):
+        return None
+    if not get_user_model().objects.filter(pk=user_id, is_active=True, calendar_token_version=version).exists():
+        return None
+    return user_id
+
+
+def get_calendar_version(user_id):
+    """
+    Return the ETag of a user's calendar feed, so that a calendar client polling an unchanged feed never has its events
+    loaded. It is a hash of the ID and update time of each of the user's events (including archived events), in ID
+    order, read with a single query of two columns. This changes when an event is added, removed or edited.
+
+    There is no Last-Modified date: the latest update time doesn't advance when the user stops attending an event, an
+    event is deleted, or they attend an event updated earlier.
+
+    :param user_id: ID of the user the calendar is for
+    :type user_id: int
+    :return: The ETag
+    :rtype: str
+    """
+    attended = Event.attendees.through.objects.filter(user_id=user_id).values('event_id')
+    archived_attended = ArchivedEvent.attendees.through.objects.filter(user_id=user_id).values('archivedevent_id')
+    events = Event.objects.filter(Q(organiser_id=user_id) | Q(pk__in=attended)).values_list('id', 'updated')
+    archived_events = ArchivedEvent.objects.filter(Q(organiser_id=user_id) | Q(pk__in=archived_attended))\
+        .values_list('id', 'updated')
+    digest = hashlib.md5()
+    for pk, updated in events.union(archived_events, all=True).order_by('id').iterator():
+        digest.update('{0}:{1};'.format(pk, updated.isoformat()).encode())
+    return '"{0}"'.format(digest.hexdigest())
+
+
+def to_utc(date_time):
+    """
+    Convert a naive date/time in the TIME_ZONE setting to an aware date/time in UTC
+
+    :param date_time: Date/time stored in the database
+    :type date_time: datetime.datetime
+    :rtype: datetime.datetime
+    """
+    return timezone.make_aware(date_time, timezone.get_default_timezone()).astimezone(datetime.timezone.utc)
+
+
+def escape_text(value):
+    """
+    Escape a TEXT property value (RFC 5545 section 3.3.11)
+
+    :param value: Value to escape
+    :type value: str
+    :rtype: str
+    """
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')\
+        .replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n')
+
+
+def fold_line(line):
+    """
+    Split a content line into lines of at most 75 octets, each continuation line starting with a space. Lines are
+    only split between characters, so that multi-byte UTF-8 characters are kept whole.
+
+    :param line: Content line without the line break
+    :type line: str
+    :return: The folded line, ending with a CRLF line break
+    :rtype: str
+    """
+    lines = []
+    current = ''
+    current_length = 0
+    for char in line:
+        char_length = len(char.encode())
+        if current_length + char_length > ICAL_LINE_LENGTH:
+            lines.append(current)
+            # The leading space of a continuation line counts towards its length
+            current = ' '
+            current_length = 1
+        current += char
+        current_length += char_length
+    lines.append(current)
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def get_recurrence_rule(event):
+    """
+    Return the RRULE value for a recurring event (RFC 5545 section 3.3.10)
+
+    :param event: A recurring Event
+    :rtype: str
+    """
+    rule = 'FREQ={0};INTERVAL={1}'.format(event.recurrence.upper(), event.recurrence_interval)
+    if event.recurrence_until:
+        rule += ';UNTIL={0}'.format(to_utc(event.recurrence_until).strftime(ICAL_DATE_TIME_FORMAT))
+    return rule
+
+
+def render_event(event, host, url):
+    """
+    Return an event as an iCalendar VEVENT component. A recurring event is a single component with an RRULE, which the
+    calendar client expands.
+
+    :param event: The Event
+    :param host: Host name of the site, used to make the UID globally unique
+    :type host: str
+    :param url: Absolute URL of the event
+    :type url: str
+    :rtype: str
+    """
+    lines = ['BEGIN:VEVENT',
+             'UID:event-{0}@{1}'.format(event.pk, host),
+             'DTSTAMP:{0}'.format(to_utc(event.updated).strftime(ICAL_DATE_TIME_FORMAT)),
+             'DTSTART:{0}'.format(to_utc(event.date_time).strftime(ICAL_DATE_TIME_FORMAT)),
+             'SUMMARY:{0}'.format(escape_text(event.title)),
+             'DESCRIPTION:{0}'.format(escape_text(event.description)),
+             'URL:{0}'.format(url),
+             'END:VEVENT']
+    if event.recurrence:
+        lines.insert(4, 'RRULE:{0}'.format(get_recurrence_rule(event)))
+    return ''.join(fold_line(line) for line in lines)
+
+
+def render_calendar(request, user_id):
+    """
+    Generate a user's iCalendar feed one event at a time, including archived events. The events are read with
+    iterator() so that the whole history is never loaded into memory at once.
+
+    The events the user is organising come first, followed by the events they are attending but not organising, so
+    that no event is listed twice. The attended events are a union with the archived events, which can't be filtered,
+    so the ones the user is organising are skipped as they are read.
+
+    :param request: The current request, used to build absolute URLs
+    :param user_id: ID of the user the calendar is for
+    :type user_id: int
+    """
+    host = request.get_host()
+    yield ''.join(fold_line(line) for line in ['BEGIN:VCALENDAR',
+                                               'VERSION:2.0',
+                                               'PRODID:-//django-events-management//Events//EN',
+                                               'CALSCALE:GREGORIAN',
+                                               'METHOD:PUBLISH',
+                                               'X-WR-CALNAME:Events'])
+    organised = Event.objects.get_events_organised_by_user(user_id)
+    for event in organised.iterator():
+        yield render_event(event, host, request.build_absolute_uri(event.get_absolute_url()))
+    for event in Event.objects.get_events_attended_by_user(user_id).iterator():
+        if event.organiser_id != user_id:
+            yield render_event(event, host, request.build_absolute_uri(event.get_absolute_url()))
+    yield fold_line('END:VCALENDAR')
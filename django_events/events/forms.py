@@ -1,9 +1,40 @@
 from django import forms
 from .models import Event
+from .tags import parse_tags, set_event_tags
 
 
 class EventForm(forms.ModelForm):
+    # Optional in the form, so that an event that doesn't recur can be submitted without it
+    recurrence_interval = forms.IntegerField(min_value=1, required=False,
+                                             help_text=Event._meta.get_field('recurrence_interval').help_text)
+    tags = forms.CharField(required=False, help_text='Comma separated, e.g. workshop, social')
 
     class Meta:
         model = Event
-        fields = ['title', 'description', 'date_time']
\ No newline at end of file
+        fields = ['title', 'description', 'date_time', 'recurrence', 'recurrence_interval', 'recurrence_until',
+                  'capacity', 'latitude', 'longitude']
+
+    def __init__(self, *args, **kwargs):
+        super(EventForm, self).__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('tags', ', '.join(tag.name for tag in self.instance.tags.all()))
+
+    def clean_tags(self):
+        """
+        Parse the comma separated tags into a list of names
+        """
+        return parse_tags(self.cleaned_data['tags'])
+
+    def _save_m2m(self):
+        """
+        Save the tags along with the other many to many fields, if they have been changed
+        """
+        super(EventForm, self)._save_m2m()
+        if 'tags' in self.changed_data:
+            set_event_tags(self.instance, self.cleaned_data['tags'])
+
+    def clean_recurrence_interval(self):
+        """
+        Default the interval to 1 if it isn't given
+        """
+        return self.cleaned_data['recurrence_interval'] or 1
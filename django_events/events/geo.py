@@ -0,0 +1,256 @@
+import math
+from django.db.models import Q, F, Func, BooleanField
+from django.db.models.functions import Cos, Sin, Power, Radians
+
+# Characters of a geohash, each of which encodes 5 bits
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Length of the geohashes stored for events. A cell of 9 characters is about 5m across.
+GEOHASH_LENGTH = 9
+
+# A search covers its circle with at most this many geohash cells, using the longest cells for which that is possible
+MAX_SEARCH_CELLS = 9
+
+# Mean radius of the Earth
+EARTH_RADIUS_KM = 6371.0088
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+
+def _cell_bits(length):
+    """
+    Return the number of latitude and longitude bits in a geohash of the given length. The bits are interleaved,
+    starting with longitude.
+
+    :param length: Geohash length
+    :type length: int
+    :return: (latitude bits, longitude bits)
+    :rtype: tuple
+    """
+    bits = length * 5
+    return bits // 2, bits - bits // 2
+
+
+def _cell_index(value, low, size, count):
+    """
+    Return the index of the cell of the given size that contains a value, with values at the top of the range put in the
+    last cell
+    """
+    return min(int(math.floor((value - low) / size)), count - 1)
+
+
+def _encode_cell(lat_index, lng_index, length):
+    """
+    Return the geohash of the cell with the given latitude and longitude indices
+
+    :param lat_index: Index of the cell from the south pole
+    :type lat_index: int
+    :param lng_index: Index of the cell from 180 degrees west
+    :type lng_index: int
+    :param length: Geohash length
+    :type length: int
+    :rtype: str
+    """
+    lat_bits, lng_bits = _cell_bits(length)
+    value = 0
+    for bit in range(length * 5):
+        if bit % 2 == 0:
+            lng_bits -= 1
+            value = value << 1 | (lng_index >> lng_bits) & 1
+        else:
+            lat_bits -= 1
+            value = value << 1 | (lat_index >> lat_bits) & 1
+    return ''.join(GEOHASH_ALPHABET[(value >> shift) & 31] for shift in range((length - 1) * 5, -1, -5))
+
+
+def encode_geohash(latitude, longitude, length=GEOHASH_LENGTH):
+    """
+    Return the geohash of a point. Points that are close together share a prefix, so the points in an area can be
+    found with a range scan of an index on their geohashes.
+
+    :param latitude: Latitude in degrees
+    :type latitude: float
+    :param longitude: Longitude in degrees
+    :type longitude: float
+    :param length: Number of characters
+    :type length: int
+    :rtype: str
+    """
+    lat_bits, lng_bits = _cell_bits(length)
+    return _encode_cell(_cell_index(latitude, -90, 180 / 2 ** lat_bits, 2 ** lat_bits),
+                        _cell_index(longitude, -180, 360 / 2 ** lng_bits, 2 ** lng_bits),
+                        length)
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Return the smallest latitude/longitude box containing a circle. The longitudes may be outside -180 to 180 when the
+    circle crosses the antimeridian.
+
+    :param latitude: Latitude of the centre in degrees
+    :type latitude: float
+    :param longitude: Longitude of the centre in degrees
+    :type longitude: float
+    :param radius: Radius in km
+    :type radius: float
+    :return: (min latitude, max latitude, min longitude, max longitude)
+    :rtype: tuple
+    """
+    angle = radius / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angle)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle contains a pole, so all longitudes
+        return max(min_lat, -90), min(max_lat, 90), -180, 180
+    lng_delta = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    return min_lat, max_lat, longitude - lng_delta, longitude + lng_delta
+
+
+def covering_geohashes(latitude, longitude, radius):
+    """
+    Return the geohash cells that together cover a circle. The longest cells that need at most MAX_SEARCH_CELLS cells
+    are used, so that as little as possible outside the circle is covered.
+
+    :param latitude: Latitude of the centre in degrees
+    :type latitude: float
+    :param longitude: Longitude of the centre in degrees
+    :type longitude: float
+    :param radius: Radius in km
+    :type radius: float
+    :return: Sorted geohashes of the cells
+    :rtype: list
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+    for length in range(GEOHASH_LENGTH, 0, -1):
+        lat_bits, lng_bits = _cell_bits(length)
+        lat_size, lng_size = 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+        lat_indices = range(_cell_index(min_lat, -90, lat_size, 2 ** lat_bits),
+                            _cell_index(max_lat, -90, lat_size, 2 ** lat_bits) + 1)
+        # Not limited to the number of cells, so that the indices wrap around the antimeridian
+        first_lng_index = int(math.floor((min_lng + 180) / lng_size))
+        lng_count = min(int(math.floor((max_lng + 180) / lng_size)) - first_lng_index + 1, 2 ** lng_bits)
+        if len(lat_indices) * lng_count <= MAX_SEARCH_CELLS or length == 1:
+            return sorted(_encode_cell(lat_index, (first_lng_index + offset) % 2 ** lng_bits, length)
+                          for lat_index in lat_indices for offset in range(lng_count))
+
+
+def geohash_ranges(latitude, longitude, radius):
+    """
+    Return the ranges of stored geohashes that are within the cells covering a circle. Cells that are next to each
+    other in geohash order are merged into one range.
+
+    :param latitude: Latitude of the centre in degrees
+    :type latitude: float
+    :param longitude: Longitude of the centre in degrees
+    :type longitude: float
+    :param radius: Radius in km
+    :type radius: float
+    :return: List of (start, end) tuples. The start is inclusive and the end exclusive.
+    :rtype: list
+    """
+    ranges = []
+    previous = None
+    for cell in covering_geohashes(latitude, longitude, radius):
+        value = int(''.join('{0:05b}'.format(GEOHASH_ALPHABET.index(char)) for char in cell), 2)
+        # '~' sorts after every character of the alphabet, so "<cell>~" is after every geohash starting with the cell
+        if previous is not None and value == previous + 1:
+            ranges[-1] = (ranges[-1][0], cell + '~')
+        else:
+            ranges.append((cell, cell + '~'))
+        previous = value
+    return ranges
+
+
+def haversine_distance(latitude1, longitude1, latitude2, longitude2):
+    """
+    Return the great circle distance between two points
+
+    :rtype: float
+    :return: Distance in km
+    """
+    lat1, lat2 = math.radians(latitude1), math.radians(latitude2)
+    lat_delta, lng_delta = lat2 - lat1, math.radians(longitude2 - longitude1)
+    a = math.sin(lat_delta / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(lng_delta / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class AtMost(Func):
+    """
+    Boolean expression that is true when the first expression is less than or equal to the second, so that it can be
+    used in QuerySet.filter() without being annotated. An annotation would add a column, which would break the UNIONs
+    of Events and ArchivedEvents.
+    """
+    arg_joiner = ' <= '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def within_radius(latitude, longitude, radius):
+    """
+    Return an expression that is true for the rows whose latitude/longitude are within a circle. This is the haversine
+    formula compared without the inverse sine, so it is only evaluated on the rows found by the geohash ranges.
+
+    :param latitude: Latitude of the centre in degrees
+    :type latitude: float
+    :param longitude: Longitude of the centre in degrees
+    :type longitude: float
+    :param radius: Radius in km
+    :type radius: float
+    """
+    lat_delta = Radians(F('latitude') - latitude) / 2
+    lng_delta = Radians(F('longitude') - longitude) / 2
+    haversine = Power(Sin(lat_delta), 2) + \
+        math.cos(math.radians(latitude)) * Cos(Radians(F('latitude'))) * Power(Sin(lng_delta), 2)
+    limit = math.sin(min(radius / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+    return AtMost(haversine, limit, output_field=BooleanField())
+
+
+def filter_near(query_set, latitude, longitude, radius):
+    """
+    Filter a query set of Events or ArchivedEvents to those within a circle. The candidates are found with range scans
+    of the geohash index, and only those are checked against the exact distance.
+
+    This is an "id IN (subquery)" rather than a filter on the query set itself, as the query sets that count the
+    attendees GROUP BY the ID, and SQLite prefers to scan the table in ID order for that over using the geohash index.
+
+    :param query_set: Query set of Events or ArchivedEvents
+    :param latitude: Latitude of the centre in degrees
+    :type latitude: float
+    :param longitude: Longitude of the centre in degrees
+    :type longitude: float
+    :param radius: Radius in km
+    :type radius: float
+    """
+    cells = Q()
+    for start, end in geohash_ranges(latitude, longitude, radius):
+        cells |= Q(geohash__gte=start, geohash__lt=end)
+    nearby = query_set.model._default_manager.filter(cells).filter(within_radius(latitude, longitude, radius))
+    return query_set.filter(pk__in=nearby.values('pk'))
+
+
+def parse_near(near, radius=None):
+    """
+    Parse the near and radius query parameters
+
+    :param near: "<latitude>,<longitude>"
+    :type near: str
+    :param radius: Radius in km, defaults to DEFAULT_RADIUS_KM
+    :type radius: str
+    :return: (latitude, longitude, radius)
+    :rtype: tuple
+    :raises ValueError: if either parameter is invalid
+    """
+    try:
+        latitude, longitude = (float(value) for value in near.split(','))
+    except ValueError:
+        raise ValueError('near must be "<latitude>,<longitude>"')
+    try:
+        radius = float(radius) if radius not in (None, '') else DEFAULT_RADIUS_KM
+    except ValueError:
+        raise ValueError('radius must be a number of km')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('near must be a latitude from -90 to 90 and a longitude from -180 to 180')
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValueError('radius must be more than 0 and at most {0} km'.format(MAX_RADIUS_KM))
+    return latitude, longitude, radius
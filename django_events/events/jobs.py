@@ -0,0 +1,125 @@
+import datetime
+from collections import OrderedDict
+from django.conf import settings
+from django.core.mail import send_mass_mail, get_connection
+from django.db.models import Q
+
+from jobs.queue import register
+from users.models import User
+from .models import Event, OccurrenceAttendee
+from .recurrence import parse_occurrence
+
+DATE_TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+FIELD_LABELS = {
+    'title': 'Title',
+    'date_time': 'Date/time',
+    'description': 'Description',
+}
+
+RSVP_VERBS = {
+    'attend': 'is now attending',
+    'unattend': 'is no longer attending',
+}
+
+
+@register('events.notify_organiser', batch=True)
+def notify_organisers(payloads):
+    """
+    Email organisers about the RSVPs to their events. All of the RSVPs in a batch are combined, so an organiser gets
+    one email per batch however many people have responded, and the emails are sent over a single connection.
+
+    Organisers are not told about their own RSVPs, and RSVPs to events that have since been deleted or archived are
+    dropped.
+
+    :param payloads: List of {'event_id', 'user_ids', 'rsvp'} dictionaries, in the order the RSVPs were made. RSVPs to
+    an occurrence of a recurring event also have the 'occurrence' date/time.
+    :type payloads: list
+    """
+    events = Event.objects.select_related('organiser').in_bulk({payload['event_id'] for payload in payloads})
+    emails = dict(User.objects.filter(pk__in={user_id for payload in payloads for user_id in payload['user_ids']})
+                  .values_list('pk', 'email'))
+
+    # Organiser email -> lines of the message
+    lines_by_organiser = OrderedDict()
+    for payload in payloads:
+        event = events.get(payload['event_id'])
+        if event is None:
+            continue
+        date_time = parse_occurrence(payload['occurrence']) if 'occurrence' in payload else event.date_time
+        for user_id in payload['user_ids']:
+            if user_id == event.organiser_id or user_id not in emails:
+                continue
+            lines_by_organiser.setdefault(event.organiser.email, []).append(
+                '{0} {1} {2} ({3})'.format(emails[user_id], RSVP_VERBS[payload['rsvp']], event.title,
+                                           date_time.strftime(DATE_TIME_FORMAT)))
+
+    messages = [('New RSVPs to your events', '\n'.join(lines), settings.DEFAULT_FROM_EMAIL, [organiser_email])
+                for organiser_email, lines in lines_by_organiser.items()]
+    send_mass_mail(messages, fail_silently=False)
+
+
+@register('events.notify_promoted')
+def notify_promoted(event_id, user_ids):
+    """
+    Email users who have been moved from an event's waitlist to its attendees
+
+    :param event_id: ID of the event
+    :type event_id: int
+    :param user_ids: IDs of the promoted users
+    :type user_ids: list
+    """
+    event = Event.objects.filter(pk=event_id).only('title', 'date_time').first()
+    if event is None:
+        return
+    subject = 'You are now attending {0}'.format(event.title)
+    body = 'A place has become available at "{0}" ({1}), so you have been moved from the waitlist to the ' \
+           'attendees.'.format(event.title, event.date_time.strftime(DATE_TIME_FORMAT))
+    emails = User.objects.filter(pk__in=user_ids).values_list('email', flat=True)
+    send_mass_mail([(subject, body, settings.DEFAULT_FROM_EMAIL, [email]) for email in emails], fail_silently=False)
+
+
+@register('events.notify_attendees')
+def notify_attendees(event_id, changes):
+    """
+    Email every attendee of an event (other than the organiser) about changes to it, including the users attending
+    any future occurrence of a recurring event. Each user is emailed once however many occurrences they are attending.
+    The recipients are read with a single values_list() query, and the emails are sent in chunks of
+    EVENT_NOTIFICATION_CHUNK_SIZE over one SMTP connection that is opened once for the whole job.
+
+    If sending fails part way through then the job is retried, and attendees that were already emailed will get the
+    email again.
+
+    :param event_id: ID of the event that was changed
+    :type event_id: int
+    :param changes: Dictionary of field name -> [old value, new value], as formatted strings
+    :type changes: dict
+    """
+    event = Event.objects.filter(pk=event_id).only('title', 'organiser_id').first()
+    if event is None:
+        return
+
+    subject = 'Event changed: {0}'.format(event.title)
+    body = 'The following details of "{0}" have changed:\n\n{1}'.format(
+        event.title,
+        '\n'.join('{0}: {1} -> {2}'.format(FIELD_LABELS.get(field, field), old, new)
+                   for field, (old, new) in changes.items()))
+    attending = Event.attendees.through.objects.filter(event_id=event_id).values('user_id')
+    attending_occurrences = OccurrenceAttendee.objects.filter(event_id=event_id,
+                                                              occurrence__gte=datetime.datetime.now()).values('user_id')
+    recipients = User.objects.filter(Q(pk__in=attending) | Q(pk__in=attending_occurrences))\
+        .exclude(pk=event.organiser_id).values_list('email', flat=True)
+
+    connection = get_connection()
+    connection.open()
+    try:
+        chunk = []
+        for email in recipients.iterator():
+            chunk.append((subject, body, settings.DEFAULT_FROM_EMAIL, [email]))
+            if len(chunk) == settings.EVENT_NOTIFICATION_CHUNK_SIZE:
+                send_mass_mail(chunk, fail_silently=False, connection=connection)
+                chunk = []
+        if chunk:
+            send_mass_mail(chunk, fail_silently=False, connection=connection)
+    finally:
+        connection.close()
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.archive import archive_events
+
+
+class Command(BaseCommand):
+    help = "Moves events (and their attendees) that happened more than EVENT_ARCHIVE_DAYS ago into the archive " \
+           "tables, so that the events table stays small. Archived events are still shown in the list of past events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.EVENT_ARCHIVE_DAYS,
+                            help='Archive events older than this many days')
+        parser.add_argument('--batch-size', type=int, default=500, help='Events archived per transaction')
+
+    def handle(self, *args, **options):
+        """
+        Archives the events in batches
+        """
+        total = archive_events(options['days'], options['batch_size'], stdout=self.stdout)
+        self.stdout.write('Archived {0} events older than {1} days'.format(total, options['days']))
@@ -0,0 +1,37 @@
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database to each of the SQLite read replicas (DATABASE_REPLICAS). " \
+           "This is intended for testing replica routing locally, e.g. by running it periodically to simulate lag."
+
+    def handle(self, *args, **kwargs):
+        """
+        Copies the primary database to each replica using the SQLite online backup API, which is safe to run while
+        the primary is in use
+
+        :param args: Unused
+        :param kwargs: Unused
+        """
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas are configured, set DATABASE_REPLICAS')
+
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('The primary database is not SQLite')
+
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                connections[alias].close()
+                destination = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    source.backup(destination)
+                finally:
+                    destination.close()
+                self.stdout.write('Copied {0} to {1}'.format(primary['NAME'], alias))
+        finally:
+            source.close()
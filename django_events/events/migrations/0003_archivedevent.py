@@ -0,0 +1,32 @@
+# Generated by Django 3.0.14 on 2026-10-19 15:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0002_auto_20200626_2109'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='date_time',
+            field=models.DateTimeField(db_index=True, help_text='Format: YYYY-MM-DD HH:MM:SS'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=250)),
+                ('description', models.TextField(default='')),
+                ('date_time', models.DateTimeField(db_index=True)),
+                ('attendees', models.ManyToManyField(blank=True, related_name='archived_events_attendees', to=settings.AUTH_USER_MODEL)),
+                ('organiser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_events_organiser', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
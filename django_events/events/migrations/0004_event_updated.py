@@ -0,0 +1,25 @@
+# Generated by Django 3.0.14 on 2026-10-19 15:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_archivedevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedevent',
+            name='updated',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
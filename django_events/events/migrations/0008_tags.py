@@ -0,0 +1,66 @@
+# Generated by Django 3.0.14 on 2026-10-19 17:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_tags', to='events.Event')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_tags', to='events.Tag')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEventTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_tags', to='events.ArchivedEvent')),
+                ('tag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_event_tags', to='events.Tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='archived_events', through='events.ArchivedEventTag', to='events.Tag'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='events', through='events.EventTag', to='events.Tag'),
+        ),
+        migrations.AddIndex(
+            model_name='eventtag',
+            index=models.Index(fields=['tag', 'event'], name='events_eventtag_tag_event'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventtag',
+            unique_together={('event', 'tag')},
+        ),
+        migrations.AddIndex(
+            model_name='archivedeventtag',
+            index=models.Index(fields=['tag', 'event'], name='events_archivedtag_tag_event'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedeventtag',
+            unique_together={('event', 'tag')},
+        ),
+    ]
@@ -1,83 +1,342 @@
 import datetime
 from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.shortcuts import reverse
-from django.db.models import Count,  Case, When, BooleanField, Value as V
+from django.conf import settings
+from django.db.models import Q, Count,  Case, When, BooleanField, Exists, OuterRef, Value as V
 
 from users.models import User
+from metrics.query_logging import SlowQueryLoggingMixin, label_queries
+from .geo import GEOHASH_LENGTH, encode_geohash, filter_near
 
 
-class EventQuerySet(models.QuerySet):
+class EventQuerySet(SlowQueryLoggingMixin, models.QuerySet):
 
+    # (latitude, longitude, radius) set by near(), so that the past events lists can filter the archived events too
+    _near = None
+    # Tag name set by tagged(), for the same reason
+    _tag = None
+
+    def _clone(self):
+        c = super(EventQuerySet, self)._clone()
+        c._near = self._near
+        c._tag = self._tag
+        return c
+
+    def near(self, latitude, longitude, radius):
+        """
+        Return the events within a distance of a point, found using the geohash index (see events.geo.filter_near()).
+        The get_*() methods can be called on the result, e.g. Event.objects.near(...).get_current_occurrences().
+
+        :param latitude: Latitude in degrees
+        :type latitude: float
+        :param longitude: Longitude in degrees
+        :type longitude: float
+        :param radius: Distance in km
+        :type radius: float
+        """
+        query_set = filter_near(self, latitude, longitude, radius)
+        query_set._near = (latitude, longitude, radius)
+        return query_set
+
+    def tagged(self, name):
+        """
+        Return the events with a tag. The get_*() methods can be called on the result, e.g.
+        Event.objects.tagged('workshop').get_current_occurrences().
+
+        :param name: Name of the tag
+        :type name: str
+        """
+        query_set = filter_tagged(self, name)
+        query_set._tag = name
+        return query_set
+
+    def _get_archived_events(self):
+        """
+        Return the ArchivedEvents, within the distance given to near() and with the tag given to tagged() if they were
+        called
+        """
+        archived_events = ArchivedEvent.objects.all()
+        if self._near:
+            archived_events = filter_near(archived_events, *self._near)
+        if self._tag:
+            archived_events = filter_tagged(archived_events, self._tag)
+        return archived_events
+
+    @label_queries
     def get_events_organised_by_user(self, user):
         """
-        Return a query set of events organised by the given user
+        Return a query set of events organised by the given user, including those that have been archived.
+
+        Like get_events_in_past() this is a union of the Event and ArchivedEvent tables, so it can't be filtered any
+        further.
 
         :param user: The current user
         """
-        return self.filter(organiser=user)\
-            .annotate(attendees_count=Count('attendees')) \
-            .order_by('date_time')
+        events = self.filter(organiser=user)\
+            .annotate(attendees_count=Count('attendees'))
+        archived_events = self._get_archived_events().filter(organiser=user)\
+            .annotate(attendees_count=Count('attendees'))
+        return events.union(archived_events, all=True).order_by('date_time')
 
+    @label_queries
     def get_events_attended_by_user(self, user):
         """
-        Return a query set of events that the given user is attending
+        Return a query set of events that the given user is attending, including those that have been archived.
+
+        Like get_events_in_past() this is a union of the Event and ArchivedEvent tables, so it can't be filtered any
+        further.
 
         :param user: The current user
         """
-        return self.filter(attendees__in=[user]) \
-            .annotate(attendees_count=Count('attendees')) \
-            .order_by('date_time')
+        events = self.filter(attendees__in=[user])\
+            .annotate(attendees_count=Count('attendees'))
+        archived_events = self._get_archived_events().filter(attendees__in=[user])\
+            .annotate(attendees_count=Count('attendees'))
+        return events.union(archived_events, all=True).order_by('date_time')
 
+    @label_queries
     def get_current_events(self, _=None):
         """
-        Return a query set of events that are in the future
+        Return a query set of events that are in the future, including recurring events that have occurrences in the
+        future
         """
-        return self.filter(date_time__gte=datetime.datetime.now())\
+        now = datetime.datetime.now()
+        return self.filter(Q(date_time__gte=now) | recurring_between(now))\
             .annotate(attendees_count=Count('attendees'))\
             .order_by('date_time')
 
-    def get_events_in_past(self, _=None):
+    @label_queries
+    def get_current_occurrences(self, _=None):
         """
-        Return a query set of events that are in the past
+        Return the future events with each recurring event expanded into its occurrences, up to
+        EVENT_RECURRENCE_HORIZON_DAYS ahead. The occurrences are generated as the list is read, rather than being stored.
+
+        :rtype: events.recurrence.OccurrenceList
         """
-        return self.filter(date_time__lte=datetime.datetime.now())\
+        from .recurrence import OccurrenceList
+        now = datetime.datetime.now()
+        end = now + datetime.timedelta(days=settings.EVENT_RECURRENCE_HORIZON_DAYS)
+        single_events = self.filter(recurrence='', date_time__gte=now)\
             .annotate(attendees_count=Count('attendees'))\
             .order_by('date_time')
+        return OccurrenceList(single_events, self.filter(recurring_between(now, end)), now, end)
+
+    @label_queries
+    def get_events_in_past(self, _=None):
+        """
+        Return a query set of events that are in the past, including those that have been archived.
+
+        This is a union of the Event and ArchivedEvent tables, so it can be counted, sliced and iterated over (all
+        rows are returned as Event instances) but not filtered any further.
+        """
+        now = datetime.datetime.now()
+        events = self.filter(date_time__lte=now)\
+            .annotate(attendees_count=Count('attendees'))
+        archived_events = self._get_archived_events().filter(date_time__lte=now)\
+            .annotate(attendees_count=Count('attendees'))
+        return events.union(archived_events, all=True).order_by('date_time')
+
+    @label_queries
+    def get_past_occurrences(self, _=None):
+        """
+        Return the past events (including archived events) with each recurring event expanded into its past
+        occurrences. The occurrences are generated as the list is read, rather than being stored.
 
+        :rtype: events.recurrence.OccurrenceList
+        """
+        from .recurrence import OccurrenceList
+        now = datetime.datetime.now()
+        events = self.filter(recurrence='', date_time__lte=now)\
+            .annotate(attendees_count=Count('attendees'))
+        archived_events = self._get_archived_events().filter(date_time__lte=now)\
+            .annotate(attendees_count=Count('attendees'))
+        single_events = events.union(archived_events, all=True).order_by('date_time')
+        return OccurrenceList(single_events, self.exclude(recurrence='').filter(date_time__lte=now), None, now)
+
+    @label_queries
     def get_event(self, pk, user):
         """
-        Return a specific event by PK.
+        Return a specific event by PK. If the event has been archived then the ArchivedEvent is returned.
 
         The following annotations are also added:
         -is_organiser - True if the given user is the event organiser
         -is_attending - True if the given user is attending the event
+        -is_waitlisted - True if the given user is on the event's waitlist
         -is_in_past - True if the event has already happened
         -attendees_count - Number of attendees
 
         :param pk: ID of the Event
         :param user: The current user
         """
-        return self.filter(pk=pk)\
-            .annotate(is_organiser=Case(When(organiser=user.id, then=V(True)),
-                                        default=V(False),
-                                        output_field=BooleanField()),
-                      is_attending=Case(When(attendees__id=user.id, then=V(True)),
-                                        default=V(False),
-                                        output_field=BooleanField()),
-                      is_in_past=Case(When(date_time__lt=datetime.datetime.now(), then=V(True)),
-                                      default=V(False),
-                                      output_field=BooleanField()),
-                      attendees_count=Count('attendees')).first()
+        waitlisted = WaitlistEntry.objects.filter(event=OuterRef('pk'), user=user.id)
+        event = annotate_event_detail(self.filter(pk=pk), user).annotate(is_waitlisted=Exists(waitlisted)).first()
+        if event is None:
+            event = annotate_event_detail(ArchivedEvent.objects.filter(pk=pk), user).first()
+        return event
+
+    @label_queries
+    def get_events(self, pks, user):
+        """
+        Return the events with the given PKs, with the same annotations as get_event(). The organisers are joined and
+        the attendees and tags prefetched, so this is three queries however many events there are, plus three more if
+        any of them have been archived.
+
+        :param pks: IDs of the Events
+        :type pks: list
+        :param user: The current user
+        :return: Dictionary of the events found by PK
+        :rtype: dict
+        """
+        waitlisted = WaitlistEntry.objects.filter(event=OuterRef('pk'), user=user.id)
+        events = annotate_event_detail(self.filter(pk__in=pks), user).annotate(is_waitlisted=Exists(waitlisted))
+        events = {event.pk: event for event in
+                  events.select_related('organiser').prefetch_related('attendees', 'tags')}
+        archived_pks = [pk for pk in pks if pk not in events]
+        if archived_pks:
+            archived_events = annotate_event_detail(ArchivedEvent.objects.filter(pk__in=archived_pks), user)
+            events.update((event.pk, event) for event in
+                          archived_events.select_related('organiser').prefetch_related('attendees', 'tags'))
+        return events
+
+    @label_queries
+    def get_tag_counts(self):
+        """
+        Return the number of current events with each tag, with a single query grouped by tag. The events are the same
+        as get_current_events(), so a recurring event is counted once rather than once per occurrence.
+
+        :return: List of (tag name, number of events) tuples, ordered by name
+        :rtype: list
+        """
+        now = datetime.datetime.now()
+        current_events = self.filter(Q(date_time__gte=now) | recurring_between(now))
+        return list(EventTag.objects.filter(event__in=current_events.values('pk'))
+                    .values_list('tag__name')
+                    .annotate(events_count=Count('event'))
+                    .order_by('tag__name'))
+
+
+def recurring_between(start, end=None):
+    """
+    Return a filter for recurring events that may have occurrences between two dates/times
+
+    :param start: Start of the window
+    :type start: datetime.datetime
+    :param end: Optional end of the window
+    :type end: datetime.datetime
+    :rtype: Q
+    """
+    query = ~Q(recurrence='') & (Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=start))
+    if end is not None:
+        query &= Q(date_time__lt=end)
+    return query
+
+
+def get_geohash(latitude, longitude):
+    """
+    Return the geohash to store for an event's location
+
+    :param latitude: Latitude, or None if the event has no location
+    :type latitude: float
+    :param longitude: Longitude, or None if the event has no location
+    :type longitude: float
+    :return: The geohash, or an empty string (which no search matches) if the event has no location
+    :rtype: str
+    """
+    if latitude is None or longitude is None:
+        return ''
+    return encode_geohash(latitude, longitude)
+
+
+def filter_tagged(query_set, name):
+    """
+    Filter a query set of Events or ArchivedEvents to those with a tag. The tagged events are found from the (tag,
+    event) index of the through table, without reading the table itself.
+
+    This is an "id IN (subquery)" for the same reason as filter_near(): the lists GROUP BY the ID, so SQLite reads
+    every row that matches the other filters before ordering them, and an EXISTS would be checked for each of them.
+
+    :param query_set: Query set of Events or ArchivedEvents
+    :param name: Name of the tag
+    :type name: str
+    """
+    tagged = query_set.model.tags.through.objects.filter(tag__name=name)
+    return query_set.filter(pk__in=tagged.values('event'))
+
+
+def annotate_event_detail(query_set, user):
+    """
+    Add the annotations returned by EventQuerySet.get_event() to a query set of Events or ArchivedEvents.
+
+    is_attending is an EXISTS subquery rather than a join on the attendees, as a join would split the attendees into
+    one group per value of is_attending, giving the wrong attendees_count.
+
+    :param query_set: Query set of Events or ArchivedEvents
+    :param user: The current user
+    """
+    attendance = query_set.model.attendees.through.objects.filter(**{
+        query_set.model.attendees.field.m2m_field_name(): OuterRef('pk'),
+        'user': user.id,
+    })
+    return query_set.annotate(is_organiser=Case(When(organiser=user.id, then=V(True)),
+                                                default=V(False),
+                                                output_field=BooleanField()),
+                              is_attending=Exists(attendance),
+                              is_in_past=Case(When(date_time__lt=datetime.datetime.now(), then=V(True)),
+                                              default=V(False),
+                                              output_field=BooleanField()),
+                              attendees_count=Count('attendees'))
+
+
+class Tag(models.Model):
+    """
+    A category that events can be tagged with, e.g. "workshop" or "social"
+    """
+    name = models.SlugField(max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
 
 
 class Event(models.Model):
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    RECURRENCE_CHOICES = [
+        ('', 'Does not repeat'),
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+    ]
+
     title = models.CharField(max_length=250)
     description = models.TextField(default='')
     organiser = models.ForeignKey(User, related_name='events_organiser', on_delete=models.CASCADE)
-    date_time = models.DateTimeField(help_text='Format: YYYY-MM-DD HH:MM:SS')
+    date_time = models.DateTimeField(help_text='Format: YYYY-MM-DD HH:MM:SS', db_index=True)
+    updated = models.DateTimeField(auto_now=True)
+    # A recurring event repeats every recurrence_interval days/weeks from date_time, until recurrence_until (if set).
+    # Its occurrences aren't stored, and RSVPs to them are stored as OccurrenceAttendees rather than in attendees.
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, default='', blank=True)
+    recurrence_interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)],
+                                                           help_text='Repeat every this many days/weeks')
+    recurrence_until = models.DateTimeField(null=True, blank=True, help_text='Format: YYYY-MM-DD HH:MM:SS')
+    # Once an event has this many attendees, further RSVPs join its waitlist (see events.waitlist)
+    capacity = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(1)],
+                                           help_text='Maximum number of attendees. Leave blank for no limit.')
+    # Where the event is held, if it has a location. save() sets the geohash from them, which is indexed so that events
+    # near a point can be found with range scans (see events.geo).
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=GEOHASH_LENGTH, default='', blank=True, editable=False, db_index=True)
     attendees = models.ManyToManyField(User, related_name='events_attendees', blank=True)
+    tags = models.ManyToManyField(Tag, through='EventTag', related_name='events', blank=True)
     objects = EventQuerySet.as_manager()
 
+    # Only set on the Occurrences of a recurring event
+    occurrence = None
+
     def __str__(self):
         return '{0}: {1}'.format(self.date_time, self.title)
 
@@ -87,3 +346,149 @@ class Event(models.Model):
         :return:
         """
         return reverse("events_view", args=(self.id,))
+
+    def clean(self):
+        """
+        Check that a recurring event doesn't end before it starts, and doesn't have a capacity (the RSVPs to its
+        occurrences aren't limited), and that the location has both a latitude and a longitude
+        """
+        if self.recurrence and self.recurrence_until and self.date_time and self.recurrence_until < self.date_time:
+            raise ValidationError({'recurrence_until': 'A recurring event cannot end before it starts'})
+        if self.recurrence and self.capacity is not None:
+            raise ValidationError({'capacity': 'A recurring event cannot have a capacity'})
+        if (self.latitude is None) != (self.longitude is None):
+            missing = 'longitude' if self.longitude is None else 'latitude'
+            raise ValidationError({missing: 'A location needs both a latitude and a longitude'})
+
+    def save(self, *args, **kwargs):
+        """
+        Override to set the geohash from the latitude and longitude. QuerySet.update() and bulk_create() don't call
+        this, so they must set it too.
+        """
+        self.geohash = get_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ('latitude' in update_fields or 'longitude' in update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super(Event, self).save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Override to remember the values the instance was loaded with, so that get_changes() can tell which fields have
+        been changed without querying the database again
+        """
+        instance = super(Event, cls).from_db(db, field_names, values)
+        instance._loaded_values = {name: value for name, value in zip(field_names, values)
+                                   if value is not models.DEFERRED}
+        return instance
+
+    def get_changes(self, fields):
+        """
+        Return the fields that have been changed since the event was loaded from the database
+
+        :param fields: Names of the fields to compare
+        :type fields: list
+        :return: Dictionary of field name -> (old value, new value). Empty if the event wasn't loaded from the database.
+        :rtype: dict
+        """
+        loaded_values = getattr(self, '_loaded_values', {})
+        return {field: (loaded_values[field], getattr(self, field)) for field in fields
+                if field in loaded_values and loaded_values[field] != getattr(self, field)}
+
+
+class ArchivedEvent(models.Model):
+    """
+    An event that has been moved out of the Event table by the archive_events command, so that the Event table only
+    holds recent and future events. The fields must stay in the same order as Event's, as the two tables are combined
+    with a UNION by EventQuerySet.get_events_in_past().
+    """
+    # Keeps the ID the event had in the Event table, so that links to it still work
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=250)
+    description = models.TextField(default='')
+    organiser = models.ForeignKey(User, related_name='archived_events_organiser', on_delete=models.CASCADE)
+    date_time = models.DateTimeField(db_index=True)
+    updated = models.DateTimeField()
+    recurrence = models.CharField(max_length=10, choices=Event.RECURRENCE_CHOICES, default='', blank=True)
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_until = models.DateTimeField(null=True, blank=True)
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=GEOHASH_LENGTH, default='', blank=True, db_index=True)
+    attendees = models.ManyToManyField(User, related_name='archived_events_attendees', blank=True)
+    tags = models.ManyToManyField(Tag, through='ArchivedEventTag', related_name='archived_events', blank=True)
+
+    occurrence = None
+    # Archived events don't have waitlists
+    is_waitlisted = False
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.date_time, self.title)
+
+    def get_absolute_url(self):
+        return reverse("events_view", args=(self.id,))
+
+
+class EventTag(models.Model):
+    """
+    Through table of Event.tags. The unique (event, tag) index finds an event's tags and the (tag, event) index finds a
+    tag's events, both without reading the table, so the foreign keys don't need indexes of their own.
+    """
+    event = models.ForeignKey(Event, related_name='event_tags', on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, related_name='event_tags', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        unique_together = [('event', 'tag')]
+        indexes = [models.Index(fields=['tag', 'event'], name='events_eventtag_tag_event')]
+
+    def __str__(self):
+        return '{0} tagged {1}'.format(self.event_id, self.tag_id)
+
+
+class ArchivedEventTag(models.Model):
+    """
+    Through table of ArchivedEvent.tags, with the same indexes as EventTag
+    """
+    event = models.ForeignKey(ArchivedEvent, related_name='event_tags', on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, related_name='archived_event_tags', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        unique_together = [('event', 'tag')]
+        indexes = [models.Index(fields=['tag', 'event'], name='events_archivedtag_tag_event')]
+
+    def __str__(self):
+        return '{0} tagged {1}'.format(self.event_id, self.tag_id)
+
+
+class OccurrenceAttendee(models.Model):
+    """
+    A user attending one occurrence of a recurring event
+    """
+    event = models.ForeignKey(Event, related_name='occurrence_attendees', on_delete=models.CASCADE)
+    occurrence = models.DateTimeField()
+    user = models.ForeignKey(User, related_name='occurrence_attendances', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = [('event', 'occurrence', 'user')]
+
+    def __str__(self):
+        return '{0} attending {1} at {2}'.format(self.user, self.event_id, self.occurrence)
+
+
+class WaitlistEntry(models.Model):
+    """
+    A user waiting for a place at an event that is full. The earliest entry is promoted to an attendee when a place
+    becomes free.
+    """
+    event = models.ForeignKey(Event, related_name='waitlist', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name='waitlist_entries', on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('event', 'user')]
+        ordering = ['created', 'id']
+        verbose_name_plural = 'waitlist entries'
+
+    def __str__(self):
+        return '{0} waiting for {1}'.format(self.user, self.event_id)
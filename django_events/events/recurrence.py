@@ -0,0 +1,370 @@
+import datetime
+import heapq
+import itertools
+from django.db import transaction
+from django.db.models import Count
+from django.shortcuts import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+from jobs.queue import enqueue
+from .models import Event, OccurrenceAttendee
+
+FREQUENCIES = {
+    Event.DAILY: datetime.timedelta(days=1),
+    Event.WEEKLY: datetime.timedelta(weeks=1),
+}
+
+
+def get_period(event):
+    """
+    Return the time between the occurrences of a recurring event
+
+    :param event: A recurring Event
+    :rtype: datetime.timedelta
+    """
+    return FREQUENCIES[event.recurrence] * event.recurrence_interval
+
+
+def iter_occurrences(event, start=None, end=None):
+    """
+    Generate the date/times of an event's occurrences from start (inclusive) to end (exclusive), in order. The first
+    occurrence is calculated directly rather than by stepping through the earlier ones. An event that doesn't recur has
+    a single occurrence.
+
+    :param event: The Event
+    :param start: Optional start of the window
+    :type start: datetime.datetime
+    :param end: Optional end of the window. Without an end, a recurring event that has no recurrence_until never ends.
+    :type end: datetime.datetime
+    """
+    if not event.recurrence:
+        if (start is None or event.date_time >= start) and (end is None or event.date_time < end):
+            yield event.date_time
+        return
+
+    period = get_period(event)
+    index = 0
+    if start is not None and start > event.date_time:
+        # Round up to the first occurrence at or after start
+        index = -((event.date_time - start) // period)
+    while True:
+        occurrence = event.date_time + index * period
+        if (end is not None and occurrence >= end) or \
+                (event.recurrence_until is not None and occurrence > event.recurrence_until):
+            return
+        yield occurrence
+        index += 1
+
+
+def count_occurrences(event, start=None, end=None):
+    """
+    Return the number of occurrences iter_occurrences() would generate, without generating them
+
+    :param event: The Event
+    :param start: Optional start of the window
+    :type start: datetime.datetime
+    :param end: End of the window. Required unless the event has a recurrence_until.
+    :type end: datetime.datetime
+    :rtype: int
+    """
+    if not event.recurrence:
+        return sum(1 for _ in iter_occurrences(event, start, end))
+
+    period = get_period(event)
+    first = 0
+    if start is not None and start > event.date_time:
+        first = -((event.date_time - start) // period)
+    # Index of the last occurrence before end, and of the last occurrence at or before recurrence_until
+    limits = []
+    if end is not None:
+        limits.append(-((event.date_time - end) // period) - 1)
+    if event.recurrence_until is not None:
+        limits.append((event.recurrence_until - event.date_time) // period)
+    return max(0, min(limits) - first + 1)
+
+
+def is_occurrence(event, date_time):
+    """
+    Return True if an event has an occurrence at the given date/time
+
+    :param event: The Event
+    :param date_time: The date/time to check
+    :type date_time: datetime.datetime
+    :rtype: bool
+    """
+    return next(iter_occurrences(event, date_time, date_time + datetime.timedelta(microseconds=1)), None) is not None
+
+
+def format_occurrence(date_time):
+    """
+    Format the date/time of an occurrence for a URL or a job payload. This is ISO 8601, with the microseconds only if
+    there are any.
+
+    :param date_time: Date/time of the occurrence
+    :type date_time: datetime.datetime
+    :rtype: str
+    """
+    return date_time.isoformat()
+
+
+def parse_occurrence(value):
+    """
+    Parse the date/time of an occurrence from a request parameter or a job payload
+
+    :param value: Date/time from format_occurrence()
+    :type value: str
+    :return: The date/time, or None if the value isn't valid
+    :rtype: datetime.datetime
+    """
+    try:
+        date_time = parse_datetime(value or '')
+    except ValueError:
+        return None
+    # Date/times are stored without a time zone
+    if date_time is None or date_time.tzinfo is not None:
+        return None
+    return date_time
+
+
+class Occurrence(object):
+    """
+    One occurrence of a recurring event. Anything not overridden here (title, organiser etc) is read from the event, so
+    an Occurrence can be rendered and serialized in the same way as an Event.
+    """
+
+    def __init__(self, event, date_time, attendees_count=0):
+        """
+        :param event: The recurring Event
+        :param date_time: Date/time of this occurrence
+        :type date_time: datetime.datetime
+        :param attendees_count: Number of users attending this occurrence
+        :type attendees_count: int
+        """
+        self.event = event
+        self.date_time = date_time
+        self.occurrence = date_time
+        self.attendees_count = attendees_count
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
+    def __eq__(self, other):
+        return isinstance(other, Occurrence) and (self.event.pk, self.date_time) == (other.event.pk, other.date_time)
+
+    def __repr__(self):
+        return '<Occurrence: {0} at {1}>'.format(self.event.pk, self.date_time)
+
+    def get_absolute_url(self):
+        return '{0}?{1}'.format(reverse('events_view', args=(self.event.pk,)),
+                                urlencode({'occurrence': format_occurrence(self.date_time)}))
+
+
+class OccurrenceList(object):
+    """
+    List of the events in a window ordered by date/time, with each recurring event expanded into its occurrences in the
+    window. Supports len() and slicing, so it can be paginated like a QuerySet (by Django's Paginator and DRF).
+
+    Nothing is loaded until it is sliced or iterated. The recurring events are loaded with one query. A slice of the
+    other events is then loaded with LIMIT/OFFSET, and merged with the occurrences as they are generated. Without any
+    recurring events that is the whole slice. Otherwise the number of other events before the slice is found with a
+    binary search, which loads one event per step and counts the occurrences before it arithmetically, so a deep page
+    costs O(log(offset)) single row queries rather than reading every earlier row. The attendee counts of the
+    occurrences in a slice are loaded with one more query.
+    """
+
+    def __init__(self, single_events, recurring_events, start=None, end=None):
+        """
+        :param single_events: QuerySet of the events that don't recur, ordered by date_time and annotated with
+        attendees_count
+        :param recurring_events: QuerySet of the recurring events that may have occurrences in the window
+        :param start: Optional start of the window
+        :type start: datetime.datetime
+        :param end: End of the window. Recurring events without a recurrence_until need an end.
+        :type end: datetime.datetime
+        """
+        self.single_events = single_events
+        self.recurring_events = recurring_events
+        self.start = start
+        self.end = end
+        self._recurring = None
+
+    def _get_recurring(self):
+        if self._recurring is None:
+            self._recurring = list(self.recurring_events)
+        return self._recurring
+
+    def count(self):
+        """
+        Return the number of events and occurrences in the window, without generating the occurrences
+        """
+        return self.single_events.count() + \
+            sum(count_occurrences(event, self.start, self.end) for event in self._get_recurring())
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, single_events, skip_occurrences=0):
+        """
+        Generate the events and occurrences in date/time order
+
+        :param single_events: The events that don't recur, or a slice of them
+        :param skip_occurrences: Number of occurrences before the first of single_events to leave out
+        :type skip_occurrences: int
+        """
+        def sort_key(item):
+            return item[0]
+
+        occurrences = heapq.merge(*[self._tag_occurrences(event) for event in self._get_recurring()], key=sort_key)
+        occurrences = itertools.islice(occurrences, skip_occurrences, None)
+        single_events = (((event.date_time, event.pk), event) for event in single_events)
+        for (date_time, _), event in heapq.merge(occurrences, single_events, key=sort_key):
+            if event.recurrence:
+                yield Occurrence(event, date_time)
+            else:
+                yield event
+
+    def _tag_occurrences(self, event):
+        """
+        Generate ((date/time, pk), event) for each occurrence of a recurring event in the window, for _merge() to sort
+        on
+        """
+        for date_time in iter_occurrences(event, self.start, self.end):
+            yield (date_time, event.pk), event
+
+    def _count_occurrences_before(self, event):
+        """
+        Return the number of occurrences that come before an event that doesn't recur in the list
+        """
+        end = event.date_time if self.end is None else min(event.date_time, self.end)
+        count = 0
+        for recurring_event in self._get_recurring():
+            count += count_occurrences(recurring_event, self.start, end)
+            # Occurrences at the same date/time are ordered by the event's pk
+            if end == event.date_time and recurring_event.pk < event.pk and is_occurrence(recurring_event, end):
+                count += 1
+        return count
+
+    def _count_single_events_before(self, position):
+        """
+        Return the number of events that don't recur among the first position items of the list. Binary search on the
+        index of an event that doesn't recur, as its position in the list (its index plus the number of occurrences
+        before it) increases with the index.
+
+        :param position: Position in the list
+        :type position: int
+        :rtype: int
+        """
+        low, high = 0, position
+        while low < high:
+            middle = (low + high) // 2
+            events = list(self.single_events[middle:middle + 1])
+            if events and middle + self._count_occurrences_before(events[0]) < position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _get_slice(self, start, stop):
+        """
+        Return the events and occurrences from start to stop (or the end of the list if stop is None)
+        """
+        if not self._get_recurring():
+            return list(self.single_events[start:stop])
+        single_start = self._count_single_events_before(start) if start else 0
+        single_stop = None if stop is None else single_start + stop - start
+        items = self._merge(self.single_events[single_start:single_stop], start - single_start)
+        return list(itertools.islice(items, None if stop is None else stop - start))
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step is not None:
+                raise ValueError('Slicing with a step is not supported')
+            start = index.start or 0
+            if start < 0 or (index.stop is not None and index.stop < 0):
+                raise ValueError('Negative indexing is not supported')
+            if index.stop is not None and index.stop <= start:
+                return []
+            items = self._get_slice(start, index.stop)
+            self._add_attendees_counts(items)
+            return items
+        items = self[index:index + 1]
+        if not items:
+            raise IndexError('OccurrenceList index out of range')
+        return items[0]
+
+    @staticmethod
+    def _add_attendees_counts(items):
+        """
+        Set the attendees_count of the occurrences in a list, with a single query
+        """
+        occurrences = [item for item in items if isinstance(item, Occurrence)]
+        if not occurrences:
+            return
+        counts = OccurrenceAttendee.objects\
+            .filter(event_id__in={occurrence.event.pk for occurrence in occurrences},
+                    occurrence__in={occurrence.date_time for occurrence in occurrences})\
+            .values_list('event_id', 'occurrence')\
+            .annotate(count=Count('id'))\
+            .order_by()
+        counts = {(event_id, date_time): count for event_id, date_time, count in counts}
+        for occurrence in occurrences:
+            occurrence.attendees_count = counts.get((occurrence.event.pk, occurrence.date_time), 0)
+
+
+def get_occurrence_detail(event, date_time, user):
+    """
+    Return an occurrence of an event returned by EventQuerySet.get_event(), with the annotations from get_event() set
+    for the occurrence rather than the event as a whole
+
+    :param event: Recurring Event from get_event()
+    :param date_time: Date/time of the occurrence
+    :type date_time: datetime.datetime
+    :param user: The current user
+    :return: The Occurrence, or None if the event doesn't have an occurrence at that time
+    """
+    if not is_occurrence(event, date_time):
+        return None
+    attendees = [attendance.user for attendance in
+                 OccurrenceAttendee.objects.filter(event=event, occurrence=date_time).select_related('user')]
+    occurrence = Occurrence(event, date_time, len(attendees))
+    occurrence.attendees = attendees
+    occurrence.is_attending = any(attendee.pk == user.pk for attendee in attendees)
+    occurrence.is_waitlisted = False
+    occurrence.is_in_past = date_time < datetime.datetime.now()
+    return occurrence
+
+
+def attend_occurrence(event, date_time, user):
+    """
+    Mark a user as attending an occurrence of a recurring event, and queue a notification to the organiser
+
+    :param event: The recurring Event
+    :param date_time: Date/time of the occurrence
+    :type date_time: datetime.datetime
+    :param user: The user
+    """
+    with transaction.atomic():
+        _, created = OccurrenceAttendee.objects.get_or_create(event=event, occurrence=date_time, user=user)
+        if created:
+            enqueue('events.notify_organiser', event_id=event.pk, user_ids=[user.pk], rsvp='attend',
+                    occurrence=format_occurrence(date_time))
+
+
+def unattend_occurrence(event, date_time, user):
+    """
+    Remove a user from an occurrence of a recurring event, and queue a notification to the organiser
+
+    :param event: The recurring Event
+    :param date_time: Date/time of the occurrence
+    :type date_time: datetime.datetime
+    :param user: The user
+    """
+    with transaction.atomic():
+        deleted, _ = OccurrenceAttendee.objects.filter(event=event, occurrence=date_time, user=user).delete()
+        if deleted:
+            enqueue('events.notify_organiser', event_id=event.pk, user_ids=[user.pk], rsvp='unattend',
+                    occurrence=format_occurrence(date_time))
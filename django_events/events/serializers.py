@@ -1,7 +1,9 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
 from users.serializers import UserSerializer
 from .models import Event
+from .tags import parse_tags, set_event_tags
 
 
 class BaseEventSerializer(serializers.ModelSerializer):
@@ -15,21 +17,71 @@ class BaseEventSerializer(serializers.ModelSerializer):
 
 class EventListSerializer(BaseEventSerializer):
     attendees_count = serializers.IntegerField(read_only=True)
+    # Date/time of the occurrence, for the occurrences of recurring events in the list (otherwise null)
+    occurrence = serializers.DateTimeField(read_only=True)
+    # Names of the tags to set when creating/updating an event. They are returned by EventDetailSerializer, rather than
+    # in the list, so that the list doesn't need another query.
+    tags = serializers.ListField(child=serializers.CharField(), write_only=True, required=False)
 
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date_time', 'attendees_count', 'organiser_friendly_name', 'organiser',
-                  'url']
+        fields = ['id', 'title', 'description', 'date_time', 'recurrence', 'recurrence_interval', 'recurrence_until',
+                  'occurrence', 'capacity', 'latitude', 'longitude', 'attendees_count', 'organiser_friendly_name',
+                  'organiser', 'url', 'tags']
+
+    def validate_tags(self, value):
+        """
+        Normalise the tag names in the same way as the HTML form
+        """
+        try:
+            return parse_tags(','.join(value))
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+    def validate(self, attrs):
+        """
+        Run the model's clean(), which checks that a recurring event doesn't end before it starts and that a location
+        has both a latitude and a longitude
+        """
+        event = Event(**{field: getattr(self.instance, field) for field in
+                         ('date_time', 'recurrence', 'recurrence_until', 'capacity', 'latitude', 'longitude')}
+                      if self.instance else {})
+        for field, value in attrs.items():
+            # Many to many fields can't be set on an unsaved event
+            if field != 'tags':
+                setattr(event, field, value)
+        try:
+            event.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
+        return attrs
+
+    def create(self, validated_data):
+        tags = validated_data.pop('tags', None)
+        event = super(EventListSerializer, self).create(validated_data)
+        if tags is not None:
+            set_event_tags(event, tags)
+        return event
+
+    def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        event = super(EventListSerializer, self).update(instance, validated_data)
+        if tags is not None:
+            set_event_tags(event, tags)
+        return event
 
 
 class EventDetailSerializer(EventListSerializer):
     attendees = UserSerializer(many=True, read_only=True)
+    tags = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
     # These fields are not part of the model definition but are annotations added by EvenyQuerySet.get_event()
     is_organiser = serializers.BooleanField(read_only=True)
     is_in_past = serializers.BooleanField(read_only=True)
     is_attending = serializers.BooleanField(read_only=True)
+    is_waitlisted = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date_time', 'organiser_friendly_name', 'organiser', 'attendees',
-                  'is_organiser', 'is_in_past', 'is_attending']
+        fields = ['id', 'title', 'description', 'date_time', 'recurrence', 'recurrence_interval', 'recurrence_until',
+                  'occurrence', 'capacity', 'latitude', 'longitude', 'organiser_friendly_name', 'organiser',
+                  'attendees', 'tags', 'is_organiser', 'is_in_past', 'is_attending', 'is_waitlisted']
@@ -0,0 +1,91 @@
+import datetime
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from .models import Event
+from .jobs import DATE_TIME_FORMAT
+from .tags import TAG_COUNTS_CACHE_KEY
+from .waitlist import promote_waitlist
+
+# Attendees are told when any of these fields are changed
+NOTIFIED_FIELDS = ['title', 'date_time', 'description']
+
+RSVP_ACTIONS = {
+    'post_add': 'attend',
+    'post_remove': 'unattend',
+}
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+def queue_rsvp_notification(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Queue a notification to the organiser whenever users attend or unattend an event, rather than emailing them while
+    the RSVP request waits. The job is inserted in the same transaction as the attendance change.
+
+    The attendees can be changed from either side (event.attendees or user.events_attendees), so pk_set holds either
+    user IDs or event IDs.
+    """
+    if action not in RSVP_ACTIONS or not pk_set:
+        return
+    if reverse:
+        for event_id in pk_set:
+            enqueue('events.notify_organiser', event_id=event_id, user_ids=[instance.pk], rsvp=RSVP_ACTIONS[action])
+    else:
+        enqueue('events.notify_organiser', event_id=instance.pk, user_ids=sorted(pk_set), rsvp=RSVP_ACTIONS[action])
+
+
+@receiver(post_save, sender=Event)
+def queue_change_notification(sender, instance, created, **kwargs):
+    """
+    Queue an email to the attendees of an event when its title, date/time or description is changed (from EventUpdate,
+    the API or anywhere else the event is saved). The changes are found by comparing with the values the event was
+    loaded with, so no extra query is needed.
+
+    The values are compared as they are shown in the email, so a date/time that is only changed below the minute (e.g.
+    an event created through the API with seconds, then saved from the edit form) isn't reported.
+    """
+    if created:
+        return
+    changes = instance.get_changes(NOTIFIED_FIELDS)
+    if not changes:
+        return
+    formatted = {field: [format_value(old), format_value(new)] for field, (old, new) in changes.items()}
+    formatted = {field: values for field, values in formatted.items() if values[0] != values[1]}
+    if formatted:
+        enqueue('events.notify_attendees', event_id=instance.pk, changes=formatted)
+    # Saving again shouldn't notify about the same changes
+    instance._loaded_values.update({field: new for field, (old, new) in changes.items()})
+
+
+@receiver(post_save, sender=Event)
+def promote_waitlist_on_capacity_change(sender, instance, created, **kwargs):
+    """
+    Fill any places added by raising (or removing) an event's capacity from its waitlist
+    """
+    if created or not instance.get_changes(['capacity']):
+        return
+    promote_waitlist(instance)
+    instance._loaded_values['capacity'] = instance.capacity
+
+
+@receiver(post_delete, sender=Event)
+def clear_tag_counts(sender, instance, **kwargs):
+    """
+    Remove the cached tag counts (see events.tags.get_tag_counts()) when an event is deleted, including by the
+    archive_events command, so that they don't count the deleted event's tags until they expire
+    """
+    cache.delete(TAG_COUNTS_CACHE_KEY)
+
+
+def format_value(value):
+    """
+    Format a field value for the notification email, which also makes it JSON serialisable
+
+    :param value: Field value
+    :rtype: str
+    """
+    if isinstance(value, datetime.datetime):
+        return value.strftime(DATE_TIME_FORMAT)
+    return str(value)
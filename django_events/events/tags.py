@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils.text import slugify
+
+from .models import Event, Tag
+
+# Most tags an event can have
+MAX_EVENT_TAGS = 10
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+TAG_COUNTS_CACHE_KEY = 'events.tag_counts'
+
+
+def parse_tags(value):
+    """
+    Parse a comma separated list of tags, e.g. "Workshop, social". Each tag is slugified, so that "Board Games" and
+    "board-games" are the same tag.
+
+    :param value: Comma separated tags
+    :type value: str
+    :return: The tag names, without duplicates and in the order given
+    :rtype: list
+    :raises ValidationError: if there are too many tags or a tag is too long
+    """
+    names = list(dict.fromkeys(name for name in (slugify(tag) for tag in value.split(',')) if name))
+    if len(names) > MAX_EVENT_TAGS:
+        raise ValidationError('An event can have at most {0} tags'.format(MAX_EVENT_TAGS))
+    for name in names:
+        if len(name) > TAG_MAX_LENGTH:
+            raise ValidationError('Tags can be at most {0} characters'.format(TAG_MAX_LENGTH))
+    return names
+
+
+def set_event_tags(event, names):
+    """
+    Replace the tags of an event, creating any tags that don't exist yet
+
+    :param event: The Event
+    :param names: Names of the tags, from parse_tags()
+    :type names: list
+    """
+    tags = list(Tag.objects.filter(name__in=names))
+    missing = set(names) - {tag.name for tag in tags}
+    if missing:
+        # Another request may create the same tags at the same time
+        Tag.objects.bulk_create((Tag(name=name) for name in missing), ignore_conflicts=True)
+        tags = list(Tag.objects.filter(name__in=names))
+    event.tags.set(tags)
+    cache.delete(TAG_COUNTS_CACHE_KEY)
+
+
+def get_tag_counts():
+    """
+    Return the number of current events with each tag (see EventQuerySet.get_tag_counts()). They are the same for every
+    user, so they are cached for TAG_COUNTS_CACHE_TIMEOUT seconds and only counted again when they expire or an event's
+    tags are changed.
+
+    :return: List of (tag name, number of events) tuples, ordered by name
+    :rtype: list
+    """
+    counts = cache.get(TAG_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = Event.objects.get_tag_counts()
+        cache.set(TAG_COUNTS_CACHE_KEY, counts, settings.TAG_COUNTS_CACHE_TIMEOUT)
+    return counts
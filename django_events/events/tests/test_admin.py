@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from django.test import TestCase
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from events.models import Event
+
+
+class TestEventAdmin(TestCase):
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(email='admin@events.com', password='password')
+        self.users = [get_user_model().objects.create_user(email='user{0}@events.com'.format(i), password='password')
+                      for i in range(5)]
+        self.client.force_login(self.admin)
+        self.changelist_url = reverse('admin:events_event_changelist')
+
+    def create_events(self, count):
+        for i in range(count):
+            Event.objects.create(title='Event {0}'.format(i),
+                                 description='Event Desc.',
+                                 date_time=datetime(2030, 1 + i % 12, 1, 12, 0),
+                                 organiser=self.users[i % len(self.users)])
+
+    def count_changelist_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.changelist_url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_constant(self):
+        self.create_events(2)
+        # The first request also loads the session and the user into the cache
+        self.count_changelist_queries()
+        queries = self.count_changelist_queries()
+        self.create_events(10)
+        self.assertEqual(self.count_changelist_queries(), queries)
+
+    def test_changelist_no_full_count(self):
+        self.create_events(3)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.changelist_url, {'date_time__year': '2030'}, secure=True)
+        counts = [query['sql'] for query in context.captured_queries if 'COUNT(' in query['sql']]
+        # Only the filtered count, not the whole table as well
+        self.assertEqual(len(counts), 1)
+        self.assertIn('WHERE', counts[0])
+
+    def test_changelist_date_hierarchy(self):
+        self.create_events(2)
+        response = self.client.get(self.changelist_url, secure=True)
+        self.assertContains(response, 'date_time__year=2030')
+        response = self.client.get(self.changelist_url, {'date_time__year': '2030', 'date_time__month': '2'},
+                                   secure=True)
+        self.assertEqual(list(response.context['cl'].result_list), [Event.objects.get(title='Event 1')])
+
+    def test_changelist_estimated_count(self):
+        self.create_events(3)
+        with mock.patch('django_events_management.paginator.estimate_row_count', return_value=50000):
+            response = self.client.get(self.changelist_url, secure=True)
+        self.assertEqual(response.context['cl'].result_count, 50000)
+
+    def test_change_form_raw_id_attendees(self):
+        self.create_events(1)
+        event = Event.objects.get()
+        event.attendees.add(*self.users[:2])
+        response = self.client.get(reverse('admin:events_event_change', args=(event.pk,)), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'class="vManyToManyRawIdAdminField"')
+        self.assertContains(response, 'value="{0},{1}"'.format(self.users[0].pk, self.users[1].pk))
+        # The users aren't rendered as options
+        self.assertNotContains(response, 'user4@events.com')
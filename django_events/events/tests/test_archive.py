@@ -0,0 +1,111 @@
+from io import StringIO
+from datetime import datetime, timedelta
+from django.test import TestCase
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+from events.models import Event, ArchivedEvent
+from events.archive import archive_events, archive_events_batch
+from events.calendar import get_calendar_token
+
+
+class TestArchiveEvents(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+
+        self.old_event1 = Event.objects.create(title='Old Event 1',
+                                               description='Old Event Desc. 1',
+                                               date_time=datetime.now() - timedelta(days=200),
+                                               organiser=self.user1)
+        self.old_event1.attendees.add(self.user1, self.user2)
+        self.old_event2 = Event.objects.create(title='Old Event 2',
+                                               description='Old Event Desc. 2',
+                                               date_time=datetime.now() - timedelta(days=100),
+                                               organiser=self.user2)
+        self.recent_event = Event.objects.create(title='Recent Event',
+                                                 description='Recent Event Desc.',
+                                                 date_time=datetime.now() - timedelta(days=1),
+                                                 organiser=self.user1)
+        self.recent_event.attendees.add(self.user2)
+        self.future_event = Event.objects.create(title='Future Event',
+                                                 description='Future Event Desc.',
+                                                 date_time=datetime.now() + timedelta(days=1),
+                                                 organiser=self.user1)
+
+    def test_archive_events(self):
+        self.assertEqual(archive_events(days=90), 2)
+        self.assertEqual(list(Event.objects.order_by('pk').values_list('pk', flat=True)),
+                         [self.recent_event.pk, self.future_event.pk])
+        archived = ArchivedEvent.objects.get(pk=self.old_event1.pk)
+        self.assertEqual(archived.title, 'Old Event 1')
+        self.assertEqual(archived.description, 'Old Event Desc. 1')
+        self.assertEqual(archived.organiser, self.user1)
+        self.assertEqual(archived.date_time, self.old_event1.date_time)
+        self.assertEqual(set(archived.attendees.all()), {self.user1, self.user2})
+        self.assertEqual(Event.attendees.through.objects.filter(event_id=self.old_event1.pk).count(), 0)
+
+    def test_archive_events_batch_oldest_first(self):
+        self.assertEqual(archive_events_batch(datetime.now() - timedelta(days=90), batch_size=1), 1)
+        self.assertTrue(ArchivedEvent.objects.filter(pk=self.old_event1.pk).exists())
+        self.assertTrue(Event.objects.filter(pk=self.old_event2.pk).exists())
+
+    def test_archive_events_batches(self):
+        self.assertEqual(archive_events(days=0, batch_size=1), 3)
+        self.assertEqual(list(Event.objects.values_list('pk', flat=True)), [self.future_event.pk])
+
+    def test_archive_events_nothing_to_archive(self):
+        self.assertEqual(archive_events(days=365), 0)
+        self.assertEqual(ArchivedEvent.objects.count(), 0)
+
+    def test_get_events_in_past_includes_archived(self):
+        archive_events(days=90)
+        events = list(Event.objects.get_events_in_past())
+        self.assertEqual([event.pk for event in events],
+                         [self.old_event1.pk, self.old_event2.pk, self.recent_event.pk])
+        self.assertEqual([event.attendees_count for event in events], [2, 0, 1])
+        self.assertEqual(events[0].organiser.friendly_name, 'user1')
+        self.assertEqual(Event.objects.get_events_in_past().count(), 3)
+        self.assertEqual([event.pk for event in Event.objects.get_events_in_past()[1:2]], [self.old_event2.pk])
+
+    def test_get_events_by_user_includes_archived(self):
+        archive_events(days=90)
+        events = list(Event.objects.get_events_organised_by_user(self.user1))
+        self.assertEqual([event.pk for event in events],
+                         [self.old_event1.pk, self.recent_event.pk, self.future_event.pk])
+        self.assertEqual([event.attendees_count for event in events], [2, 1, 0])
+        self.assertEqual([event.pk for event in Event.objects.get_events_attended_by_user(self.user2)],
+                         [self.old_event1.pk, self.recent_event.pk])
+        self.assertEqual(Event.objects.get_events_attended_by_user(self.user1).count(), 1)
+
+    def test_calendar_includes_archived(self):
+        archive_events(days=90)
+        ArchivedEvent.objects.get(pk=self.old_event2.pk).attendees.add(self.user1)
+        content = b''.join(self.client.get(reverse('events_calendar', args=(get_calendar_token(self.user1),)),
+                                           secure=True).streaming_content).decode()
+        # Organised, and attending their own archived event, which is only listed once
+        self.assertEqual(content.count('SUMMARY:Old Event 1'), 1)
+        self.assertIn('SUMMARY:Old Event 2', content)
+        self.assertIn('SUMMARY:Recent Event', content)
+        self.assertEqual(content.count('BEGIN:VEVENT'), 4)
+
+    def test_get_event_archived(self):
+        archive_events(days=90)
+        event = Event.objects.get_event(self.old_event1.pk, self.user2)
+        self.assertIsInstance(event, ArchivedEvent)
+        self.assertFalse(event.is_organiser)
+        self.assertTrue(event.is_attending)
+        self.assertTrue(event.is_in_past)
+        self.assertEqual(event.attendees_count, 2)
+
+    def test_get_current_events_excludes_archived(self):
+        archive_events(days=0)
+        self.assertEqual(list(Event.objects.get_current_events()), [self.future_event])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_events', days=90, batch_size=1, stdout=out)
+        self.assertIn('Archived 2 events older than 90 days', out.getvalue())
+        self.assertEqual(ArchivedEvent.objects.count(), 2)
@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+from django.test import TestCase
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+from events.models import Event
+from events.calendar import get_calendar_token, revoke_calendar_token, get_calendar_user_id, escape_text, fold_line
+
+HTTP_OK = 200
+HTTP_NOT_MODIFIED = 304
+HTTP_NOT_FOUND = 404
+
+
+class TestCalendarHelpers(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+
+    def test_token(self):
+        self.assertEqual(get_calendar_user_id(get_calendar_token(self.user1)), self.user1.pk)
+
+    def test_token_invalid(self):
+        token = get_calendar_token(self.user1)
+        self.assertIsNone(get_calendar_user_id(token + 'x'))
+        self.assertIsNone(get_calendar_user_id('{0}:{1}'.format(self.user1.pk + 1, token.split(':', 1)[1])))
+        self.assertIsNone(get_calendar_user_id('nonsense'))
+
+    def test_token_revoked(self):
+        token = get_calendar_token(self.user1)
+        revoke_calendar_token(self.user1)
+        self.assertIsNone(get_calendar_user_id(token))
+        self.assertEqual(get_calendar_user_id(get_calendar_token(self.user1)), self.user1.pk)
+
+    def test_escape_text(self):
+        self.assertEqual(escape_text('a;b,c\\d\r\ne\nf'), 'a\\;b\\,c\\\\d\\ne\\nf')
+
+    def test_fold_line(self):
+        self.assertEqual(fold_line('SUMMARY:short'), 'SUMMARY:short\r\n')
+        folded = fold_line('SUMMARY:' + 'é' * 100)
+        lines = folded.split('\r\n')
+        self.assertEqual(lines[-1], '')
+        for line in lines[:-1]:
+            self.assertLessEqual(len(line.encode()), 75)
+        for line in lines[1:-1]:
+            self.assertTrue(line.startswith(' '))
+        self.assertEqual(lines[0] + ''.join(line[1:] for line in lines[1:]), 'SUMMARY:' + 'é' * 100)
+
+
+class TestEventCalendar(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+
+        self.organised_event = Event.objects.create(title='Organised, Event',
+                                                    description='Line 1\nLine 2',
+                                                    date_time=datetime(2030, 1, 2, 3, 4, 5),
+                                                    organiser=self.user1)
+        self.organised_event.attendees.add(self.user1, self.user2)
+        self.attended_event = Event.objects.create(title='Attended Event',
+                                                   description='Attended Event Desc.',
+                                                   date_time=datetime.now() - timedelta(days=1),
+                                                   organiser=self.user2)
+        self.attended_event.attendees.add(self.user1)
+        self.other_event = Event.objects.create(title='Other Event',
+                                                description='Other Event Desc.',
+                                                date_time=datetime.now() + timedelta(days=1),
+                                                organiser=self.user2)
+        self.url = reverse('events_calendar', args=(get_calendar_token(self.user1),))
+
+    def get_feed(self, **extra):
+        return self.client.get(self.url, secure=True, **extra)
+
+    def test_calendar(self):
+        response = self.get_feed()
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(response['ETag'])
+        self.assertNotIn('Last-Modified', response)
+        content = b''.join(response.streaming_content).decode()
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'))
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 2)
+        self.assertIn('UID:event-{0}@testserver\r\n'.format(self.organised_event.pk), content)
+        self.assertIn('UID:event-{0}@testserver\r\n'.format(self.attended_event.pk), content)
+        self.assertIn('SUMMARY:Organised\\, Event\r\n', content)
+        self.assertIn('DESCRIPTION:Line 1\\nLine 2\r\n', content)
+        self.assertIn('DTSTART:20300102T030405Z\r\n', content)
+        self.assertIn('URL:https://testserver/events/{0}\r\n'.format(self.organised_event.pk), content)
+        self.assertNotIn('Other Event', content)
+
+    def test_calendar_no_events(self):
+        url = reverse('events_calendar', args=(get_calendar_token(
+            get_user_model().objects.create_user(email='user3@events.com', password='password')),))
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, HTTP_OK)
+        content = b''.join(response.streaming_content).decode()
+        self.assertNotIn('BEGIN:VEVENT', content)
+
+    def test_calendar_link(self):
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse('events_calendar_link'), secure=True)
+        self.assertContains(response, 'https://testserver' + self.url)
+        # Not compressed, see EventCalendarLink
+        self.assertIn('no-transform', response['Cache-Control'])
+        # The list echoes request parameters, so it mustn't contain the token
+        response = self.client.get(reverse('events_list'), {'tag': 'calendar'}, secure=True)
+        self.assertNotContains(response, self.url)
+        self.assertContains(response, reverse('events_calendar_link'))
+
+    def test_calendar_link_reset(self):
+        self.client.force_login(self.user1)
+        response = self.client.post(reverse('events_calendar_link'), secure=True)
+        self.assertRedirects(response, reverse('events_calendar_link'), fetch_redirect_response=False)
+        self.assertEqual(self.get_feed().status_code, HTTP_NOT_FOUND)
+        self.user1.refresh_from_db()
+        response = self.client.get(reverse('events_calendar', args=(get_calendar_token(self.user1),)), secure=True)
+        self.assertEqual(response.status_code, HTTP_OK)
+
+    def test_calendar_invalid_token(self):
+        response = self.client.get(reverse('events_calendar', args=('1:invalid',)), secure=True)
+        self.assertEqual(response.status_code, HTTP_NOT_FOUND)
+
+    def test_calendar_inactive_user(self):
+        self.user1.is_active = False
+        self.user1.save()
+        self.assertEqual(self.get_feed().status_code, HTTP_NOT_FOUND)
+
+    def test_calendar_if_none_match(self):
+        etag = self.get_feed()['ETag']
+        with self.assertNumQueries(2):
+            response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_calendar_etag_changes_with_same_count_and_id_sum(self):
+        user = get_user_model().objects.create_user(email='user3@events.com', password='password')
+        url = reverse('events_calendar', args=(get_calendar_token(user),))
+        events = [Event.objects.create(title='Event {0}'.format(i), date_time=datetime(2030, 1, 1),
+                                       organiser=self.user2) for i in range(4)]
+        Event.objects.filter(pk__in=[event.pk for event in events]).update(updated=datetime(2020, 1, 1))
+        # The same number of events with the same sum of IDs and latest update time
+        events[0].attendees.add(user)
+        events[3].attendees.add(user)
+        etag = self.client.get(url, secure=True)['ETag']
+        events[0].attendees.remove(user)
+        events[3].attendees.remove(user)
+        events[1].attendees.add(user)
+        events[2].attendees.add(user)
+        response = self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_OK)
+
+    def test_calendar_etag_changes_on_attend_older_event(self):
+        etag = self.get_feed()['ETag']
+        # Updated before the user's other events, so the latest update time doesn't change
+        Event.objects.filter(pk=self.other_event.pk).update(updated=datetime(2000, 1, 1))
+        self.other_event.attendees.add(self.user1)
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertIn('Other Event', b''.join(response.streaming_content).decode())
+
+    def test_calendar_etag_changes_on_edit(self):
+        etag = self.get_feed()['ETag']
+        # update() skips auto_now, so move the time on explicitly rather than relying on the clock
+        Event.objects.filter(pk=self.organised_event.pk).update(title='New Title',
+                                                                updated=datetime.now() + timedelta(seconds=1))
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertIn('SUMMARY:New Title', b''.join(response.streaming_content).decode())
+
+    def test_calendar_etag_changes_on_attend(self):
+        etag = self.get_feed()['ETag']
+        self.other_event.attendees.add(self.user1)
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertIn('Other Event', b''.join(response.streaming_content).decode())
+
+    def test_calendar_etag_changes_on_unattend(self):
+        etag = self.get_feed()['ETag']
+        self.attended_event.attendees.remove(self.user1)
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertNotIn('Attended Event', b''.join(response.streaming_content).decode())
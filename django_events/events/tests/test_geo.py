@@ -0,0 +1,156 @@
+import random
+from datetime import datetime, timedelta
+from django.test import TestCase, SimpleTestCase
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+from events.models import Event, ArchivedEvent
+from events.archive import archive_events
+from events.geo import encode_geohash, covering_geohashes, geohash_ranges, haversine_distance, parse_near
+
+LONDON = (51.5074, -0.1278)
+# About 11km from central London
+WIMBLEDON = (51.4214, -0.2064)
+PARIS = (48.8566, 2.3522)
+
+
+class TestGeohash(SimpleTestCase):
+
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode_geohash(-25.382708, -49.265506, 8), '6gkzwgjz')
+        self.assertEqual(encode_geohash(90, 180, 3), 'zzz')
+        self.assertEqual(encode_geohash(-90, -180, 3), '000')
+
+    def test_covering_geohashes_contain_circle(self):
+        rnd = random.Random(0)
+        for _ in range(200):
+            latitude, longitude = rnd.uniform(-89, 89), rnd.uniform(-180, 180)
+            radius = rnd.choice([0.5, 5, 50, 500])
+            ranges = geohash_ranges(latitude, longitude, radius)
+            for _ in range(20):
+                # A random point inside the circle
+                point_lat = latitude + rnd.uniform(-1, 1) * radius / 111.2
+                point_lng = (longitude + rnd.uniform(-1, 1) * 180 + 180) % 360 - 180
+                if not -90 <= point_lat <= 90 or haversine_distance(latitude, longitude, point_lat, point_lng) > radius:
+                    continue
+                geohash = encode_geohash(point_lat, point_lng)
+                self.assertTrue(any(start <= geohash < end for start, end in ranges),
+                                '{0} not in {1}'.format((point_lat, point_lng), ranges))
+
+    def test_covering_geohashes_antimeridian(self):
+        cells = covering_geohashes(0, 179.99, 20)
+        self.assertTrue(any(encode_geohash(0, 179.95).startswith(cell) for cell in cells))
+        self.assertTrue(any(encode_geohash(0, -179.95).startswith(cell) for cell in cells))
+
+    def test_covering_geohashes_pole(self):
+        cells = covering_geohashes(89.99, 0, 20)
+        for longitude in (-179, -90, 0, 90, 179):
+            self.assertTrue(any(encode_geohash(89.95, longitude).startswith(cell) for cell in cells))
+
+    def test_ranges_merged(self):
+        ranges = geohash_ranges(*LONDON, 10)
+        self.assertLess(len(ranges), len(covering_geohashes(*LONDON, 10)))
+
+    def test_haversine_distance(self):
+        self.assertAlmostEqual(haversine_distance(*LONDON, *PARIS), 343.5, delta=1)
+
+    def test_parse_near(self):
+        self.assertEqual(parse_near('51.5,-0.1'), (51.5, -0.1, 10))
+        self.assertEqual(parse_near('51.5,-0.1', '2.5'), (51.5, -0.1, 2.5))
+        for near, radius in [('51.5', None), ('a,b', None), ('91,0', None), ('0,181', None), ('0,0', '0'),
+                             ('0,0', '501'), ('0,0', 'nan'), ('0,0', 'x')]:
+            with self.assertRaises(ValueError):
+                parse_near(near, radius)
+
+
+class TestNearbyEvents(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.london = self.create_event('London', tomorrow, *LONDON)
+        self.wimbledon = self.create_event('Wimbledon', tomorrow + timedelta(hours=1), *WIMBLEDON)
+        self.paris = self.create_event('Paris', tomorrow, *PARIS)
+        self.online = self.create_event('Online', tomorrow, None, None)
+
+    def create_event(self, title, date_time, latitude, longitude, **kwargs):
+        return Event.objects.create(title=title, description='Desc.', date_time=date_time, organiser=self.user,
+                                    latitude=latitude, longitude=longitude, **kwargs)
+
+    def test_geohash_saved(self):
+        self.assertEqual(self.london.geohash, encode_geohash(*LONDON))
+        self.assertEqual(self.online.geohash, '')
+        self.online.latitude, self.online.longitude = PARIS
+        self.online.save(update_fields=['latitude', 'longitude'])
+        self.assertEqual(Event.objects.get(pk=self.online.pk).geohash, encode_geohash(*PARIS))
+
+    def test_clean_requires_both(self):
+        with self.assertRaises(ValidationError):
+            Event(title='Event', date_time=datetime.now(), organiser=self.user, latitude=1).clean()
+
+    def test_near(self):
+        self.assertEqual(list(Event.objects.near(*LONDON, 5).get_current_events()), [self.london])
+        self.assertEqual(list(Event.objects.near(*LONDON, 12).get_current_events()), [self.london, self.wimbledon])
+        self.assertEqual(set(Event.objects.near(*LONDON, 400).get_current_events()),
+                         {self.london, self.wimbledon, self.paris})
+        self.assertEqual(list(Event.objects.near(*LONDON, 12).get_events_organised_by_user(self.user)),
+                         [self.london, self.wimbledon])
+
+    def test_near_occurrences(self):
+        weekly = self.create_event('Weekly', datetime.now() - timedelta(days=1), *WIMBLEDON, recurrence=Event.WEEKLY)
+        occurrences = list(Event.objects.near(*LONDON, 12).get_current_occurrences()[:3])
+        self.assertEqual(len(occurrences), 3)
+        self.assertEqual({event.pk for event in occurrences}, {self.london.pk, self.wimbledon.pk, weekly.pk})
+
+    def test_near_past_includes_archived(self):
+        Event.objects.all().update(date_time=datetime.now() - timedelta(days=100))
+        archive_events(days=99)
+        self.assertEqual(ArchivedEvent.objects.get(pk=self.london.pk).geohash, self.london.geohash)
+        self.create_event('Recent', datetime.now() - timedelta(days=1), *LONDON)
+        past = Event.objects.near(*LONDON, 5).get_events_in_past()
+        self.assertEqual([event.title for event in past], ['London', 'Recent'])
+        self.assertEqual(Event.objects.near(*LONDON, 5).get_past_occurrences().count(), 2)
+
+    def test_near_uses_geohash_index(self):
+        query_set = Event.objects.near(*LONDON, 12).get_current_events()
+        sql, params = query_set.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('geohash', plan)
+
+    def test_api_near(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('event-list'), {'near': '{0},{1}'.format(*LONDON), 'radius': 12},
+                              format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([event['title'] for event in response.data['results']], ['London', 'Wimbledon'])
+        self.assertEqual(response.data['results'][0]['latitude'], LONDON[0])
+
+        response = client.get(reverse('event-list'), {'near': 'London'}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('near', response.data)
+
+    def test_api_create_location(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        data = {'title': 'New', 'description': 'Desc.', 'date_time': '2030-01-01T12:00:00'}
+        response = client.post(reverse('event-list'), dict(data, latitude=PARIS[0]), format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('longitude', response.data)
+        response = client.post(reverse('event-list'), dict(data, latitude=PARIS[0], longitude=PARIS[1]),
+                               format='json', secure=True)
+        self.assertEqual(Event.objects.get(pk=response.data['id']).geohash, encode_geohash(*PARIS))
+
+    def test_html_list_near(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('events_list'), {'near': '{0},{1}'.format(*PARIS)}, secure=True)
+        self.assertEqual(list(response.context['events']), [self.paris])
+        response = self.client.get(reverse('events_list'), {'near': '0,0', 'radius': 1000}, secure=True)
+        self.assertEqual(response.status_code, 400)
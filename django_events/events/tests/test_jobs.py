@@ -0,0 +1,217 @@
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from events.models import Event, OccurrenceAttendee
+from events.jobs import notify_attendees
+from jobs.models import Job
+from jobs.queue import run_jobs
+
+
+class TestRsvpNotifications(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.user3 = get_user_model().objects.create_user(email='user3@events.com', password='password')
+        self.event1 = Event.objects.create(title='Event 1',
+                                           description='Event Desc. 1',
+                                           date_time=datetime.now() + timedelta(days=1),
+                                           organiser=self.user1)
+        self.event2 = Event.objects.create(title='Event 2',
+                                           description='Event Desc. 2',
+                                           date_time=datetime.now() + timedelta(days=2),
+                                           organiser=self.user1)
+
+    def test_attend_queues_job(self):
+        self.event1.attendees.add(self.user2)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'events.notify_organiser')
+        self.assertEqual(json.loads(job.payload), {'event_id': self.event1.pk,
+                                                   'user_ids': [self.user2.pk],
+                                                   'rsvp': 'attend'})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_reverse_attend_queues_job(self):
+        self.user2.events_attendees.add(self.event1, self.event2)
+        payloads = sorted((json.loads(job.payload) for job in Job.objects.all()), key=lambda p: p['event_id'])
+        self.assertEqual(payloads, [{'event_id': self.event1.pk, 'user_ids': [self.user2.pk], 'rsvp': 'attend'},
+                                    {'event_id': self.event2.pk, 'user_ids': [self.user2.pk], 'rsvp': 'attend'}])
+
+    def test_unattend_queues_job(self):
+        self.event1.attendees.add(self.user2)
+        self.event1.attendees.remove(self.user2)
+        self.assertEqual([json.loads(job.payload)['rsvp'] for job in Job.objects.order_by('pk')],
+                         ['attend', 'unattend'])
+
+    def test_no_change_no_job(self):
+        self.event1.attendees.add(self.user2)
+        Job.objects.all().delete()
+        # Already attending, so nothing is added
+        self.event1.attendees.add(self.user2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_notification_batched_per_organiser(self):
+        self.event1.attendees.add(self.user2)
+        self.event2.attendees.add(self.user3)
+        self.event1.attendees.remove(self.user2)
+        self.assertEqual(run_jobs(), 3)
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['user1@events.com'])
+        lines = message.body.split('\n')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('user2@events.com is now attending Event 1'))
+        self.assertTrue(lines[1].startswith('user3@events.com is now attending Event 2'))
+        self.assertTrue(lines[2].startswith('user2@events.com is no longer attending Event 1'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_notification_skips_organiser(self):
+        self.event1.attendees.add(self.user1)
+        self.assertEqual(run_jobs(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_notification_deleted_event(self):
+        self.event1.attendees.add(self.user2)
+        self.event1.delete()
+        self.assertEqual(run_jobs(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(Job.objects.exists())
+
+
+class TestChangeNotifications(TestCase):
+
+    def setUp(self):
+        self.organiser = get_user_model().objects.create_user(email='organiser@events.com', password='password')
+        self.attendees = [get_user_model().objects.create_user(email='user{0}@events.com'.format(i), password='password')
+                          for i in range(5)]
+        self.event = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime(2030, 1, 1, 12, 0),
+                                          organiser=self.organiser)
+        self.event.attendees.add(self.organiser, *self.attendees)
+        Job.objects.all().delete()
+
+    def edit_event(self, **fields):
+        event = Event.objects.get(pk=self.event.pk)
+        for field, value in fields.items():
+            setattr(event, field, value)
+        event.save()
+        return event
+
+    def test_get_changes(self):
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(event.get_changes(['title', 'date_time']), {})
+        event.date_time = datetime(2030, 1, 2, 12, 0)
+        self.assertEqual(event.get_changes(['title', 'date_time']),
+                         {'date_time': (datetime(2030, 1, 1, 12, 0), datetime(2030, 1, 2, 12, 0))})
+
+    def test_get_changes_deferred(self):
+        event = Event.objects.only('title').get(pk=self.event.pk)
+        event.title = 'New Title'
+        self.assertEqual(event.get_changes(['title', 'description']), {'title': ('Event 1', 'New Title')})
+
+    def test_edit_queues_job(self):
+        self.edit_event(date_time=datetime(2030, 1, 2, 13, 30), title='New Title')
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'events.notify_attendees')
+        self.assertEqual(json.loads(job.payload), {'event_id': self.event.pk,
+                                                   'changes': {'date_time': ['2030-01-01 12:00', '2030-01-02 13:30'],
+                                                               'title': ['Event 1', 'New Title']}})
+
+    def test_edit_no_changes(self):
+        event = self.edit_event(title='Event 1')
+        event.save()
+        self.assertFalse(Job.objects.exists())
+
+    def test_edit_seconds_only_no_job(self):
+        Event.objects.filter(pk=self.event.pk).update(date_time=datetime(2030, 1, 1, 12, 0, 30, 123456))
+        # The edit form posts the date/time to the minute
+        self.client.force_login(self.organiser)
+        self.client.post(reverse('events_edit', args=(self.event.pk,)),
+                         {'title': 'New Title', 'description': 'Event Desc. 1', 'date_time': '2030-01-01 12:00'},
+                         secure=True)
+        self.assertEqual(json.loads(Job.objects.get().payload)['changes'], {'title': ['Event 1', 'New Title']})
+
+    def test_save_twice_queues_one_job(self):
+        event = self.edit_event(title='New Title')
+        event.save()
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_create_no_job(self):
+        Event.objects.create(title='Event 2', date_time=datetime(2030, 1, 1), organiser=self.organiser)
+        self.assertFalse(Job.objects.exists())
+
+    def test_edit_view_queues_job(self):
+        self.client.force_login(self.organiser)
+        self.client.post(reverse('events_edit', args=(self.event.pk,)),
+                         {'title': 'Event 1', 'description': 'Event Desc. 1', 'date_time': '2030-01-03 12:00:00'},
+                         secure=True)
+        self.assertEqual(json.loads(Job.objects.get().payload)['changes'],
+                         {'date_time': ['2030-01-01 12:00', '2030-01-03 12:00']})
+
+    def test_api_update_queues_job(self):
+        client = APIClient()
+        client.force_authenticate(user=self.organiser)
+        client.put(reverse('event-detail', args=(self.event.pk,)),
+                   {'title': 'Event 1', 'description': 'New Desc.', 'date_time': '2030-01-01T12:00:00'},
+                   format='json', secure=True)
+        self.assertEqual(json.loads(Job.objects.get().payload)['changes'],
+                         {'description': ['Event Desc. 1', 'New Desc.']})
+
+    def test_notify_attendees(self):
+        self.edit_event(date_time=datetime(2030, 1, 2, 13, 30))
+        payload = json.loads(Job.objects.get().payload)
+        # The event and the recipients
+        with self.assertNumQueries(2):
+            notify_attendees(**payload)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['user{0}@events.com'.format(i) for i in range(5)])
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Event changed: Event 1')
+        self.assertIn('Date/time: 2030-01-01 12:00 -> 2030-01-02 13:30', message.body)
+
+    def test_notify_attendees_occurrences(self):
+        weekly = Event.objects.create(title='Weekly', date_time=datetime.now() - timedelta(weeks=2),
+                                      organiser=self.organiser, recurrence=Event.WEEKLY)
+        next_week = weekly.date_time + timedelta(weeks=3)
+        # Attending the whole event and an occurrence, two future occurrences, and only a past occurrence
+        weekly.attendees.add(self.attendees[0])
+        OccurrenceAttendee.objects.bulk_create([
+            OccurrenceAttendee(event=weekly, occurrence=next_week, user=self.attendees[0]),
+            OccurrenceAttendee(event=weekly, occurrence=next_week, user=self.attendees[1]),
+            OccurrenceAttendee(event=weekly, occurrence=next_week + timedelta(weeks=1), user=self.attendees[1]),
+            OccurrenceAttendee(event=weekly, occurrence=next_week, user=self.organiser),
+            OccurrenceAttendee(event=weekly, occurrence=weekly.date_time, user=self.attendees[2]),
+        ])
+        with self.assertNumQueries(2):
+            notify_attendees(weekly.pk, {'title': ['Old', 'Weekly']})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['user0@events.com', 'user1@events.com'])
+
+    @override_settings(EVENT_NOTIFICATION_CHUNK_SIZE=2)
+    def test_notify_attendees_chunks_one_connection(self):
+        connection = get_connection()
+        with mock.patch('events.jobs.get_connection', return_value=connection) as get_connection_mock, \
+                mock.patch.object(connection, 'send_messages', wraps=connection.send_messages) as send_messages:
+            notify_attendees(self.event.pk, {'title': ['Old', 'Event 1']})
+        get_connection_mock.assert_called_once_with()
+        self.assertEqual([len(call[0][0]) for call in send_messages.call_args_list], [2, 2, 1])
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_notify_attendees_deleted_event(self):
+        event_id = self.event.pk
+        self.event.delete()
+        notify_attendees(event_id, {'title': ['Old', 'Event 1']})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_run_jobs(self):
+        self.edit_event(title='New Title')
+        self.assertEqual(run_jobs(), 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Job.objects.exists())
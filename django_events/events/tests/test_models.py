@@ -70,13 +70,14 @@ class TestEventQuerySet(TestCase):
         self.assertNotIn(self.future_event2, events)
 
     def test_get_events_in_past_correct_organiser_name(self):
-        events = Event.objects.get_events_in_past()
-        event = events.get(pk=self.past_event1.id)
+        # get_events_in_past() is a union with the archived events, so can't be filtered with get()
+        events = {event.pk: event for event in Event.objects.get_events_in_past()}
+        event = events[self.past_event1.id]
         self.assertEqual(event.organiser.friendly_name, 'user1')
 
     def test_get_events_in_past_correct_attendee_count(self):
-        events = Event.objects.get_events_in_past()
-        event = events.get(pk=self.past_event2.id)
+        events = {event.pk: event for event in Event.objects.get_events_in_past()}
+        event = events[self.past_event2.id]
         self.assertEqual(event.attendees_count, 2)
 
     def test_get_events_in_past_correct_ordering(self):
@@ -93,13 +94,13 @@ class TestEventQuerySet(TestCase):
         self.assertNotIn(self.future_event2, events)
 
     def test_get_events_attended_by_user_correct_organiser_name(self):
-        events = Event.objects.get_events_attended_by_user(self.user2)
-        event = events.get(pk=self.past_event2.id)
+        events = {event.pk: event for event in Event.objects.get_events_attended_by_user(self.user2)}
+        event = events[self.past_event2.id]
         self.assertEqual(event.organiser.friendly_name, 'user2')
 
     def test_get_events_attended_by_user_correct_attendee_count(self):
-        events = Event.objects.get_events_attended_by_user(self.user2)
-        event = events.get(pk=self.future_event1.id)
+        events = {event.pk: event for event in Event.objects.get_events_attended_by_user(self.user2)}
+        event = events[self.future_event1.id]
         self.assertEqual(event.attendees_count, 1)
 
     def test_get_events_attended_by_user_correct_ordering(self):
@@ -116,13 +117,13 @@ class TestEventQuerySet(TestCase):
         self.assertNotIn(self.future_event2, events)
 
     def test_get_events_organised_by_user_correct_organiser_name(self):
-        events = Event.objects.get_events_organised_by_user(self.user1)
-        event = events.get(pk=self.past_event1.id)
+        events = {event.pk: event for event in Event.objects.get_events_organised_by_user(self.user1)}
+        event = events[self.past_event1.id]
         self.assertEqual(event.organiser.friendly_name, 'user1')
 
     def test_get_events_organised_by_user_correct_attendee_count(self):
-        events = Event.objects.get_events_organised_by_user(self.user1)
-        event = events.get(pk=self.future_event1.id)
+        events = {event.pk: event for event in Event.objects.get_events_organised_by_user(self.user1)}
+        event = events[self.future_event1.id]
         self.assertEqual(event.attendees_count, 2)
 
     def test_get_events_organised_by_user_correct_ordering(self):
@@ -134,3 +135,30 @@ class TestEventQuerySet(TestCase):
     def test_get_event_correct_event(self):
         event = Event.objects.get_event(self.future_event1.id, self.user1)
         self.assertEqual(event, self.future_event1)
+
+    def test_get_event_annotations(self):
+        event = Event.objects.get_event(self.future_event1.id, self.user2)
+        self.assertFalse(event.is_organiser)
+        self.assertTrue(event.is_attending)
+        self.assertFalse(event.is_in_past)
+        self.assertEqual(event.attendees_count, 2)
+
+    def test_get_event_annotations_many_attendees(self):
+        self.future_event1.attendees.add(self.user3)
+        for user in (self.user1, self.user2, self.user3):
+            event = Event.objects.get_event(self.future_event1.id, user)
+            self.assertTrue(event.is_attending)
+            self.assertEqual(event.attendees_count, 3)
+
+    def test_get_event_not_attending(self):
+        event = Event.objects.get_event(self.future_event1.id, self.user3)
+        self.assertFalse(event.is_attending)
+        self.assertEqual(event.attendees_count, 2)
+
+    def test_get_event_organiser_past(self):
+        event = Event.objects.get_event(self.past_event1.id, self.user1)
+        self.assertTrue(event.is_organiser)
+        self.assertTrue(event.is_in_past)
+
+    def test_get_event_invalid_event(self):
+        self.assertIsNone(Event.objects.get_event(99999, self.user1))
@@ -0,0 +1,338 @@
+import json
+from datetime import datetime, timedelta
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework.status import HTTP_200_OK, HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, \
+    HTTP_404_NOT_FOUND
+
+from events.models import Event, OccurrenceAttendee
+from events.archive import archive_events
+from events.calendar import render_event
+from events.recurrence import iter_occurrences, count_occurrences, is_occurrence, format_occurrence, \
+    parse_occurrence, Occurrence
+from jobs.models import Job
+from jobs.queue import run_jobs
+
+
+class TestOccurrences(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        cls.start = datetime(2030, 1, 1, 18, 30)
+        cls.daily = Event(title='Daily', date_time=cls.start, organiser=cls.user1, recurrence=Event.DAILY)
+        cls.fortnightly = Event(title='Fortnightly', date_time=cls.start, organiser=cls.user1,
+                                recurrence=Event.WEEKLY, recurrence_interval=2,
+                                recurrence_until=datetime(2030, 3, 1))
+
+    def test_iter_occurrences(self):
+        self.assertEqual(list(iter_occurrences(self.daily, self.start, self.start + timedelta(days=3))),
+                         [self.start + timedelta(days=i) for i in range(3)])
+
+    def test_iter_occurrences_start_between_occurrences(self):
+        self.assertEqual(next(iter_occurrences(self.fortnightly, datetime(2030, 1, 2))), datetime(2030, 1, 15, 18, 30))
+        self.assertEqual(next(iter_occurrences(self.daily, datetime(2031, 1, 1, 18, 30))), datetime(2031, 1, 1, 18, 30))
+
+    def test_iter_occurrences_until(self):
+        self.assertEqual(list(iter_occurrences(self.fortnightly)),
+                         [datetime(2030, 1, 1, 18, 30), datetime(2030, 1, 15, 18, 30), datetime(2030, 1, 29, 18, 30),
+                          datetime(2030, 2, 12, 18, 30), datetime(2030, 2, 26, 18, 30)])
+
+    def test_iter_occurrences_single_event(self):
+        event = Event(title='Single', date_time=self.start, organiser=self.user1)
+        self.assertEqual(list(iter_occurrences(event)), [self.start])
+        self.assertEqual(list(iter_occurrences(event, self.start + timedelta(seconds=1))), [])
+
+    def test_count_occurrences(self):
+        windows = [(None, datetime(2030, 1, 10)),
+                   (datetime(2030, 1, 2), datetime(2030, 2, 1)),
+                   (datetime(2030, 1, 1, 18, 30), datetime(2030, 1, 15, 18, 30)),
+                   (datetime(2030, 2, 1), None),
+                   (datetime(2029, 1, 1), datetime(2029, 6, 1)),
+                   (datetime(2031, 1, 1), datetime(2031, 6, 1))]
+        for event in (self.daily, self.fortnightly):
+            for start, end in windows:
+                if end is None and event.recurrence_until is None:
+                    continue
+                self.assertEqual(count_occurrences(event, start, end), len(list(iter_occurrences(event, start, end))),
+                                 (event.title, start, end))
+
+    def test_is_occurrence(self):
+        self.assertTrue(is_occurrence(self.fortnightly, datetime(2030, 1, 15, 18, 30)))
+        self.assertFalse(is_occurrence(self.fortnightly, datetime(2030, 1, 8, 18, 30)))
+        self.assertFalse(is_occurrence(self.fortnightly, datetime(2030, 1, 15, 18, 31)))
+        self.assertFalse(is_occurrence(self.fortnightly, datetime(2030, 3, 12, 18, 30)))
+
+    def test_format_and_parse_occurrence(self):
+        for date_time in (datetime(2030, 1, 15, 18, 30), datetime(2030, 1, 15, 18, 30, 0, 1234)):
+            self.assertEqual(parse_occurrence(format_occurrence(date_time)), date_time)
+        self.assertIsNone(parse_occurrence('2030-01-15T18:30:00+01:00'))
+        self.assertIsNone(parse_occurrence('2030-02-30T18:30:00'))
+        self.assertIsNone(parse_occurrence('nonsense'))
+        self.assertIsNone(parse_occurrence(None))
+
+    def test_clean(self):
+        event = Event(title='Event', date_time=self.start, organiser=self.user1, recurrence=Event.DAILY,
+                      recurrence_until=self.start - timedelta(days=1))
+        with self.assertRaises(ValidationError):
+            event.clean()
+
+    def test_render_event_rrule(self):
+        self.fortnightly.pk = 1
+        self.fortnightly.updated = self.start
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=2;UNTIL=20300301T000000Z\r\n',
+                      render_event(self.fortnightly, 'testserver', 'https://testserver/events/1'))
+
+
+@override_settings(EVENT_RECURRENCE_HORIZON_DAYS=30)
+class TestOccurrenceLists(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        now = datetime.now()
+        self.single_event = Event.objects.create(title='Single',
+                                                 date_time=now + timedelta(days=1, hours=12),
+                                                 organiser=self.user1)
+        self.single_event.attendees.add(self.user2)
+        self.weekly_event = Event.objects.create(title='Weekly',
+                                                 date_time=now - timedelta(days=20),
+                                                 organiser=self.user1,
+                                                 recurrence=Event.WEEKLY)
+        self.daily_event = Event.objects.create(title='Daily',
+                                                date_time=now + timedelta(hours=1),
+                                                organiser=self.user2,
+                                                recurrence=Event.DAILY,
+                                                recurrence_until=now + timedelta(days=4))
+        self.past_event = Event.objects.create(title='Past',
+                                               date_time=now - timedelta(days=3, hours=12),
+                                               organiser=self.user1)
+
+    def test_current_occurrences_ordered(self):
+        occurrences = list(Event.objects.get_current_occurrences())
+        date_times = [occurrence.date_time for occurrence in occurrences]
+        self.assertEqual(date_times, sorted(date_times))
+        self.assertEqual(sum(1 for occurrence in occurrences if occurrence.title == 'Daily'), 4)
+        # Weekly occurrences in the next 30 days
+        self.assertEqual(sum(1 for occurrence in occurrences if occurrence.title == 'Weekly'), 5)
+        self.assertNotIn('Past', [occurrence.title for occurrence in occurrences])
+        single = [occurrence for occurrence in occurrences if occurrence.title == 'Single'][0]
+        self.assertIsInstance(single, Event)
+        self.assertEqual(single.attendees_count, 1)
+
+    def test_current_occurrences_count(self):
+        occurrences = Event.objects.get_current_occurrences()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(occurrences), 10)
+        self.assertEqual(len(list(occurrences)), 10)
+
+    def test_current_occurrences_slice(self):
+        occurrences = Event.objects.get_current_occurrences()
+        everything = list(occurrences)
+        self.assertEqual(occurrences[2:5], everything[2:5])
+        self.assertEqual(occurrences[3], everything[3])
+        with self.assertRaises(IndexError):
+            occurrences[10]
+
+    def test_current_occurrences_attendees_count(self):
+        occurrence = [item for item in Event.objects.get_current_occurrences() if item.title == 'Daily'][1]
+        OccurrenceAttendee.objects.create(event=self.daily_event, occurrence=occurrence.date_time, user=self.user1)
+        # The recurring events, the single events and the occurrences' attendee counts
+        with self.assertNumQueries(3):
+            occurrences = Event.objects.get_current_occurrences()[:10]
+        counts = {(item.title, item.date_time): item.attendees_count for item in occurrences}
+        self.assertEqual(counts[('Daily', occurrence.date_time)], 1)
+        self.assertEqual(sum(counts.values()), 2)
+
+    def test_current_occurrences_every_slice(self):
+        # Some single events at the same date/time as occurrences, which are ordered by pk
+        for days in (2, 3):
+            Event.objects.create(title='Clash', date_time=self.daily_event.date_time + timedelta(days=days),
+                                 organiser=self.user1)
+        for get_occurrences in (Event.objects.get_current_occurrences, Event.objects.get_past_occurrences):
+            everything = list(get_occurrences())
+            for start in range(len(everything) + 1):
+                for stop in range(start, len(everything) + 2):
+                    self.assertEqual(get_occurrences()[start:stop], everything[start:stop])
+
+    def test_deep_page_uses_offset(self):
+        now = datetime.now()
+        Event.objects.bulk_create(Event(title='Event {0}'.format(i), date_time=now + timedelta(days=2, minutes=i),
+                                        organiser=self.user1) for i in range(200))
+        everything = list(Event.objects.get_current_occurrences())
+        with CaptureQueriesContext(connection) as queries:
+            page = Event.objects.get_current_occurrences()[180:190]
+        self.assertEqual(page, everything[180:190])
+        # The recurring events, a binary search of the single events, then the page and its attendee counts
+        self.assertLessEqual(len(queries), 1 + 8 + 2)
+        event_queries = [query['sql'] for query in queries if 'FROM "events_event"' in query['sql']][1:]
+        self.assertTrue(all('LIMIT' in sql for sql in event_queries))
+        self.assertIn('LIMIT 10 OFFSET', event_queries[-1])
+
+    def test_deep_page_without_recurring_events(self):
+        Event.objects.exclude(recurrence='').delete()
+        now = datetime.now()
+        Event.objects.bulk_create(Event(title='Event {0}'.format(i), date_time=now + timedelta(days=2, minutes=i),
+                                        organiser=self.user1) for i in range(200))
+        with CaptureQueriesContext(connection) as queries:
+            page = Event.objects.get_current_occurrences()[180:190]
+        self.assertEqual([event.title for event in page], ['Event {0}'.format(i) for i in range(179, 189)])
+        # The (empty) recurring events and the page
+        self.assertEqual(len(queries), 2)
+        self.assertIn('LIMIT 10 OFFSET 180', queries[1]['sql'])
+
+    def test_paginator(self):
+        paginator = Paginator(Event.objects.get_current_occurrences(), 4)
+        self.assertEqual(paginator.count, 10)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(paginator.page(3).object_list), 2)
+
+    def test_occurrence_url(self):
+        occurrence = Occurrence(self.daily_event, self.daily_event.date_time + timedelta(days=1))
+        self.client.force_login(self.user1)
+        response = self.client.get(occurrence.get_absolute_url(), secure=True)
+        self.assertContains(response, '?occurrence={0}'.format(format_occurrence(occurrence.date_time)
+                                                               .replace(':', '%3A')))
+
+    def test_past_occurrences(self):
+        occurrences = list(Event.objects.get_past_occurrences())
+        self.assertEqual([occurrence.title for occurrence in occurrences],
+                         ['Weekly', 'Weekly', 'Weekly', 'Past'])
+        self.assertEqual(len(Event.objects.get_past_occurrences()), 4)
+
+    def test_archive_skips_recurring(self):
+        self.assertEqual(archive_events(days=0), 1)
+        self.assertTrue(Event.objects.filter(pk=self.weekly_event.pk).exists())
+        self.assertEqual(len(Event.objects.get_past_occurrences()), 4)
+
+    def test_html_list(self):
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse('events_list'), secure=True)
+        self.assertEqual(response.context['events'].paginator.count, 10)
+        response = self.client.get(reverse('events_list'), {'filter': 'p'}, secure=True)
+        self.assertEqual(response.context['events'].paginator.count, 4)
+
+    def test_api_list(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user1)
+        response = client.get(reverse('event-list'), format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['count'], 10)
+        daily = [result for result in response.data['results'] if result['title'] == 'Daily']
+        self.assertEqual([result['occurrence'] for result in daily], [result['date_time'] for result in daily])
+        self.assertEqual(len({result['date_time'] for result in daily}), 4)
+
+
+class TestOccurrenceRsvps(TestCase):
+
+    def setUp(self):
+        self.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        self.user2 = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.event = Event.objects.create(title='Weekly',
+                                          date_time=datetime.now() - timedelta(days=10),
+                                          organiser=self.user1,
+                                          recurrence=Event.WEEKLY)
+        self.next_occurrence = self.event.date_time + timedelta(weeks=2)
+        self.last_occurrence = self.event.date_time + timedelta(weeks=1)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user2)
+
+    def post(self, action, occurrence=None):
+        url = reverse('event-{0}'.format(action), args=(self.event.pk,))
+        if occurrence:
+            url += '?occurrence=' + format_occurrence(occurrence)
+        return self.client.post(url, format='json', secure=True)
+
+    def get_detail(self, occurrence):
+        return self.client.get(reverse('event-detail', args=(self.event.pk,)),
+                               {'occurrence': format_occurrence(occurrence)}, format='json', secure=True)
+
+    def test_attend_occurrence(self):
+        response = self.post('attend', self.next_occurrence)
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(list(OccurrenceAttendee.objects.values_list('event_id', 'occurrence', 'user_id')),
+                         [(self.event.pk, self.next_occurrence, self.user2.pk)])
+        self.assertFalse(self.event.attendees.exists())
+
+        data = self.get_detail(self.next_occurrence).data
+        self.assertEqual(data['occurrence'], data['date_time'])
+        self.assertEqual(data['attendees'], [{'email': 'user2@events.com', 'friendly_name': 'user2'}])
+        self.assertTrue(data['is_attending'])
+        self.assertFalse(data['is_in_past'])
+
+        # Other occurrences aren't affected
+        data = self.get_detail(self.next_occurrence + timedelta(weeks=1)).data
+        self.assertEqual(data['attendees'], [])
+        self.assertFalse(data['is_attending'])
+
+    def test_attend_twice(self):
+        self.post('attend', self.next_occurrence)
+        self.post('attend', self.next_occurrence)
+        self.assertEqual(OccurrenceAttendee.objects.count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_unattend_occurrence(self):
+        self.post('attend', self.next_occurrence)
+        response = self.post('unattend', self.next_occurrence)
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertFalse(OccurrenceAttendee.objects.exists())
+        self.assertEqual([json.loads(job.payload)['rsvp'] for job in Job.objects.order_by('pk')],
+                         ['attend', 'unattend'])
+        # Not attending, so nothing to notify
+        self.post('unattend', self.next_occurrence)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_rsvp_requires_occurrence(self):
+        self.assertEqual(self.post('attend').status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post('unattend').status_code, HTTP_400_BAD_REQUEST)
+
+    def test_rsvp_invalid_occurrence(self):
+        self.assertEqual(self.post('attend', self.next_occurrence + timedelta(days=1)).status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_detail(self.next_occurrence + timedelta(days=1)).status_code, HTTP_404_NOT_FOUND)
+
+    def test_rsvp_past_occurrence(self):
+        self.assertEqual(self.post('attend', self.last_occurrence).status_code, HTTP_403_FORBIDDEN)
+        self.assertTrue(self.get_detail(self.last_occurrence).data['is_in_past'])
+
+    def test_occurrence_of_single_event(self):
+        event = Event.objects.create(title='Single', date_time=datetime.now() + timedelta(days=1), organiser=self.user1)
+        response = self.client.get(reverse('event-detail', args=(event.pk,)),
+                                   {'occurrence': format_occurrence(event.date_time)}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_notification_has_occurrence_date(self):
+        self.post('attend', self.next_occurrence)
+        self.assertEqual(json.loads(Job.objects.get().payload)['occurrence'], format_occurrence(self.next_occurrence))
+        run_jobs()
+        self.assertIn('user2@events.com is now attending Weekly ({0})'.format(
+            self.next_occurrence.strftime('%Y-%m-%d %H:%M')), mail.outbox[0].body)
+
+    def test_create_recurring_event(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user1)
+        date_time = datetime(2030, 1, 1, 12, 0)
+        response = client.post(reverse('event-list'),
+                               {'title': 'New', 'description': 'Desc.', 'date_time': date_time.isoformat(),
+                                'recurrence': Event.DAILY, 'recurrence_interval': 3,
+                                'recurrence_until': (date_time - timedelta(days=1)).isoformat()},
+                               format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence_until', response.data)
+
+    def test_create_form(self):
+        client = Client()
+        client.force_login(self.user1)
+        response = client.post(reverse('events_create'),
+                                    {'title': 'New', 'description': 'Desc.', 'date_time': '2030-01-01 12:00:00',
+                                     'recurrence': Event.WEEKLY},
+                                    secure=True)
+        self.assertEqual(response.status_code, 302)
+        event = Event.objects.get(title='New')
+        self.assertEqual((event.recurrence, event.recurrence_interval), (Event.WEEKLY, 1))
@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+from django.test import TestCase, SimpleTestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+
+from events.models import Event, ArchivedEvent, Tag
+from events.archive import archive_events
+from events.forms import EventForm
+from events.tags import parse_tags, set_event_tags, get_tag_counts, MAX_EVENT_TAGS
+
+
+class TestParseTags(SimpleTestCase):
+
+    def test_parse_tags(self):
+        self.assertEqual(parse_tags('Workshop, social,,  Board Games, workshop'), ['workshop', 'social', 'board-games'])
+        self.assertEqual(parse_tags(''), [])
+
+    def test_parse_tags_invalid(self):
+        with self.assertRaises(ValidationError):
+            parse_tags(','.join('tag{0}'.format(i) for i in range(MAX_EVENT_TAGS + 1)))
+        with self.assertRaises(ValidationError):
+            parse_tags('a' * 51)
+
+
+class TestTags(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.workshop = self.create_event('Workshop', tomorrow, ['workshop', 'tech'])
+        self.party = self.create_event('Party', tomorrow + timedelta(hours=1), ['social'])
+        self.meetup = self.create_event('Meetup', tomorrow + timedelta(hours=2), ['social', 'tech'])
+
+    def create_event(self, title, date_time, tags, **kwargs):
+        event = Event.objects.create(title=title, description='Desc.', date_time=date_time, organiser=self.user,
+                                     **kwargs)
+        set_event_tags(event, tags)
+        return event
+
+    def test_set_event_tags(self):
+        self.assertEqual(Tag.objects.count(), 3)
+        set_event_tags(self.workshop, ['tech', 'talk'])
+        self.assertEqual([tag.name for tag in self.workshop.tags.all()], ['talk', 'tech'])
+        self.assertEqual(Tag.objects.count(), 4)
+
+    def test_tagged(self):
+        self.assertEqual(list(Event.objects.tagged('tech').get_current_events()), [self.workshop, self.meetup])
+        self.assertEqual(list(Event.objects.tagged('social').get_events_organised_by_user(self.user)),
+                         [self.party, self.meetup])
+        self.assertEqual(list(Event.objects.tagged('missing').get_current_events()), [])
+
+    def test_tagged_occurrences(self):
+        weekly = self.create_event('Weekly', datetime.now() - timedelta(days=1), ['tech'], recurrence=Event.WEEKLY)
+        occurrences = list(Event.objects.tagged('tech').get_current_occurrences()[:4])
+        self.assertEqual(len(occurrences), 4)
+        self.assertEqual({event.pk for event in occurrences}, {self.workshop.pk, self.meetup.pk, weekly.pk})
+
+    def test_tagged_past_includes_archived(self):
+        Event.objects.all().update(date_time=datetime.now() - timedelta(days=100))
+        archive_events(days=99)
+        self.assertEqual([tag.name for tag in ArchivedEvent.objects.get(pk=self.meetup.pk).tags.all()],
+                         ['social', 'tech'])
+        self.create_event('Recent', datetime.now() - timedelta(days=1), ['tech'])
+        past = Event.objects.tagged('tech').get_events_in_past()
+        self.assertEqual([event.title for event in past], ['Workshop', 'Meetup', 'Recent'])
+
+    def test_get_tag_counts(self):
+        self.create_event('Past', datetime.now() - timedelta(days=1), ['social'])
+        self.create_event('Weekly', datetime.now() - timedelta(days=1), ['social'], recurrence=Event.WEEKLY)
+        with self.assertNumQueries(1):
+            self.assertEqual(Event.objects.get_tag_counts(), [('social', 3), ('tech', 2), ('workshop', 1)])
+
+    def test_get_tag_counts_cached(self):
+        self.assertEqual(get_tag_counts(), [('social', 2), ('tech', 2), ('workshop', 1)])
+        with self.assertNumQueries(0):
+            get_tag_counts()
+        # Changing an event's tags clears the cache
+        set_event_tags(self.party, ['social', 'tech'])
+        self.assertEqual(get_tag_counts(), [('social', 2), ('tech', 3), ('workshop', 1)])
+
+    def test_get_tag_counts_cleared_on_delete(self):
+        self.assertEqual(get_tag_counts(), [('social', 2), ('tech', 2), ('workshop', 1)])
+        self.party.delete()
+        self.assertEqual(get_tag_counts(), [('social', 1), ('tech', 2), ('workshop', 1)])
+        # Archiving deletes the events from the Event table
+        get_tag_counts()
+        Event.objects.filter(pk=self.meetup.pk).update(date_time=datetime.now() - timedelta(days=100))
+        archive_events(days=99)
+        self.assertEqual(get_tag_counts(), [('tech', 1), ('workshop', 1)])
+
+    def test_form(self):
+        form = EventForm(instance=self.meetup)
+        self.assertEqual(form.initial['tags'], 'social, tech')
+        data = {'title': 'Meetup', 'description': 'Desc.', 'date_time': self.meetup.date_time, 'recurrence': '',
+                'tags': 'Tech, Board Games'}
+        form = EventForm(data, instance=self.meetup)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual([tag.name for tag in self.meetup.tags.all()], ['board-games', 'tech'])
+
+    def test_html_list_tagged(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('events_list'), {'tag': 'tech'}, secure=True)
+        self.assertEqual([event.title for event in response.context['events']], ['Workshop', 'Meetup'])
+        self.assertEqual(response.context['tag_counts'], [('social', 2), ('tech', 2), ('workshop', 1)])
+        self.assertContains(response, 'tag=tech')
+
+    def test_tag_parameter_slugified(self):
+        set_event_tags(self.party, ['live-music'])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('events_list'), {'tag': 'Live Music'}, secure=True)
+        self.assertEqual([event.title for event in response.context['events']], ['Party'])
+        self.assertEqual(response.context['tag'], 'live-music')
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('event-list'), {'tag': 'Live Music'}, format='json', secure=True)
+        self.assertEqual([event['title'] for event in response.data['results']], ['Party'])
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('event-list'), {'tag': 'social'}, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([event['title'] for event in response.data['results']], ['Party', 'Meetup'])
+
+        response = client.get(reverse('event-tags'), format='json', secure=True)
+        self.assertEqual(response.data['results'], [{'name': 'social', 'events_count': 2},
+                                                    {'name': 'tech', 'events_count': 2},
+                                                    {'name': 'workshop', 'events_count': 1}])
+
+        response = client.get(reverse('event-detail', args=(self.meetup.pk,)), format='json', secure=True)
+        self.assertEqual(response.data['tags'], ['social', 'tech'])
+
+    def test_api_create_update(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        data = {'title': 'New', 'description': 'Desc.', 'date_time': '2030-01-01T12:00:00', 'tags': ['Tech', 'New']}
+        response = client.post(reverse('event-list'), data, format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        event = Event.objects.get(pk=response.data['id'])
+        self.assertEqual([tag.name for tag in event.tags.all()], ['new', 'tech'])
+
+        response = client.patch(reverse('event-detail', args=(event.pk,)), {'tags': ['social']}, format='json',
+                                secure=True)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([tag.name for tag in event.tags.all()], ['social'])
+
+        response = client.patch(reverse('event-detail', args=(event.pk,)), {'tags': ['a' * 51]}, format='json',
+                                secure=True)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data)
@@ -97,6 +97,34 @@ class TestEventUpdate(TestCase):
         self.assertEqual(response.status_code, HTTP_REDIRECT)
         self.assertRegexpMatches(response.url, reverse('events_view', args=(self.event1.id,)))
 
+    def test_event_update_get_queries(self):
+        request = self.request_factory.get(reverse('events_edit', kwargs={'pk': self.event1.id}))
+        request.user = self.user1
+        # The event is fetched once, for both the permissions check and the form, then its tags for the form
+        with self.assertNumQueries(2):
+            response = EventUpdate.as_view()(request, *[], **{'pk': self.event1.id})
+            response.render()
+        self.assertEqual(response.status_code, HTTP_OK)
+
+    def test_event_update_post_queries(self):
+        request = self.request_factory.post(
+            reverse('events_edit', kwargs={'pk': self.event1.id}),
+            data={'title': 'Event 1',
+                  'description': 'Event Desc. 1',
+                  'date_time': '2020-06-26 01:01:12'})
+        request.user = self.user1
+        # Fetch the event and its tags (to tell whether they have changed), update it and queue the attendee notification
+        with self.assertNumQueries(4):
+            response = EventUpdate.as_view()(request, *[], **{'pk': self.event1.id})
+        self.assertEqual(response.status_code, HTTP_REDIRECT)
+
+    def test_event_update_not_permitted_queries(self):
+        request = self.request_factory.post(reverse('events_edit', kwargs={'pk': self.event1.id}))
+        request.user = self.user2
+        with self.assertNumQueries(1):
+            response = EventUpdate.as_view()(request, *[], **{'pk': self.event1.id})
+        self.assertEqual(response.status_code, HTTP_FORBIDDEN)
+
 
 class TestViewEventView(TestCase):
 
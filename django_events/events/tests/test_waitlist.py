@@ -0,0 +1,245 @@
+import os
+import sys
+import random
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+from unittest import skipIf
+from django.conf import settings
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.db import connections, OperationalError
+from django.test import TestCase, SimpleTestCase
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework.status import HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST
+
+from events.models import Event, WaitlistEntry
+from events.waitlist import attend_event, unattend_event, promote_waitlist, ATTENDING, WAITLISTED
+from jobs.models import Job
+from jobs.queue import run_jobs
+
+
+class TestWaitlist(TestCase):
+
+    def setUp(self):
+        self.organiser = get_user_model().objects.create_user(email='organiser@events.com', password='password')
+        self.users = [get_user_model().objects.create_user(email='user{0}@events.com'.format(i), password='password')
+                      for i in range(5)]
+        self.event = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(days=1),
+                                          organiser=self.organiser,
+                                          capacity=2)
+
+    def attendee_ids(self):
+        return set(self.event.attendees.values_list('pk', flat=True))
+
+    def waitlist_ids(self):
+        return list(self.event.waitlist.values_list('user_id', flat=True))
+
+    def test_attend_until_full(self):
+        self.assertEqual(attend_event(self.event, self.users[0]), ATTENDING)
+        self.assertEqual(attend_event(self.event, self.users[1]), ATTENDING)
+        self.assertEqual(attend_event(self.event, self.users[2]), WAITLISTED)
+        self.assertEqual(attend_event(self.event, self.users[3]), WAITLISTED)
+        self.assertEqual(self.attendee_ids(), {self.users[0].pk, self.users[1].pk})
+        self.assertEqual(self.waitlist_ids(), [self.users[2].pk, self.users[3].pk])
+
+    def test_attend_twice(self):
+        attend_event(self.event, self.users[0])
+        attend_event(self.event, self.users[1])
+        self.assertEqual(attend_event(self.event, self.users[0]), ATTENDING)
+        self.assertEqual(attend_event(self.event, self.users[2]), WAITLISTED)
+        self.assertEqual(attend_event(self.event, self.users[2]), WAITLISTED)
+        self.assertEqual(self.waitlist_ids(), [self.users[2].pk])
+
+    def test_no_capacity(self):
+        self.event.capacity = None
+        self.event.save()
+        for user in self.users:
+            self.assertEqual(attend_event(self.event, user), ATTENDING)
+        self.assertEqual(len(self.attendee_ids()), 5)
+
+    def test_unattend_promotes_earliest(self):
+        for user in self.users[:4]:
+            attend_event(self.event, user)
+        Job.objects.all().delete()
+        self.assertEqual(unattend_event(self.event, self.users[0]), [self.users[2].pk])
+        self.assertEqual(self.attendee_ids(), {self.users[1].pk, self.users[2].pk})
+        self.assertEqual(self.waitlist_ids(), [self.users[3].pk])
+        self.assertEqual(sorted(Job.objects.values_list('name', flat=True)),
+                         ['events.notify_organiser', 'events.notify_organiser', 'events.notify_promoted'])
+
+    def test_unattend_from_waitlist(self):
+        for user in self.users[:3]:
+            attend_event(self.event, user)
+        self.assertEqual(unattend_event(self.event, self.users[2]), [])
+        self.assertEqual(self.waitlist_ids(), [])
+        self.assertEqual(len(self.attendee_ids()), 2)
+
+    def test_unattend_over_capacity_no_promotion(self):
+        # The capacity was lowered after the event filled up
+        for user in self.users[:2]:
+            attend_event(self.event, user)
+        attend_event(self.event, self.users[2])
+        Event.objects.filter(pk=self.event.pk).update(capacity=1)
+        self.assertEqual(unattend_event(self.event, self.users[0]), [])
+        self.assertEqual(self.waitlist_ids(), [self.users[2].pk])
+
+    def test_raising_capacity_promotes(self):
+        for user in self.users:
+            attend_event(self.event, user)
+        event = Event.objects.get(pk=self.event.pk)
+        event.capacity = 4
+        event.save()
+        self.assertEqual(len(self.attendee_ids()), 4)
+        self.assertEqual(self.waitlist_ids(), [self.users[4].pk])
+        event.capacity = None
+        event.save()
+        self.assertEqual(len(self.attendee_ids()), 5)
+        self.assertEqual(self.waitlist_ids(), [])
+
+    def test_promote_waitlist_full(self):
+        for user in self.users[:3]:
+            attend_event(self.event, user)
+        self.assertEqual(promote_waitlist(self.event), [])
+
+    def test_notify_promoted(self):
+        for user in self.users[:3]:
+            attend_event(self.event, user)
+        unattend_event(self.event, self.users[0])
+        run_jobs()
+        promoted = [message for message in mail.outbox if message.to == ['user2@events.com']]
+        self.assertEqual(len(promoted), 1)
+        self.assertEqual(promoted[0].subject, 'You are now attending Event 1')
+
+    def test_recurring_event_capacity(self):
+        event = Event(title='Weekly', date_time=datetime.now(), organiser=self.organiser, recurrence=Event.WEEKLY,
+                      capacity=10)
+        with self.assertRaises(ValidationError):
+            event.clean()
+
+    def test_api(self):
+        attend_event(self.event, self.users[0])
+        attend_event(self.event, self.users[1])
+        client = APIClient()
+        client.force_authenticate(user=self.users[2])
+        response = client.post(reverse('event-attend', args=(self.event.pk,)), format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['waitlisted'])
+        detail = client.get(reverse('event-detail', args=(self.event.pk,)), format='json', secure=True).data
+        self.assertEqual(detail['capacity'], 2)
+        self.assertTrue(detail['is_waitlisted'])
+        self.assertFalse(detail['is_attending'])
+
+        client.post(reverse('event-unattend', args=(self.event.pk,)), format='json', secure=True)
+        self.assertEqual(self.waitlist_ids(), [])
+
+    def test_api_capacity_validation(self):
+        client = APIClient()
+        client.force_authenticate(user=self.organiser)
+        response = client.post(reverse('event-list'),
+                               {'title': 'New', 'description': 'Desc.', 'date_time': '2030-01-01T12:00:00',
+                                'capacity': 0},
+                               format='json', secure=True)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('capacity', response.data)
+
+
+def _rsvp_worker(path, event_id, user_ids, seed, results):
+    """
+    Run in a child process, like a gunicorn worker: attend the event as each of the users, then unattend as some of
+    them. The default database is pointed at the shared SQLite file so that the code under test runs unchanged.
+    """
+    connections.databases['default'] = dict(connections.databases['default'], NAME=path,
+                                            OPTIONS=settings.SQLITE_OPTIONS)
+    if hasattr(connections._connections, 'default'):
+        delattr(connections._connections, 'default')
+
+    rnd = random.Random(seed)
+    event = Event(pk=event_id)
+    users = list(get_user_model().objects.filter(pk__in=user_ids))
+    errors = 0
+    for user in users:
+        try:
+            attend_event(event, user)
+        except OperationalError:
+            errors += 1
+    for user in rnd.sample(users, len(users) // 3):
+        try:
+            unattend_event(event, user)
+        except OperationalError:
+            errors += 1
+    connections['default'].close()
+    results.put(errors)
+
+
+@skipIf(sys.platform == 'win32', 'Requires the fork multiprocessing start method')
+class TestWaitlistConcurrency(SimpleTestCase):
+    """
+    Parallel RSVPs from several processes to a shared database file must never oversell the event
+    """
+    ALIAS = 'waitlist_stress'
+    WORKERS = 6
+    USERS_PER_WORKER = 15
+    CAPACITY = 25
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'waitlist.sqlite3')
+        connections.databases[self.ALIAS] = {
+            'ENGINE': 'django_events_management.sqlite_backend',
+            'NAME': self.path,
+            'OPTIONS': settings.SQLITE_OPTIONS,
+        }
+        self.addCleanup(self.remove_database)
+        with connections[self.ALIAS].schema_editor() as schema_editor:
+            for model in (get_user_model(), Event, WaitlistEntry, Job):
+                schema_editor.create_model(model)
+
+        user_model = get_user_model()
+        user_model.objects.using(self.ALIAS).bulk_create(
+            user_model(email='user{0}@stress.events.com'.format(i), password='!')
+            for i in range(self.WORKERS * self.USERS_PER_WORKER + 1))
+        self.user_ids = list(user_model.objects.using(self.ALIAS).order_by('pk').values_list('pk', flat=True))
+        self.event = Event.objects.using(self.ALIAS).create(title='Stress', date_time=datetime.now() + timedelta(days=1),
+                                                            organiser_id=self.user_ids.pop(), capacity=self.CAPACITY)
+        # The worker processes must open their own connections
+        connections[self.ALIAS].close()
+
+    def remove_database(self):
+        connections[self.ALIAS].close()
+        del connections[self.ALIAS]
+        del connections.databases[self.ALIAS]
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_never_oversells(self):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=_rsvp_worker,
+                                     args=(self.path, self.event.pk,
+                                           self.user_ids[index::self.WORKERS], index, results))
+                     for index in range(self.WORKERS)]
+        for process in processes:
+            process.start()
+        errors = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        self.assertEqual(errors, 0)
+
+        attendees = set(Event.attendees.through.objects.using(self.ALIAS).filter(event_id=self.event.pk)
+                        .values_list('user_id', flat=True))
+        waiting = set(WaitlistEntry.objects.using(self.ALIAS).filter(event_id=self.event.pk)
+                      .values_list('user_id', flat=True))
+        self.assertLessEqual(len(attendees), self.CAPACITY)
+        # Nobody is left waiting while there is a free place
+        if waiting:
+            self.assertEqual(len(attendees), self.CAPACITY)
+        self.assertFalse(attendees & waiting)
+        # Every user that didn't unattend is either attending or waiting
+        unattended = self.WORKERS * (self.USERS_PER_WORKER // 3)
+        self.assertEqual(len(attendees) + len(waiting), len(self.user_ids) - unattended)
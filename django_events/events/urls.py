@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import EventCreate, EventUpdate, EventView, EventList
+from .views import EventCreate, EventUpdate, EventView, EventList, EventCalendar, EventCalendarLink
 
 urlpatterns = [
     path('', EventList.as_view(), name='events_list'),
     path('<int:pk>', EventView.as_view(), name='events_view'),
     path('<int:pk>/edit', EventUpdate.as_view(), name='events_edit'),
     path('create', EventCreate.as_view(), name='events_create'),
+    path('calendar', EventCalendarLink.as_view(), name='events_calendar_link'),
+    path('calendar/<str:token>.ics', EventCalendar.as_view(), name='events_calendar'),
 ]
@@ -1,12 +1,18 @@
 import logging
-from django.shortcuts import render
+from django.shortcuts import render, reverse, redirect
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import View, TemplateView, UpdateView, CreateView
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.text import slugify
 
 from .models import Event
 from .forms import EventForm
+from .geo import parse_near
+from .tags import get_tag_counts
+from .calendar import get_calendar_token, revoke_calendar_token, get_calendar_user_id, get_calendar_version, \
+    render_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +23,7 @@ class EventCreate(LoginRequiredMixin, CreateView):
     """
 
     model = Event
-    fields = ['title', 'date_time', 'description']
+    form_class = EventForm
     template_name = 'events/create_event.html'
 
     def form_valid(self, form):
@@ -38,15 +44,25 @@ class EventUpdate(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     form_class = EventForm
     model = Event
 
+    def get_object(self, queryset=None):
+        """
+        Fetch the event once per request. The permissions check runs before UpdateView.get()/post(), which would
+        otherwise fetch the event again for the form.
+        """
+        if not hasattr(self, '_event'):
+            self._event = super(EventUpdate, self).get_object(queryset)
+        return self._event
+
     def test_func(self):
         """
-        Permissions check to make sure that the current user is the event organiser
+        Permissions check to make sure that the current user is the event organiser. The IDs are compared, so the
+        organiser isn't loaded.
 
         :return: True if the user is the organiser, else False
         :rtype: bool
         """
         event = self.get_object()
-        return self.request.user == event.organiser
+        return event.organiser_id == self.request.user.pk
 
     def handle_no_permission(self):
         """
@@ -60,17 +76,19 @@ class EventView(LoginRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
         """
         Render the basic web page that displays a given event. The actual data is retrieved from the API via AJAX, so
-        only the pk is passed into the template
+        only the pk (and the occurrence of a recurring event) is passed into the template
         """
         return render(request,
                       'events/view_event.html',
-                      {'pk': pk})
+                      {'pk': pk, 'occurrence': request.GET.get('occurrence', '')})
 
 
+# Names of the EventQuerySet methods for each filter. They are looked up on the query set so that they can be called on
+# one that has been filtered by location.
 FILTER_FUNC_TABLE = {
-    'o': Event.objects.get_events_organised_by_user,
-    'a': Event.objects.get_events_attended_by_user,
-    'p': Event.objects.get_events_in_past
+    'o': 'get_events_organised_by_user',
+    'a': 'get_events_attended_by_user',
+    'p': 'get_past_occurrences'
 }
 
 
@@ -78,12 +96,28 @@ class EventList(LoginRequiredMixin, TemplateView):
 
     def get(self, request,  *args, **kwargs):
         """
-        Renders a template to display the list of events
+        Renders a template to display the list of events, optionally only those within 'radius' km (default 10) of the
+        'near' latitude,longitude and/or with a 'tag'. The number of current events with each tag is shown as well.
         """
+        query_set = Event.objects.all()
+        near = request.GET.get('near', '')
+        radius = request.GET.get('radius', '')
+        if near:
+            try:
+                query_set = query_set.near(*parse_near(near, radius))
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+        # Counted before filtering by tag, so that the counts of the other tags are shown. Only the counts for all
+        # locations are cached.
+        tag_counts = query_set.get_tag_counts() if near else get_tag_counts()
+        # Slugified like the tags are when they are saved, so that "Live Music" finds live-music
+        tag = slugify(request.GET.get('tag', ''))
+        if tag:
+            query_set = query_set.tagged(tag)
         # Check if the GET request has an event filter in it
         query_filter = request.GET.get('filter')
         # Use the specific QuerySet function based on the event filter
-        filter_func = FILTER_FUNC_TABLE.get(query_filter, Event.objects.get_current_events)
+        filter_func = getattr(query_set, FILTER_FUNC_TABLE.get(query_filter, 'get_current_occurrences'))
         query_set = filter_func(request.user)
 
         page = request.GET.get('page', 1)
@@ -99,5 +133,60 @@ class EventList(LoginRequiredMixin, TemplateView):
                       'events/list_events.html',
                       {
                           'events': event_list,
-                          'query_filter': query_filter
+                          'query_filter': query_filter,
+                          'near': near,
+                          'radius': radius,
+                          'tag': tag,
+                          'tag_counts': tag_counts,
                       })
+
+
+class EventCalendarLink(LoginRequiredMixin, TemplateView):
+    """
+    View to show the URL of the user's calendar feed. It has a page of its own, rather than being on the events list,
+    because the list echoes request parameters (tag, near) and its responses are compressed: a secret in the same
+    compressed response as attacker controlled text can be recovered from the compressed size (BREACH). This page
+    doesn't echo anything from the request, and isn't compressed either (no-transform) in case it ever does.
+
+    POSTing to it revokes the current URL and shows a new one.
+    """
+    template_name = 'events/calendar_link.html'
+
+    def post(self, request, *args, **kwargs):
+        revoke_calendar_token(request.user)
+        return redirect('events_calendar_link')
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super(EventCalendarLink, self).render_to_response(context, **response_kwargs)
+        response['Cache-Control'] = 'private, no-transform'
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super(EventCalendarLink, self).get_context_data(**kwargs)
+        context['calendar_url'] = self.request.build_absolute_uri(
+            reverse('events_calendar', args=(get_calendar_token(self.request.user),)))
+        return context
+
+
+class EventCalendar(View):
+
+    def get(self, request, token, *args, **kwargs):
+        """
+        Stream an iCalendar feed of the events the user is organising or attending. The user is identified by the token
+        in the URL rather than by a session, so that calendar clients can subscribe to it. If the client already has the
+        latest version of the feed (If-None-Match) then a 304 is returned without loading any events.
+        """
+        user_id = get_calendar_user_id(token)
+        if user_id is None:
+            raise Http404
+
+        etag = get_calendar_version(user_id)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(render_calendar(request, user_id),
+                                             content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="events.ics"'
+        response['ETag'] = etag
+        # Calendar clients should revalidate on every poll
+        response['Cache-Control'] = 'private, no-cache'
+        return response
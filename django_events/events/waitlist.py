@@ -0,0 +1,102 @@
+from django.db import transaction, IntegrityError
+
+from jobs.queue import enqueue
+from .models import Event, WaitlistEntry
+
+ATTENDING = 'attending'
+WAITLISTED = 'waitlisted'
+
+
+def lock_event(event):
+    """
+    Lock an event's row until the end of the current transaction, so that RSVPs to the same event are made one at a
+    time and the attendees can be counted without another request adding one in the meantime. Only the one row is
+    locked, so RSVPs to other events aren't held up.
+
+    SQLite doesn't support row locks (select_for_update() is ignored), but its transactions take the database's write
+    lock when they begin (SQLITE_TRANSACTION_MODE), which serialises the RSVPs in the same way.
+
+    :param event: The event
+    :return: The event's current capacity
+    :rtype: int
+    """
+    return Event.objects.select_for_update().filter(pk=event.pk).values_list('capacity', flat=True).get()
+
+
+def attend_event(event, user):
+    """
+    Mark a user as attending an event, or add them to the event's waitlist if it is full
+
+    :param event: The Event
+    :param user: The user
+    :return: ATTENDING or WAITLISTED
+    :rtype: str
+    """
+    with transaction.atomic():
+        capacity = lock_event(event)
+        attendance = Event.attendees.through.objects.filter(event_id=event.pk)
+        if attendance.filter(user_id=user.pk).exists():
+            return ATTENDING
+        if capacity is None or attendance.count() < capacity:
+            event.attendees.add(user)
+            WaitlistEntry.objects.filter(event=event, user=user).delete()
+            return ATTENDING
+        try:
+            with transaction.atomic():
+                WaitlistEntry.objects.create(event=event, user=user)
+        except IntegrityError:
+            # Already waiting
+            pass
+        return WAITLISTED
+
+
+def unattend_event(event, user):
+    """
+    Remove a user from an event, or from its waitlist. If a place becomes free then the first user on the waitlist is
+    promoted to an attendee.
+
+    :param event: The Event
+    :param user: The user
+    :return: IDs of the users promoted from the waitlist
+    :rtype: list
+    """
+    with transaction.atomic():
+        capacity = lock_event(event)
+        # remove() signals a change even if the user wasn't attending, which would queue a notification
+        if not Event.attendees.through.objects.filter(event_id=event.pk, user_id=user.pk).exists():
+            WaitlistEntry.objects.filter(event=event, user=user).delete()
+            return []
+        event.attendees.remove(user)
+        return _promote(event, capacity)
+
+
+def promote_waitlist(event):
+    """
+    Promote users from an event's waitlist until it is full, e.g. after its capacity has been raised
+
+    :param event: The Event
+    :return: IDs of the users promoted from the waitlist
+    :rtype: list
+    """
+    with transaction.atomic():
+        return _promote(event, lock_event(event))
+
+
+def _promote(event, capacity):
+    """
+    Move the earliest waitlist entries into the attendees while there are free places. The event must be locked.
+    """
+    if capacity is None:
+        free = None
+    else:
+        free = capacity - Event.attendees.through.objects.filter(event_id=event.pk).count()
+        if free <= 0:
+            return []
+    entries = list(WaitlistEntry.objects.filter(event=event).values_list('id', 'user_id')[:free])
+    if not entries:
+        return []
+    user_ids = [user_id for _, user_id in entries]
+    WaitlistEntry.objects.filter(id__in=[entry_id for entry_id, _ in entries]).delete()
+    event.attendees.add(*user_ids)
+    enqueue('events.notify_promoted', event_id=event.pk, user_ids=user_ids)
+    return user_ids
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status', 'name')
+    ordering = ('run_at',)
+
+
+admin.site.register(Job, JobAdmin)
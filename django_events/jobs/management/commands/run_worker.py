@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_worker
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (e.g. RSVP notifications). Run one or more alongside the web server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Maximum number of jobs claimed at once')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before checking an empty queue again')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        """
+        Runs jobs until interrupted (or until the queue is empty with --burst)
+        """
+        try:
+            total = run_worker(options['batch_size'], options['poll_interval'], options['burst'], stdout=self.stdout)
+        except KeyboardInterrupt:
+            return
+        self.stdout.write('Ran {0} jobs in total'.format(total))
@@ -0,0 +1,38 @@
+import datetime
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    A unit of work queued by jobs.queue.enqueue() and run by the run_worker command, outside of the request/response
+    cycle. Jobs are deleted once they have run successfully, so the table only holds queued, running and failed jobs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    # JSON encoded keyword arguments for the handler
+    payload = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    # The job is not run before this time. Pushed back after each failed attempt.
+    run_at = models.DateTimeField(default=datetime.datetime.now)
+    # Identifies the batch of the worker that is running the job
+    locked_by = models.CharField(max_length=32, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_job_status_run_at'),
+        ]
+
+    def __str__(self):
+        return '{0} ({1})'.format(self.name, self.status)
@@ -0,0 +1,208 @@
+import datetime
+import json
+import logging
+import time
+import traceback
+import uuid
+from collections import namedtuple, OrderedDict
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+Handler = namedtuple('Handler', ['func', 'batch', 'atomic'])
+
+# Job name -> Handler. Populated by the register() decorator when the module defining the handler is imported (from an
+# AppConfig.ready())
+HANDLERS = {}
+
+
+def register(name, batch=False, atomic=False):
+    """
+    Decorator that registers a function as the handler for a job name.
+
+    A handler is normally called once per job with the job's payload as keyword arguments. A batch handler is instead
+    called once per batch claimed by the worker, with a list of the payloads of all of the jobs with that name, so that
+    it can combine their work (e.g. one email per recipient rather than one per job). If a batch handler raises an
+    exception then every job in the batch is retried.
+
+    Only an atomic handler is run in a transaction, so that its writes are rolled back if it fails. On SQLite a
+    transaction takes the write lock when it begins (see SQLITE_TRANSACTION_MODE), so a handler that only reads and
+    then does slow I/O, such as sending email, must not be atomic or every write request would wait for it.
+
+    :param name: Job name, as passed to enqueue()
+    :type name: str
+    :param batch: True if the handler takes a list of payloads
+    :type batch: bool
+    :param atomic: True to run the handler in a transaction
+    :type atomic: bool
+    """
+    def decorator(func):
+        HANDLERS[name] = Handler(func, batch, atomic)
+        return func
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    """
+    Add a job to the queue. The job is inserted in the current transaction (if any), so it is only run if the change
+    that caused it is committed.
+
+    :param name: Name the handler was registered with
+    :type name: str
+    :param run_at: Optional date/time the job should not run before
+    :type run_at: datetime.datetime
+    :param payload: JSON serialisable keyword arguments for the handler
+    :return: The new Job
+    """
+    return Job.objects.create(name=name,
+                              payload=json.dumps(payload),
+                              run_at=run_at or datetime.datetime.now())
+
+
+def claim_jobs(batch_size):
+    """
+    Mark up to batch_size jobs that are due as running, and return them. Jobs that have been running for longer than
+    JOB_LOCK_TIMEOUT_SECONDS are assumed to belong to a worker that died, and are claimed again.
+
+    Where the database supports it, the due jobs are locked with SELECT ... FOR UPDATE SKIP LOCKED so that concurrent
+    workers claim different jobs. On SQLite, which serialises writers instead, the update only claims jobs that are
+    still due, and each claim is tagged with a unique ID, so a job can never be claimed by two workers.
+
+    :param batch_size: Maximum number of jobs to claim
+    :type batch_size: int
+    :return: The claimed jobs, oldest first
+    :rtype: list
+    """
+    now = datetime.datetime.now()
+    due = Q(status=Job.QUEUED, run_at__lte=now) | \
+        Q(status=Job.RUNNING, locked_at__lt=now - datetime.timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS))
+    claim_id = uuid.uuid4().hex
+    with transaction.atomic():
+        job_ids = list(Job.objects.select_for_update(skip_locked=True)
+                       .filter(due)
+                       .order_by('run_at', 'id')
+                       .values_list('id', flat=True)[:batch_size])
+        if not job_ids:
+            return []
+        Job.objects.filter(due, id__in=job_ids).update(status=Job.RUNNING, locked_by=claim_id, locked_at=now)
+    return list(Job.objects.filter(locked_by=claim_id, status=Job.RUNNING).order_by('run_at', 'id'))
+
+
+def complete_jobs(jobs):
+    """
+    Delete jobs that have run successfully
+
+    :param jobs: The jobs
+    :type jobs: list
+    """
+    Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+
+def fail_jobs(jobs, error):
+    """
+    Record a failed attempt at running jobs. Each job is retried after JOB_RETRY_DELAY_SECONDS, doubling after each
+    attempt, until it has been attempted JOB_MAX_ATTEMPTS times, at which point it is left in the failed state.
+
+    :param jobs: The jobs that failed
+    :type jobs: list
+    :param error: Description of the error (normally the traceback)
+    :type error: str
+    """
+    now = datetime.datetime.now()
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = error
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS or job.name not in HANDLERS:
+            job.status = Job.FAILED
+            logger.error('Job %s (%s) failed after %s attempts: %s', job.id, job.name, job.attempts, error)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = now + datetime.timedelta(seconds=settings.JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1))
+            logger.warning('Job %s (%s) failed, retrying at %s: %s', job.id, job.name, job.run_at, error)
+        job.save(update_fields=['attempts', 'last_error', 'locked_by', 'locked_at', 'status', 'run_at'])
+
+
+def run_handler(name, jobs):
+    """
+    Run the handler for a group of jobs with the same name, once per job (or once for the whole group for a batch
+    handler), recording the outcome of each job. An atomic handler's calls are each run in their own transaction.
+
+    :param name: Job name
+    :type name: str
+    :param jobs: The jobs
+    :type jobs: list
+    """
+    handler = HANDLERS.get(name)
+    if handler is None:
+        fail_jobs(jobs, 'No handler is registered for {0}'.format(name))
+        return
+
+    if handler.batch:
+        groups = [jobs]
+    else:
+        groups = [[job] for job in jobs]
+
+    for group in groups:
+        try:
+            payloads = [json.loads(job.payload) for job in group]
+            with transaction.atomic() if handler.atomic else nullcontext():
+                if handler.batch:
+                    handler.func(payloads)
+                else:
+                    handler.func(**payloads[0])
+        except Exception:
+            fail_jobs(group, traceback.format_exc())
+        else:
+            complete_jobs(group)
+
+
+def run_jobs(batch_size=100):
+    """
+    Claim a batch of due jobs and run them
+
+    :param batch_size: Maximum number of jobs to run
+    :type batch_size: int
+    :return: Number of jobs that were run (successfully or not)
+    :rtype: int
+    """
+    jobs = claim_jobs(batch_size)
+    by_name = OrderedDict()
+    for job in jobs:
+        by_name.setdefault(job.name, []).append(job)
+    for name, named_jobs in by_name.items():
+        run_handler(name, named_jobs)
+    return len(jobs)
+
+
+def run_worker(batch_size=100, poll_interval=1.0, burst=False, stdout=None):
+    """
+    Run jobs until interrupted. When the queue is empty the worker sleeps for poll_interval seconds before checking
+    again.
+
+    :param batch_size: Maximum number of jobs claimed at once
+    :type batch_size: int
+    :param poll_interval: Seconds to wait when there are no jobs to run
+    :type poll_interval: float
+    :param burst: If True, return once the queue is empty rather than waiting for more jobs
+    :type burst: bool
+    :param stdout: Optional stream to write progress to
+    :return: Total number of jobs that were run
+    :rtype: int
+    """
+    total = 0
+    while True:
+        count = run_jobs(batch_size)
+        total += count
+        if count and stdout:
+            stdout.write('Ran {0} jobs'.format(count))
+        if not count:
+            if burst:
+                return total
+            time.sleep(poll_interval)
@@ -0,0 +1,165 @@
+import json
+import datetime
+from io import StringIO
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+
+from jobs.models import Job
+from jobs.queue import HANDLERS, register, enqueue, claim_jobs, run_jobs, run_worker
+
+CALLS = []
+# Job name -> number of savepoints when the handler was last called
+SAVEPOINT_DEPTHS = {}
+
+
+@register('test.single')
+def single_handler(value):
+    CALLS.append(('single', value))
+    SAVEPOINT_DEPTHS['test.single'] = len(connection.savepoint_ids)
+
+
+@register('test.atomic', atomic=True)
+def atomic_handler(value):
+    SAVEPOINT_DEPTHS['test.atomic'] = len(connection.savepoint_ids)
+
+
+@register('test.batch', batch=True)
+def batch_handler(payloads):
+    CALLS.append(('batch', [payload['value'] for payload in payloads]))
+
+
+@register('test.fail', atomic=True)
+def failing_handler(value):
+    Job.objects.create(name='test.created_by_failed_job')
+    raise ValueError('Failed {0}'.format(value))
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_DELAY_SECONDS=10, JOB_LOCK_TIMEOUT_SECONDS=60)
+class TestQueue(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def test_register(self):
+        self.assertIs(HANDLERS['test.single'].func, single_handler)
+        self.assertFalse(HANDLERS['test.single'].batch)
+        self.assertTrue(HANDLERS['test.batch'].batch)
+        self.assertFalse(HANDLERS['test.single'].atomic)
+        self.assertTrue(HANDLERS['test.fail'].atomic)
+
+    def test_only_atomic_handlers_run_in_transaction(self):
+        enqueue('test.single', value=1)
+        enqueue('test.atomic', value=2)
+        run_jobs()
+        # The test itself runs in a transaction, so an atomic handler is one savepoint deeper
+        self.assertEqual(SAVEPOINT_DEPTHS['test.atomic'], SAVEPOINT_DEPTHS['test.single'] + 1)
+
+    def test_enqueue(self):
+        job = enqueue('test.single', value=1)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(json.loads(job.payload), {'value': 1})
+        self.assertEqual(job.attempts, 0)
+
+    def test_run_jobs_single(self):
+        enqueue('test.single', value=1)
+        enqueue('test.single', value=2)
+        self.assertEqual(run_jobs(), 2)
+        self.assertEqual(CALLS, [('single', 1), ('single', 2)])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_jobs_batch(self):
+        enqueue('test.batch', value=1)
+        enqueue('test.single', value=2)
+        enqueue('test.batch', value=3)
+        self.assertEqual(run_jobs(), 3)
+        self.assertEqual(CALLS, [('batch', [1, 3]), ('single', 2)])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_jobs_batch_size(self):
+        for value in range(5):
+            enqueue('test.batch', value=value)
+        self.assertEqual(run_jobs(batch_size=2), 2)
+        self.assertEqual(CALLS, [('batch', [0, 1])])
+        self.assertEqual(Job.objects.count(), 3)
+
+    def test_run_jobs_not_due(self):
+        enqueue('test.single', run_at=datetime.datetime.now() + datetime.timedelta(minutes=1), value=1)
+        self.assertEqual(run_jobs(), 0)
+        self.assertEqual(CALLS, [])
+
+    def test_run_jobs_retry(self):
+        job = enqueue('test.fail', value=1)
+        before = datetime.datetime.now()
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('ValueError: Failed 1', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + datetime.timedelta(seconds=10))
+        # The handler's changes are rolled back
+        self.assertFalse(Job.objects.filter(name='test.created_by_failed_job').exists())
+        # Not retried until the delay has passed
+        self.assertEqual(run_jobs(), 0)
+
+    def test_run_jobs_backoff_and_give_up(self):
+        job = enqueue('test.fail', value=1)
+        delays = []
+        for _ in range(3):
+            Job.objects.filter(pk=job.pk).update(run_at=datetime.datetime.now())
+            before = datetime.datetime.now()
+            with self.assertLogs('jobs.queue', 'WARNING'):
+                self.assertEqual(run_jobs(), 1)
+            job.refresh_from_db()
+            if job.status == Job.QUEUED:
+                delays.append(round((job.run_at - before).total_seconds()))
+        self.assertEqual(delays, [10, 20])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        Job.objects.filter(pk=job.pk).update(run_at=datetime.datetime.now())
+        self.assertEqual(run_jobs(), 0)
+
+    def test_run_jobs_unknown_handler(self):
+        job = enqueue('test.unknown')
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(run_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('No handler', job.last_error)
+
+    def test_claim_jobs(self):
+        job1 = enqueue('test.single', value=1)
+        job2 = enqueue('test.single', value=2)
+        claimed = claim_jobs(10)
+        self.assertEqual([job.pk for job in claimed], [job1.pk, job2.pk])
+        self.assertTrue(all(job.status == Job.RUNNING for job in claimed))
+        self.assertEqual(len({job.locked_by for job in claimed}), 1)
+        # Running jobs aren't claimed again
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_claim_jobs_stale_lock(self):
+        job = enqueue('test.single', value=1)
+        claim_jobs(10)
+        Job.objects.filter(pk=job.pk).update(locked_at=datetime.datetime.now() - datetime.timedelta(seconds=61))
+        self.assertEqual([job.pk for job in claim_jobs(10)], [job.pk])
+
+    def test_run_worker_burst(self):
+        for value in range(5):
+            enqueue('test.single', value=value)
+        self.assertEqual(run_worker(batch_size=2, burst=True), 5)
+        self.assertEqual(len(CALLS), 5)
+
+    def test_run_worker_polls(self):
+        with mock.patch('jobs.queue.time.sleep', side_effect=KeyboardInterrupt) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                run_worker(poll_interval=2)
+        sleep.assert_called_once_with(2)
+
+    def test_command(self):
+        enqueue('test.single', value=1)
+        out = StringIO()
+        call_command('run_worker', burst=True, stdout=out)
+        self.assertIn('Ran 1 jobs in total', out.getvalue())
+        self.assertEqual(CALLS, [('single', 1)])
@@ -0,0 +1,126 @@
+import bisect
+import threading
+
+# Default buckets (in seconds) used for timings
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets used for counts of database queries
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def escape_label_value(value):
+    """
+    Escape a label value for the Prometheus text format
+
+    :param value: Label value
+    :return: The escaped value
+    :rtype: str
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_bound(bound):
+    """
+    Format a bucket upper bound for the Prometheus text format
+
+    :param bound: Upper bound of the bucket
+    :return: The formatted bound
+    :rtype: str
+    """
+    return '{0:g}'.format(bound) if isinstance(bound, float) else str(bound)
+
+
+class Histogram(object):
+    """
+    A thread-safe, in-process histogram that can be exported in the Prometheus text format.
+
+    Observations are stored as per-bucket counts (not cumulative) so that observe() is a binary search and a couple of
+    additions. The counts are only made cumulative when the histogram is exported.
+    """
+
+    def __init__(self, name, documentation, label_names, buckets=DURATION_BUCKETS):
+        """
+        :param name: Metric name
+        :type name: str
+        :param documentation: Help text for the metric
+        :type documentation: str
+        :param label_names: Names of the labels, observe() must be given a value for each of these in the same order
+        :type label_names: tuple
+        :param buckets: Sorted upper bounds of the buckets. A +Inf bucket is always added.
+        :type buckets: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Label values -> [bucket counts (including +Inf)..., sum]
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        """
+        Record an observation
+
+        :param value: The value observed
+        :param label_values: Values for each of the labels
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def get_count(self, *label_values):
+        """
+        Return the number of observations for the given label values
+
+        :param label_values: Values for each of the labels
+        :rtype: int
+        """
+        with self._lock:
+            values = self._values.get(label_values)
+            return sum(values[:-1]) if values else 0
+
+    def get_sum(self, *label_values):
+        """
+        Return the sum of the observations for the given label values
+
+        :param label_values: Values for each of the labels
+        """
+        with self._lock:
+            values = self._values.get(label_values)
+            return values[-1] if values else 0
+
+    def clear(self):
+        """
+        Remove all observations
+        """
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        """
+        Render the histogram in the Prometheus text exposition format
+
+        :return: Lines of the exposition
+        :rtype: list
+        """
+        with self._lock:
+            snapshot = sorted((labels, list(values)) for labels, values in self._values.items())
+
+        lines = ['# HELP {0} {1}'.format(self.name, self.documentation),
+                 '# TYPE {0} histogram'.format(self.name)]
+        for label_values, values in snapshot:
+            labels = ','.join('{0}="{1}"'.format(name, escape_label_value(value))
+                              for name, value in zip(self.label_names, label_values))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append('{0}_bucket{{{1}le="{2}"}} {3}'.format(self.name, prefix, format_bound(bound),
+                                                                     cumulative))
+            lines.append('{0}_sum{{{1}}} {2}'.format(self.name, labels, values[-1]))
+            lines.append('{0}_count{{{1}}} {2}'.format(self.name, labels, cumulative))
+        return lines
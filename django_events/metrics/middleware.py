@@ -0,0 +1,153 @@
+import time
+from contextlib import ExitStack
+from django.db import connections
+
+from .histogram import Histogram, DURATION_BUCKETS, QUERY_COUNT_BUCKETS
+from .query_logging import CURRENT_VIEW
+
+REQUEST_LABELS = ('view', 'method')
+
+REQUEST_DURATION = Histogram('django_request_duration_seconds',
+                             'Total time taken to handle the request, including middleware.',
+                             REQUEST_LABELS + ('status',), DURATION_BUCKETS)
+DB_QUERIES = Histogram('django_request_db_queries',
+                       'Number of database queries executed per request.',
+                       REQUEST_LABELS, QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram('django_request_db_duration_seconds',
+                        'Time spent executing database queries per request.',
+                        REQUEST_LABELS, DURATION_BUCKETS)
+SERIALIZATION_DURATION = Histogram('django_request_serialization_duration_seconds',
+                                   'Time spent rendering the response (DRF renderers and TemplateResponses only).',
+                                   REQUEST_LABELS, DURATION_BUCKETS)
+
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZATION_DURATION]
+
+
+def get_view_name(request):
+    """
+    Return a low-cardinality name for the view that handled the request, e.g. "EventList" or "EventViewSet.attend"
+
+    :param request: Request that has been handled
+    :return: Name of the view
+    :rtype: str
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return 'unmatched'
+
+    func = resolver_match.func
+    # DRF views set "cls" (and "actions" for ViewSets), Django class based views set "view_class"
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return resolver_match.view_name or func.__name__
+
+    actions = getattr(func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower())
+        if action:
+            return '{0}.{1}'.format(view_class.__name__, action)
+    return view_class.__name__
+
+
+class QueryRecorder(object):
+    """
+    Database execute wrapper that counts and times each query
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware(object):
+    """
+    Records the total latency, number of database queries, database time and response rendering time of every
+    request into in-process histograms, labelled by view. These are exposed by metrics.views.metrics_view.
+
+    Queries are recorded with a database execute wrapper, so this works without DEBUG and has a small, constant
+    overhead per query. Note that each worker process has its own histograms.
+
+    The body of a streaming response (e.g. the calendar feed) is generated after the view returns, as it is sent, so
+    its metrics are recorded once the content has been iterated over, with the wrapper still installed.
+
+    Rendering is only timed for deferred responses (DRF Responses and TemplateResponses), which are rendered after the
+    view returns. A view that calls render() itself renders within the view, so that time is part of the total latency
+    and nothing is recorded in the serialization histogram.
+
+    This should be the first middleware so that the total latency includes the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        recorder = QueryRecorder()
+        request._metrics_serialization_duration = None
+        current_view_token = CURRENT_VIEW.set('unknown')
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            CURRENT_VIEW.reset(current_view_token)
+
+        if response.streaming:
+            response.streaming_content = self.record_streaming_content(request, response, response.streaming_content,
+                                                                       start, recorder)
+        else:
+            self.observe(request, response, start, recorder)
+        return response
+
+    def record_streaming_content(self, request, response, content, start, recorder):
+        """
+        Generate a streaming response's content with the queries it makes recorded, then record the request's metrics
+        """
+        current_view_token = CURRENT_VIEW.set(get_view_name(request))
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                yield from content
+        finally:
+            CURRENT_VIEW.reset(current_view_token)
+            self.observe(request, response, start, recorder)
+
+    def observe(self, request, response, start, recorder):
+        duration = time.perf_counter() - start
+        view_name = get_view_name(request)
+        REQUEST_DURATION.observe(duration, view_name, request.method, str(response.status_code))
+        DB_QUERIES.observe(recorder.count, view_name, request.method)
+        DB_DURATION.observe(recorder.duration, view_name, request.method)
+        if request._metrics_serialization_duration is not None:
+            SERIALIZATION_DURATION.observe(request._metrics_serialization_duration, view_name, request.method)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Make the view name available to the slow query log
+        """
+        CURRENT_VIEW.set(get_view_name(request))
+
+    def process_template_response(self, request, response):
+        """
+        Called just before a deferred response (e.g. a DRF Response) is rendered. A post-render callback is used to
+        time the rendering.
+        """
+        render_start = time.perf_counter()
+
+        def record_render_duration(rendered_response):
+            request._metrics_serialization_duration = (request._metrics_serialization_duration or 0.0) + \
+                time.perf_counter() - render_start
+
+        response.add_post_render_callback(record_render_duration)
+        return response
@@ -0,0 +1,149 @@
+import time
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Name of the view currently handling the request in this thread. Set by metrics.middleware.MetricsMiddleware
+CURRENT_VIEW = contextvars.ContextVar('current_view', default='unknown')
+
+
+def label_queries(func):
+    """
+    Decorator for QuerySet methods that labels the queries they issue with the method name (e.g.
+    "EventQuerySet.get_event") for the slow query log
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._query_label = '{0}.{1}'.format(type(self).__name__, func.__name__)
+        return func(self, *args, **kwargs)
+    return wrapper
+
+
+class SlowQueryLogger(object):
+    """
+    Database execute wrapper that times each query and logs any that take longer than the threshold, along with their
+    query plan, the QuerySet method that issued them and the view that was handling the request
+    """
+
+    def __init__(self, label, threshold):
+        """
+        :param label: Label identifying where the queries came from
+        :type label: str
+        :param threshold: Queries taking at least this many seconds are logged
+        :type threshold: float
+        """
+        self.label = label
+        self.threshold = threshold
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Don't time the EXPLAIN queries that we issue ourselves
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.log(context['connection'], sql, params, duration)
+
+    def explain(self, connection, sql, params):
+        """
+        Return the query plan for a SELECT statement
+
+        :param connection: Connection that ran the query
+        :param sql: SQL of the query, with parameter placeholders
+        :param params: Query parameters
+        :return: The query plan, one line per row
+        :rtype: str
+        """
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return '(not a SELECT)'
+
+        self._explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('{0} {1}'.format(connection.ops.explain_query_prefix(), sql), params)
+                return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except DatabaseError as e:
+            return '(EXPLAIN failed: {0})'.format(e)
+        finally:
+            self._explaining = False
+
+    def log(self, connection, sql, params, duration):
+        """
+        Log a slow query along with its query plan
+
+        :param connection: Connection that ran the query
+        :param sql: SQL of the query, with parameter placeholders
+        :param params: Query parameters
+        :param duration: Time taken in seconds
+        """
+        logger.warning('Slow query (%.1f ms) from %s in view %s\nSQL: %s\nParams: %s\nPlan:\n%s',
+                       duration * 1000, self.label, CURRENT_VIEW.get(), sql, params,
+                       self.explain(connection, sql, params))
+
+
+class SlowQueryLoggingMixin(object):
+    """
+    QuerySet mixin that, when SLOW_QUERY_THRESHOLD_MS is set, times every query the QuerySet issues and logs the slow
+    ones via SlowQueryLogger. Methods decorated with label_queries() identify themselves in the log.
+
+    This is opt-in as it adds an execute wrapper to every evaluation. With the setting off the only overhead is a
+    settings lookup.
+    """
+
+    _query_label = None
+    _no_rows = object()
+
+    def _clone(self):
+        c = super(SlowQueryLoggingMixin, self)._clone()
+        c._query_label = self._query_label
+        return c
+
+    @contextmanager
+    def _log_slow_queries(self):
+        threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        if not threshold_ms:
+            yield
+            return
+
+        query_logger = SlowQueryLogger(self._query_label or type(self).__name__, threshold_ms / 1000)
+        with connections[self.db].execute_wrapper(query_logger):
+            yield
+
+    def _fetch_all(self):
+        if self._result_cache is not None:
+            return super(SlowQueryLoggingMixin, self)._fetch_all()
+        with self._log_slow_queries():
+            super(SlowQueryLoggingMixin, self)._fetch_all()
+
+    def _iterator(self, use_chunked_fetch, chunk_size):
+        iterator = super(SlowQueryLoggingMixin, self)._iterator(use_chunked_fetch, chunk_size)
+        # The query is executed when the first row is requested, only time that so that queries issued by the caller
+        # between rows are not attributed to this QuerySet
+        with self._log_slow_queries():
+            first = next(iterator, self._no_rows)
+        if first is self._no_rows:
+            return
+        yield first
+        yield from iterator
+
+    def count(self):
+        with self._log_slow_queries():
+            return super(SlowQueryLoggingMixin, self).count()
+
+    def exists(self):
+        with self._log_slow_queries():
+            return super(SlowQueryLoggingMixin, self).exists()
+
+    def aggregate(self, *args, **kwargs):
+        with self._log_slow_queries():
+            return super(SlowQueryLoggingMixin, self).aggregate(*args, **kwargs)
@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from metrics.histogram import Histogram
+
+
+class TestHistogram(SimpleTestCase):
+
+    def setUp(self):
+        self.histogram = Histogram('test_duration_seconds', 'Test histogram.', ('view',), (0.1, 1.0))
+
+    def test_observe_count_and_sum(self):
+        self.histogram.observe(0.05, 'EventList')
+        self.histogram.observe(0.5, 'EventList')
+        self.histogram.observe(5, 'EventView')
+        self.assertEqual(self.histogram.get_count('EventList'), 2)
+        self.assertAlmostEqual(self.histogram.get_sum('EventList'), 0.55)
+        self.assertEqual(self.histogram.get_count('EventView'), 1)
+        self.assertEqual(self.histogram.get_count('Unknown'), 0)
+
+    def test_render_cumulative_buckets(self):
+        self.histogram.observe(0.05, 'EventList')
+        self.histogram.observe(0.1, 'EventList')
+        self.histogram.observe(0.5, 'EventList')
+        self.histogram.observe(5, 'EventList')
+        lines = self.histogram.render()
+        self.assertEqual(lines[0], '# HELP test_duration_seconds Test histogram.')
+        self.assertEqual(lines[1], '# TYPE test_duration_seconds histogram')
+        self.assertEqual(lines[2:], [
+            'test_duration_seconds_bucket{view="EventList",le="0.1"} 2',
+            'test_duration_seconds_bucket{view="EventList",le="1"} 3',
+            'test_duration_seconds_bucket{view="EventList",le="+Inf"} 4',
+            'test_duration_seconds_sum{view="EventList"} 5.65',
+            'test_duration_seconds_count{view="EventList"} 4',
+        ])
+
+    def test_render_escapes_labels(self):
+        self.histogram.observe(0.05, 'a"b\\c')
+        self.assertIn('test_duration_seconds_count{view="a\\"b\\\\c"} 1', self.histogram.render())
+
+    def test_clear(self):
+        self.histogram.observe(0.05, 'EventList')
+        self.histogram.clear()
+        self.assertEqual(self.histogram.get_count('EventList'), 0)
+        self.assertEqual(len(self.histogram.render()), 2)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from django.test import TestCase
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+from events.models import Event
+from events.calendar import get_calendar_token
+from metrics.middleware import HISTOGRAMS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZATION_DURATION
+
+
+class TestMetricsMiddleware(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        cls.event1 = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(hours=2),
+                                          organiser=cls.user1)
+
+    def setUp(self):
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        self.client.force_login(self.user1)
+
+    def test_records_html_view(self):
+        self.client.get(reverse('events_list'), secure=True)
+        self.assertEqual(REQUEST_DURATION.get_count('EventList', 'GET', '200'), 1)
+        self.assertEqual(DB_QUERIES.get_count('EventList', 'GET'), 1)
+        self.assertGreater(DB_QUERIES.get_sum('EventList', 'GET'), 0)
+        self.assertGreater(DB_DURATION.get_sum('EventList', 'GET'), 0)
+
+    def test_render_not_recorded_as_serialization(self):
+        # EventList calls render() itself, so there is no separate rendering step to time
+        self.client.get(reverse('events_list'), secure=True)
+        self.assertEqual(SERIALIZATION_DURATION.get_count('EventList', 'GET'), 0)
+
+    def test_records_streaming_response(self):
+        response = self.client.get(reverse('events_calendar', args=(get_calendar_token(self.user1),)), secure=True)
+        self.assertTrue(response.streaming)
+        # Nothing is recorded until the content has been generated
+        self.assertEqual(REQUEST_DURATION.get_count('EventCalendar', 'GET', '200'), 0)
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'SUMMARY:Event 1', content)
+        self.assertEqual(REQUEST_DURATION.get_count('EventCalendar', 'GET', '200'), 1)
+        # The token check and the ETag, then the organised and attended events read while streaming
+        self.assertEqual(DB_QUERIES.get_sum('EventCalendar', 'GET'), 4)
+
+    def test_records_viewset_action(self):
+        self.client.get(reverse('event-list'), secure=True)
+        self.client.post(reverse('event-attend', args=(self.event1.id,)), secure=True)
+        self.assertEqual(REQUEST_DURATION.get_count('EventViewSet.list', 'GET', '200'), 1)
+        self.assertEqual(REQUEST_DURATION.get_count('EventViewSet.attend', 'POST', '202'), 1)
+        self.assertGreater(SERIALIZATION_DURATION.get_sum('EventViewSet.list', 'GET'), 0)
+
+    def test_records_function_view(self):
+        self.client.get(reverse('api-root'), secure=True)
+        self.assertEqual(REQUEST_DURATION.get_count('api_root', 'GET', '200'), 1)
+
+    def test_records_unmatched(self):
+        self.client.get('/does-not-exist', secure=True)
+        self.assertEqual(REQUEST_DURATION.get_count('unmatched', 'GET', '404'), 1)
+        self.assertEqual(DB_QUERIES.get_sum('unmatched', 'GET'), 0)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+from events.models import Event
+from metrics import query_logging
+
+# Small enough that every query is logged
+LOG_ALL_THRESHOLD_MS = 1e-9
+
+
+class TestSlowQueryLogging(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        cls.event1 = Event.objects.create(title='Event 1',
+                                          description='Event Desc. 1',
+                                          date_time=datetime.now() + timedelta(hours=2),
+                                          organiser=cls.user1)
+        cls.event1.attendees.add(cls.user1)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_disabled(self):
+        with mock.patch.object(query_logging.logger, 'warning') as mock_warning:
+            list(Event.objects.get_events_attended_by_user(self.user1))
+        mock_warning.assert_not_called()
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=60000)
+    def test_below_threshold(self):
+        with mock.patch.object(query_logging.logger, 'warning') as mock_warning:
+            list(Event.objects.get_events_attended_by_user(self.user1))
+        mock_warning.assert_not_called()
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_logs_sql_and_plan(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            events = list(Event.objects.get_events_attended_by_user(self.user1))
+        self.assertEqual(events, [self.event1])
+        self.assertEqual(len(logs.output), 1)
+        message = logs.output[0]
+        self.assertIn('from EventQuerySet.get_events_attended_by_user in view unknown', message)
+        self.assertIn('SQL: SELECT', message)
+        self.assertRegex(message, r'Plan:\n[\s\S]*(SCAN|SEARCH)')
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_logs_get_event(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            Event.objects.get_event(self.event1.id, self.user1)
+        self.assertIn('from EventQuerySet.get_event ', logs.output[0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_logs_get_events(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            events = Event.objects.get_events([self.event1.id], self.user1)
+        self.assertEqual(list(events), [self.event1.id])
+        self.assertIn('from EventQuerySet.get_events ', logs.output[0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_logs_count_and_iterator(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            Event.objects.get_current_events().count()
+            list(Event.objects.get_events_in_past().iterator())
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('from EventQuerySet.get_current_events ', logs.output[0])
+        self.assertIn('from EventQuerySet.get_events_in_past ', logs.output[1])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_label_kept_on_chained_queryset(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            Event.objects.get_current_events().filter(title='Event 1').exists()
+        self.assertIn('from EventQuerySet.get_current_events ', logs.output[0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_unlabelled_query(self):
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            list(Event.objects.filter(title='Event 1'))
+        self.assertIn('from EventQuerySet in view', logs.output[0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=LOG_ALL_THRESHOLD_MS)
+    def test_logs_view_name(self):
+        self.client.force_login(self.user1)
+        with self.assertLogs('metrics.query_logging', 'WARNING') as logs:
+            self.client.get(reverse('events_list'), {'filter': 'a'}, secure=True)
+        self.assertTrue(logs.output)
+        for message in logs.output:
+            self.assertIn('from EventQuerySet.get_events_attended_by_user in view EventList', message)
+        self.assertEqual(query_logging.CURRENT_VIEW.get(), 'unknown')
@@ -0,0 +1,49 @@
+from django.test import TestCase, override_settings
+from django.shortcuts import reverse
+from django.contrib.auth import get_user_model
+
+HTTP_OK = 200
+HTTP_FORBIDDEN = 403
+
+
+class TestMetricsView(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        cls.staff1 = get_user_model().objects.create_user(email='staff1@events.com', password='password',
+                                                          is_staff=True)
+
+    def test_metrics_not_authenticated(self):
+        response = self.client.get(reverse('metrics'), secure=True)
+        self.assertEqual(response.status_code, HTTP_FORBIDDEN)
+
+    def test_metrics_not_staff(self):
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse('metrics'), secure=True)
+        self.assertEqual(response.status_code, HTTP_FORBIDDEN)
+
+    def test_metrics_staff(self):
+        self.client.force_login(self.staff1)
+        self.client.get(reverse('index'), secure=True)
+        response = self.client.get(reverse('metrics'), secure=True)
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn('# TYPE django_request_duration_seconds histogram', content)
+        self.assertIn('django_request_duration_seconds_count{view="IndexView",method="GET",status="302"}', content)
+
+    @override_settings(METRICS_TOKEN='token123')
+    def test_metrics_bearer_token(self):
+        response = self.client.get(reverse('metrics'), secure=True, HTTP_AUTHORIZATION='Bearer token123')
+        self.assertEqual(response.status_code, HTTP_OK)
+
+    @override_settings(METRICS_TOKEN='token123')
+    def test_metrics_wrong_bearer_token(self):
+        response = self.client.get(reverse('metrics'), secure=True, HTTP_AUTHORIZATION='Bearer token456')
+        self.assertEqual(response.status_code, HTTP_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_bearer_token_not_configured(self):
+        response = self.client.get(reverse('metrics'), secure=True, HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, HTTP_FORBIDDEN)
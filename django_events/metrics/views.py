@@ -0,0 +1,38 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .middleware import HISTOGRAMS
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def is_metrics_request_authorised(request):
+    """
+    Check whether the request may read the metrics. Staff users are always allowed, as is any request with an
+    "Authorization: Bearer <METRICS_TOKEN>" header (for the Prometheus scraper) if METRICS_TOKEN is set.
+
+    :param request: Request
+    :rtype: bool
+    """
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and authorization.startswith('Bearer '):
+        return hmac.compare_digest(authorization[len('Bearer '):].encode(), token.encode())
+    return False
+
+
+def metrics_view(request):
+    """
+    Renders the per-view request metrics in the Prometheus text format
+    """
+    if not is_metrics_request_authorised(request):
+        return HttpResponseForbidden()
+
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return HttpResponse('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,5 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.cache import cache
+from django.db.models import Q
+
+from django_events_management.paginator import EstimatedCountPaginator
+from .backends import get_user_cache_key
 from .forms import CustomUserCreationForm
 from .models import User
 
@@ -8,8 +13,15 @@ class CustomUserAdmin(UserAdmin):
     add_form = CustomUserCreationForm
     model = User
     list_display = ('email', 'is_staff', 'is_active', 'date_joined')
-    list_filter = ('email', 'is_staff', 'is_active', 'date_joined')
-    ordering = ('email',)
+    # Filters with a fixed set of choices, so that none of them has to find the distinct values of a column
+    list_filter = ('is_staff', 'is_active', 'date_joined')
+    # Newest first, in primary key order
+    ordering = ('-id',)
+    # Searches match the start of the email address (see get_search_results())
+    search_fields = ('email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['activate_users', 'deactivate_users']
     readonly_fields = ('date_joined',)
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -22,5 +34,50 @@ class CustomUserAdmin(UserAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Find the users whose email address starts with the search term. This is a range on the email column, so it is
+        answered from the column's unique index, whereas the default icontains search scans the whole table. The term
+        is also tried in lower case, as addresses are normally stored that way.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        query = Q()
+        for prefix in {search_term, search_term.lower()}:
+            query |= Q(email__gte=prefix, email__lt=prefix + '\U0010ffff')
+        return queryset.filter(query), False
+
+    def set_active(self, request, queryset, is_active):
+        """
+        Activate or deactivate the selected users with a single UPDATE, and remove them from the authentication cache
+        (which QuerySet.update() doesn't do)
+
+        :param request: The current request
+        :param queryset: The selected users
+        :param is_active: The new value of is_active
+        :type is_active: bool
+        :return: Number of users changed
+        :rtype: int
+        """
+        queryset = queryset.exclude(is_active=is_active)
+        user_ids = list(queryset.values_list('pk', flat=True))
+        count = queryset.update(is_active=is_active)
+        cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
+        return count
+
+    def activate_users(self, request, queryset):
+        count = self.set_active(request, queryset, True)
+        self.message_user(request, 'Activated {0} users'.format(count))
+    activate_users.short_description = 'Activate selected users'
+    activate_users.allowed_permissions = ('change',)
+
+    def deactivate_users(self, request, queryset):
+        # Staff can't lock themselves out
+        count = self.set_active(request, queryset.exclude(pk=request.user.pk), False)
+        self.message_user(request, 'Deactivated {0} users'.format(count))
+    deactivate_users.short_description = 'Deactivate selected users'
+    deactivate_users.allowed_permissions = ('change',)
+
 
 admin.site.register(User, CustomUserAdmin)
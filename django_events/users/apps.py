@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        """
+        Connect the signal handlers
+        """
+        from . import signals  # noqa: F401
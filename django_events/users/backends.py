@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_KEY = 'users.user.{0}'
+
+
+def get_user_cache_key(user_id):
+    """
+    Build the cache key that an authenticated user is stored under
+
+    :param user_id: ID of the User
+    :return: The cache key
+    :rtype: str
+    """
+    return USER_CACHE_KEY.format(user_id)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Authentication backend that caches the User looked up from the session for a short period of time. This saves a
+    SELECT on the users table on every page load and every AJAX call.
+
+    Each call to get_user() un-pickles a fresh instance from the cache, so no state is shared between requests. The
+    cached entry is removed whenever the User is saved or deleted (see users.signals). QuerySet.update() does not send
+    these signals, so the entry will live for at most USER_CACHE_TIMEOUT seconds after a bulk update.
+    """
+
+    def get_user(self, user_id):
+        """
+        Return the User for the given ID, from the cache if possible
+
+        :param user_id: ID of the User (as stored in the session)
+        :return: The User, or None if they do not exist or cannot authenticate
+        """
+        cache_key = get_user_cache_key(user_id)
+        user = cache.get(cache_key)
+        if user is None:
+            user = super(CachedModelBackend, self).get_user(user_id)
+            if user is not None:
+                cache.set(cache_key, user, settings.USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+from django.conf import settings
+from django.contrib.auth.hashers import BasePasswordHasher, PBKDF2PasswordHasher, Argon2PasswordHasher, mask_hash
+from django.utils.crypto import constant_time_compare, get_random_string
+from django.utils.translation import gettext_noop as _
+
+
+def get_policy_hashers(policy):
+    """
+    Return the PASSWORD_HASHERS for a PASSWORD_HASHER policy, in the same way as the settings: the policy's hasher
+    first, so that it hashes new passwords, followed by the others so that existing passwords can still be checked
+
+    :param policy: Name of the policy
+    :type policy: str
+    :rtype: list
+    """
+    return [settings.PASSWORD_HASHER_POLICIES[policy]] + \
+        [hasher for name, hasher in settings.PASSWORD_HASHER_POLICIES.items() if name != policy]
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the number of iterations from the PBKDF2_ITERATIONS setting. Passwords hashed with a different number
+    of iterations are rehashed when the user logs in.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with the costs from the ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) and ARGON2_PARALLELISM settings.
+    Requires the optional argon2-cffi package.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(BasePasswordHasher):
+    """
+    scrypt, using hashlib.scrypt() so that no extra package is needed. Unlike PBKDF2 it needs a block of memory for
+    each hash (128 * SCRYPT_WORK_FACTOR * SCRYPT_BLOCK_SIZE bytes), which makes guessing passwords on GPUs expensive
+    for a lower CPU cost per login. The encoded format is the same as Django 4.0's ScryptPasswordHasher, so the hashes
+    are still accepted after upgrading Django.
+    """
+    algorithm = 'scrypt'
+    dklen = 64
+
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_PARALLELISM
+
+    def salt(self):
+        return get_random_string(22)
+
+    def _hash(self, password, salt, work_factor, block_size, parallelism):
+        """
+        Return the base64 encoded scrypt hash of a password
+        """
+        # Twice the memory the hash needs, as hashlib's default limit is only 32MB
+        maxmem = 2 * 128 * work_factor * block_size * parallelism
+        data = hashlib.scrypt(password.encode(), salt=salt.encode(), n=work_factor, r=block_size, p=parallelism,
+                              maxmem=maxmem, dklen=self.dklen)
+        return base64.b64encode(data).decode('ascii')
+
+    def encode(self, password, salt):
+        assert password is not None
+        assert salt and '$' not in salt
+        data = self._hash(password, salt, self.work_factor, self.block_size, self.parallelism)
+        return '{0}${1}${2}${3}${4}${5}'.format(self.algorithm, self.work_factor, salt, self.block_size,
+                                                 self.parallelism, data)
+
+    def _decode(self, encoded):
+        """
+        Split an encoded hash into its algorithm, costs, salt and hash
+        """
+        algorithm, work_factor, salt, block_size, parallelism, data = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return int(work_factor), salt, int(block_size), int(parallelism), data
+
+    def verify(self, password, encoded):
+        work_factor, salt, block_size, parallelism, data = self._decode(encoded)
+        return constant_time_compare(data, self._hash(password, salt, work_factor, block_size, parallelism))
+
+    def safe_summary(self, encoded):
+        work_factor, salt, block_size, parallelism, data = self._decode(encoded)
+        return {
+            _('algorithm'): self.algorithm,
+            _('work factor'): work_factor,
+            _('block size'): block_size,
+            _('parallelism'): parallelism,
+            _('salt'): mask_hash(salt),
+            _('hash'): mask_hash(data),
+        }
+
+    def must_update(self, encoded):
+        work_factor, _salt, block_size, parallelism, _data = self._decode(encoded)
+        return (work_factor, block_size, parallelism) != (self.work_factor, self.block_size, self.parallelism)
+
+    def harden_runtime(self, password, encoded):
+        # The cost of scrypt depends on its memory use as well as its time, so the runtime isn't evened out
+        pass
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.authentication import get_api_token, revoke_api_tokens
+
+
+class Command(BaseCommand):
+    help = "Issues an API token for a user, for clients that can't use a session (see API_TOKEN_AUTHENTICATION). " \
+           "With --revoke, revokes all of the user's tokens instead. This command runs in its own process, so unless " \
+           "CACHE_BACKEND is shared by the web workers, they accept the revoked tokens until their cached User " \
+           "expires (up to USER_CACHE_TIMEOUT seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email address of the user')
+        parser.add_argument('--revoke', action='store_true', help="Revoke all of the user's tokens")
+
+    def handle(self, *args, **options):
+        """
+        Prints a new token, or revokes the existing ones
+        """
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User "{0}" does not exist'.format(options['email']))
+
+        if options['revoke']:
+            revoke_api_tokens(user)
+            self.stdout.write('Revoked all API tokens for "{0}"'.format(user.email))
+            if settings.CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+                self.stderr.write('The cache is per process, so running web workers will accept the revoked tokens '
+                                  'for up to {0} seconds'.format(settings.USER_CACHE_TIMEOUT))
+        else:
+            self.stdout.write(get_api_token(user))
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='api_token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_api_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -13,6 +13,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     date_joined = models.DateTimeField(auto_now_add=True)
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Incremented to revoke all of the user's API tokens (see api.authentication)
+    api_token_version = models.PositiveIntegerField(default=0, editable=False)
+    # Incremented to revoke the user's calendar feed URL (see events.calendar)
+    calendar_token_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     objects = UserManager()
@@ -0,0 +1,15 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import get_user_cache_key
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Remove a User from the authentication cache whenever they are changed or deleted, so that the next request picks
+    up the new password hash, active flag etc.
+    """
+    cache.delete(get_user_cache_key(instance.pk))
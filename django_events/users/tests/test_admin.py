@@ -0,0 +1,83 @@
+from django.test import TestCase
+from django.shortcuts import reverse
+from django.core.cache import cache
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.backends import get_user_cache_key
+
+
+class TestUserAdmin(TestCase):
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(email='admin@events.com', password='password')
+        self.users = [get_user_model().objects.create_user(email='user{0}@events.com'.format(i), password='password')
+                      for i in range(4)]
+        self.users.append(get_user_model().objects.create_user(email='other@example.com', password='password'))
+        self.client.force_login(self.admin)
+        self.changelist_url = reverse('admin:users_user_changelist')
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_changelist(self, **params):
+        response = self.client.get(self.changelist_url, params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def run_action(self, action, users, select_across=False):
+        data = {'action': action, ACTION_CHECKBOX_NAME: [user.pk for user in users], 'index': 0}
+        if select_across:
+            data['select_across'] = '1'
+        return self.client.post(self.changelist_url, data, secure=True)
+
+    def test_changelist(self):
+        response = self.get_changelist()
+        self.assertEqual([user.email for user in response.context['cl'].result_list][:2],
+                         ['other@example.com', 'user3@events.com'])
+        self.assertNotIn('email', [spec.field_path for spec in response.context['cl'].filter_specs
+                                   if hasattr(spec, 'field_path')])
+
+    def test_search_prefix(self):
+        response = self.get_changelist(q='user')
+        self.assertEqual(sorted(user.email for user in response.context['cl'].result_list),
+                         ['user{0}@events.com'.format(i) for i in range(4)])
+        response = self.get_changelist(q=' OTHER@')
+        self.assertEqual([user.email for user in response.context['cl'].result_list], ['other@example.com'])
+        # Not a substring search
+        response = self.get_changelist(q='events.com')
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_search_uses_range(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_changelist(q='user1')
+        searches = [query['sql'] for query in context.captured_queries if 'user1' in query['sql']]
+        self.assertTrue(searches)
+        for sql in searches:
+            self.assertNotIn('LIKE', sql)
+            self.assertIn('"users_user"."email" >=', sql)
+
+    def test_deactivate_users_single_update(self):
+        for user in self.users[:2]:
+            cache.set(get_user_cache_key(user.pk), user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.run_action('deactivate_users', self.users[:2])
+        self.assertEqual(response.status_code, 302)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(get_user_model().objects.filter(is_active=False).values_list('pk', flat=True)),
+                         {self.users[0].pk, self.users[1].pk})
+        self.assertIsNone(cache.get(get_user_cache_key(self.users[0].pk)))
+
+    def test_deactivate_excludes_self(self):
+        self.run_action('deactivate_users', [self.admin, self.users[0]])
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.is_active)
+        self.assertFalse(get_user_model().objects.get(pk=self.users[0].pk).is_active)
+
+    def test_activate_users_select_across(self):
+        get_user_model().objects.filter(pk__in=[user.pk for user in self.users]).update(is_active=False)
+        self.run_action('activate_users', self.users[:1], select_across=True)
+        self.assertFalse(get_user_model().objects.filter(is_active=False).exists())
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+
+from users.backends import CachedModelBackend, get_user_cache_key
+
+
+class TestCachedModelBackend(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = get_user_model().objects.create_user(email='user1@events.com', password='password')
+        cls.backend = CachedModelBackend()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_user_cached(self):
+        self.backend.get_user(self.user1.id)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user1.id)
+        self.assertEqual(user, self.user1)
+        self.assertEqual(user.friendly_name, 'user1')
+
+    def test_get_user_returns_new_instance(self):
+        user_a = self.backend.get_user(self.user1.id)
+        user_b = self.backend.get_user(self.user1.id)
+        self.assertIsNot(user_a, user_b)
+
+    def test_get_user_session_id_string(self):
+        self.backend.get_user(str(self.user1.id))
+        self.assertIsNotNone(cache.get(get_user_cache_key(self.user1.id)))
+
+    def test_get_user_invalid_user(self):
+        self.assertIsNone(self.backend.get_user(99999))
+        self.assertIsNone(cache.get(get_user_cache_key(99999)))
+
+    def test_get_user_invalidated_on_save(self):
+        self.backend.get_user(self.user1.id)
+        user = get_user_model().objects.get(pk=self.user1.id)
+        user.is_active = False
+        user.save()
+        self.assertIsNone(cache.get(get_user_cache_key(self.user1.id)))
+        self.assertIsNone(self.backend.get_user(self.user1.id))
+
+    def test_get_user_invalidated_on_delete(self):
+        user = get_user_model().objects.create_user(email='user2@events.com', password='password')
+        self.backend.get_user(user.id)
+        user_id = user.id
+        user.delete()
+        self.assertIsNone(cache.get(get_user_cache_key(user_id)))
+        self.assertIsNone(self.backend.get_user(user_id))
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+from unittest import skipIf
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password, check_password, identify_hasher
+
+from users.hashers import get_policy_hashers
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+# Low costs, so that the tests run quickly
+FAST_HASHER_SETTINGS = {
+    'PBKDF2_ITERATIONS': 1000,
+    'SCRYPT_WORK_FACTOR': 2 ** 10,
+    'ARGON2_MEMORY_COST': 1024,
+}
+
+
+@override_settings(**FAST_HASHER_SETTINGS)
+class TestHashers(SimpleTestCase):
+
+    def test_get_policy_hashers(self):
+        hashers = get_policy_hashers('argon2')
+        self.assertEqual(hashers[0], 'users.hashers.TunedArgon2PasswordHasher')
+        self.assertEqual(set(hashers), {'users.hashers.TunedArgon2PasswordHasher', 'users.hashers.ScryptPasswordHasher',
+                                        'users.hashers.TunedPBKDF2PasswordHasher'})
+
+    def test_scrypt(self):
+        encoded = make_password('Password1', hasher='scrypt')
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(check_password('Password1', encoded))
+        self.assertFalse(check_password('Password2', encoded))
+        hasher = identify_hasher(encoded)
+        self.assertEqual(hasher.safe_summary(encoded)['work factor'], 1024)
+        self.assertFalse(hasher.must_update(encoded))
+        with self.settings(SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertTrue(hasher.must_update(encoded))
+
+    def test_scrypt_format(self):
+        # The same as Django 4.0's ScryptPasswordHasher: scrypt$<work factor>$<salt>$<block size>$<parallelism>$<hash>
+        data = hashlib.scrypt(b'Password1', salt=b'abcdefghijklmnopqrstuv', n=1024, r=8, p=1, dklen=64)
+        self.assertEqual(make_password('Password1', salt='abcdefghijklmnopqrstuv', hasher='scrypt'),
+                         'scrypt$1024$abcdefghijklmnopqrstuv$8$1$' + base64.b64encode(data).decode('ascii'))
+
+    def test_pbkdf2_iterations_from_settings(self):
+        encoded = make_password('Password1', hasher='pbkdf2_sha256')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PBKDF2_ITERATIONS=2000):
+            self.assertTrue(identify_hasher(encoded).must_update(encoded))
+
+    @skipIf(argon2 is None, 'Requires argon2-cffi')
+    def test_argon2_costs_from_settings(self):
+        encoded = make_password('Password1', hasher='argon2')
+        self.assertIn('m=1024,t=2,p=1', encoded)
+        self.assertTrue(check_password('Password1', encoded))
+        with self.settings(ARGON2_TIME_COST=3):
+            self.assertTrue(identify_hasher(encoded).must_update(encoded))
+
+
+@override_settings(**FAST_HASHER_SETTINGS)
+class TestRehashOnLogin(TestCase):
+
+    def test_rehashed_with_policy(self):
+        with self.settings(PASSWORD_HASHERS=get_policy_hashers('pbkdf2')):
+            user = get_user_model().objects.create_user(email='user1@events.com', password='Password1')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        with self.settings(PASSWORD_HASHERS=get_policy_hashers('scrypt')):
+            self.assertEqual(authenticate(email='user1@events.com', password='Password1'), user)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('scrypt$'))
+            self.assertIsNone(authenticate(email='user1@events.com', password='Password2'))
+
+    def test_rehashed_with_new_cost(self):
+        with self.settings(PASSWORD_HASHERS=get_policy_hashers('scrypt')):
+            user = get_user_model().objects.create_user(email='user1@events.com', password='Password1')
+            with self.settings(SCRYPT_WORK_FACTOR=2 ** 11):
+                authenticate(email='user1@events.com', password='Password1')
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('scrypt$2048$'))
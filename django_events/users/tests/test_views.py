@@ -1,7 +1,10 @@
-from django.test import TestCase, RequestFactory
+from unittest import mock
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
+from django.contrib.auth import SESSION_KEY, get_user_model
 
 from users.views import RegisterView
+from users.hashers import ScryptPasswordHasher, get_policy_hashers
 
 
 class TestViewRegister(TestCase):
@@ -34,3 +37,18 @@ class TestViewRegister(TestCase):
         response = RegisterView.as_view()(request, *[], **{})
         self.assertEqual(response.status_code, TestViewRegister.HTTP_REDIRECT)
         self.assertEqual(response.url, reverse('events_list'))
+
+    @override_settings(PASSWORD_HASHERS=get_policy_hashers('scrypt'))
+    def test_register_view_hashes_password_once(self):
+        request = self.request_factory.post(reverse('user_register'), data={'email': 'user1@events.com',
+                                                                            'password1': 'Events246810',
+                                                                            'password2': 'Events246810'})
+        request.session = self.client.session
+        with mock.patch.object(ScryptPasswordHasher, 'encode', autospec=True,
+                               side_effect=ScryptPasswordHasher.encode) as encode, \
+                mock.patch.object(ScryptPasswordHasher, 'verify', autospec=True) as verify:
+            response = RegisterView.as_view()(request, *[], **{})
+        self.assertEqual(response.status_code, TestViewRegister.HTTP_REDIRECT)
+        self.assertEqual(encode.call_count, 1)
+        verify.assert_not_called()
+        self.assertEqual(int(request.session[SESSION_KEY]), get_user_model().objects.get(email='user1@events.com').pk)
@@ -1,4 +1,4 @@
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login
 from django.shortcuts import render, redirect, reverse
 from django.views.generic import FormView
 from .forms import CustomUserCreationForm
@@ -17,13 +17,13 @@ class RegisterView(FormView):
         """
         Handles a POST request from the register form. If form is valid the User is created, logged in and redirected
         to the events list. If the form is not valid then the form is re-rendered with error messages
+
+        The new User is logged in directly rather than with authenticate(), which would hash the password a second
+        time only to check it against the hash that was just saved
         """
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
-            form.save()
-            email = form.cleaned_data.get('email')
-            password = form.cleaned_data.get('password1')
-            user = authenticate(email=email, password=password)
+            user = form.save()
             login(request, user)
             return redirect(reverse('events_list'))
         return render(request, 'users/register.html', {'form': form})